@@ -1,11 +1,13 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from app.core.config import settings
+from app.core.versionamento import calcular_etag
+from app.core.paginacao import Pagina
 from app.core.database import get_db
 from app.models.usuario import Usuario
 from app.schemas.token import TokenPayload
@@ -18,6 +20,18 @@ reusable_oauth2 = OAuth2PasswordBearer(
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> Usuario:
+    return await _usuario_do_token(db, token)
+
+async def get_current_user_query_token(
+    db: AsyncSession = Depends(get_db),
+    token: str = Query(..., description="JWT de acesso (EventSource não envia cabeçalhos)")
+) -> Usuario:
+    user = await _usuario_do_token(db, token)
+    if not user.ativo:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+async def _usuario_do_token(db: AsyncSession, token: str) -> Usuario:
     try:
         # CORREÇÃO AQUI: settings.ALGORITHM
         payload = jwt.decode(
@@ -45,4 +59,47 @@ def get_current_active_user(
 ) -> Usuario:
     if not current_user.ativo:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def etag_condicional(*recursos: str, por_usuario: bool = False):
+    """Dependência de GET condicional para listagens.
+
+    Calcula o ETag a partir das marcas d'água das famílias de recursos de que a resposta depende.
+    Se o cliente já tem essa versão (If-None-Match), responde 304 antes de a rota
+    consultar o banco ou serializar o payload.
+    """
+    async def dependencia(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: Usuario = Depends(get_current_user)
+    ) -> str:
+        variacoes = [request.url.path, str(request.url.query)]
+        if por_usuario:
+            variacoes.append(f"usuario={current_user.id}")
+
+        etag = await calcular_etag(db, recursos, variacoes)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        enviados = request.headers.get("if-none-match", "")
+        if etag in [t.strip() for t in enviados.split(",")] or enviados.strip() == "*":
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return dependencia
+
+def paginacao(limite_padrao: Optional[int] = None):
+    """Dependência de paginação por cursor (?cursor=&limit=).
+
+    Toda listagem é paginada: sem `limit`, vale `limite_padrao` (ou PAGINATION_DEFAULT_LIMIT).
+    O cursor da próxima página volta no cabeçalho X-Next-Cursor.
+    """
+    def dependencia(
+        cursor: Optional[str] = Query(None, description="Cursor opaco recebido em X-Next-Cursor"),
+        limit: Optional[int] = Query(None, ge=1, le=settings.PAGINATION_MAX_LIMIT, description="Itens por página")
+    ) -> Pagina:
+        return Pagina(limite=limit or limite_padrao or settings.PAGINATION_DEFAULT_LIMIT, cursor=cursor)
+
+    return dependencia
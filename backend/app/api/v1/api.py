@@ -12,7 +12,8 @@ from .endpoints import (
     runner_dashboard, 
     esqueceu_senha, 
     recupera_senha,
-    logs
+    logs,
+    eventos
 )
 
 api_router = APIRouter()
@@ -29,4 +30,5 @@ api_router.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboar
 api_router.include_router(runner_dashboard.router, prefix="/dashboard-runners", tags=["Dashboard"])
 api_router.include_router(esqueceu_senha.router, prefix="/forgot-password", tags=["Esqueceu Senha"])
 api_router.include_router(recupera_senha.router, prefix="/reset-password", tags=["Recuperar Senha"])
-api_router.include_router(logs.router, prefix="/logs", tags=["Logs"])
\ No newline at end of file
+api_router.include_router(logs.router, prefix="/logs", tags=["Logs"])
+api_router.include_router(eventos.router, prefix="/eventos", tags=["Eventos"])
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Dict, Any
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
@@ -6,6 +6,7 @@ from app.services.dashboard_service import DashboardService
 from app.schemas.dashboard import DashboardResponse
 from app.models.usuario import Usuario
 from app.api.deps import get_current_active_user
+from app.core.cache import response_cache
 
 router = APIRouter()
 
@@ -19,4 +20,11 @@ async def get_dashboard(
     # NÃO crie o repo aqui. O Service já faz isso internamente agora.
     service = DashboardService(db) 
     
-    return await service.get_dashboard_data(sistema_id=sistema_id)
\ No newline at end of file
+    return await service.get_dashboard_data(sistema_id=sistema_id)
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: Usuario = Depends(get_current_active_user)
+) -> Dict[str, Any]:
+    # contadores de hit/miss do cache de respostas deste worker
+    return response_cache.stats()
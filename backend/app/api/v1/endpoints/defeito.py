@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.core.database import get_db
 from app.services.defeito_service import DefeitoService
 from app.services.log_service import LogService
+from app.services.evidencia_service import EvidenciaService
 from app.schemas.defeito import DefeitoCreate, DefeitoResponse, DefeitoUpdate
 from app.models.usuario import Usuario 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, etag_condicional, paginacao
+from app.core.paginacao import Pagina, expor_cursor
+from app.core.compactacao import resposta_zip
 
 router = APIRouter()
 
@@ -21,20 +24,15 @@ async def criar_defeito(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
-    novo_defeito = await service.registrar_defeito(dados)
-    try:
-        log_service = LogService(db)
-        nome_teste = await service.obter_nome_teste_por_execucao(novo_defeito.execucao_teste_id)
+    async def montar_log(defeito):
+        nome_teste = await service.obter_nome_teste_por_execucao(defeito.execucao_teste_id)
+        return {"entidade_id": defeito.id, "detalhes": f"Defeito reportado no teste: '{nome_teste}'"}
 
-        await log_service.registrar_acao(
-            usuario_id=current_user.id,
-            acao="CRIAR",
-            entidade="Defeito",
-            entidade_id=novo_defeito.id,
-            detalhes=f"Defeito reportado no teste: '{nome_teste}'"
-        )
-    except Exception as e:
-        print(f"Erro ao gerar log de criação: {e}")
+    log_service = LogService(db)
+    log_service.preparar_acao(usuario_id=current_user.id, acao="CRIAR", entidade="Defeito", montar=montar_log)
+    novo_defeito = await service.registrar_defeito(dados)
+    # Defeito repetido devolve o existente sem gravar: o log vai sozinho
+    await log_service.confirmar_acao(novo_defeito)
 
     return novo_defeito
 
@@ -45,13 +43,29 @@ async def listar_defeitos_execucao(
 ):
     return await service.listar_por_execucao(execucao_id)
 
-@router.get("/", response_model=List[DefeitoResponse])
+@router.get(
+    "/", response_model=List[DefeitoResponse],
+    dependencies=[Depends(etag_condicional("defeitos", "execucoes", "casos", "projetos", "usuarios", por_usuario=True))]
+)
 async def listar_todos_defeitos(
+    response: Response,
     responsavel_id: Optional[int] = Query(None, description="Filtrar por ID do responsável"),
+    pagina: Pagina = Depends(paginacao()),
     current_user: Usuario = Depends(get_current_user),
     service: DefeitoService = Depends(get_service)
 ):
-    return await service.listar_todos(current_user, filtro_responsavel_id=responsavel_id)
+    defeitos = await service.listar_todos(current_user, filtro_responsavel_id=responsavel_id, pagina=pagina)
+    expor_cursor(response, pagina)
+    return defeitos
+
+@router.get("/{id}/evidencias.zip")
+async def exportar_evidencias_defeito(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Evidências do defeito num ZIP com manifesto.csv."""
+    return resposta_zip(await EvidenciaService(db).exportar_zip(defeito_id=id), f"defeito-{id}-evidencias.zip")
 
 @router.put("/{id}", response_model=DefeitoResponse)
 async def atualizar_defeito(
@@ -61,25 +75,19 @@ async def atualizar_defeito(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
+    async def montar_log(defeito):
+        status_texto = str(defeito.status.value) if hasattr(defeito.status, 'value') else str(defeito.status)
+        nome_teste = await service.obter_nome_teste_por_execucao(defeito.execucao_teste_id)
+        return {"detalhes": f"Teste: {nome_teste} | Status: {status_texto}"}
+
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id, acao="ATUALIZAR", entidade="Defeito", entidade_id=id, montar=montar_log
+    )
     defeito = await service.atualizar_defeito(id, dados)
     
     if not defeito:
         raise HTTPException(status_code=404, detail="Defeito não encontrado")
-    try:
-        log_service = LogService(db)        
-        status_texto = str(defeito.status.value) if hasattr(defeito.status, 'value') else str(defeito.status)
-        nome_teste = await service.obter_nome_teste_por_execucao(defeito.execucao_teste_id)
-        titulo_defeito = defeito.titulo if defeito.titulo else "Sem título"
-
-        await log_service.registrar_acao(
-            usuario_id=current_user.id,
-            acao="ATUALIZAR",
-            entidade="Defeito",
-            entidade_id=defeito.id,
-            detalhes=f"Teste: {nome_teste} | Status: {status_texto}"
-        )
-    except Exception as e:
-        print(f"Erro ao gerar log de atualização: {e}")
 
     return defeito
 
@@ -90,18 +98,15 @@ async def excluir_defeito(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="DELETAR",
+        entidade="Defeito",
+        entidade_id=id,
+        detalhes=f"Defeito ID {id} excluído."
+    )
     sucesso = await service.excluir_defeito(id)
     
     if not sucesso:
-        raise HTTPException(status_code=404, detail="Defeito não encontrado")
-    try:
-        log_service = LogService(db)
-        await log_service.registrar_acao(
-            usuario_id=current_user.id,
-            acao="DELETAR",
-            entidade="Defeito",
-            entidade_id=id,
-            detalhes=f"Defeito ID {id} excluído."
-        )
-    except Exception as e:
-        print(f"Erro ao gerar log de exclusão: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Defeito não encontrado")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Optional, Dict, Any
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.eventos import barramento
+from app.api.deps import get_current_user_query_token
+from app.models.usuario import Usuario
+from app.services.dashboard_service import DashboardService
+
+router = APIRouter()
+
+
+def _formatar_sse(evento: str, dados: Dict[str, Any]) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, default=str)}\n\n"
+
+def _delta(anterior: Dict[str, Any], atual: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in atual.items() if anterior.get(k) != v}
+
+
+async def _estado_dashboard(sistema_id: Optional[int]) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        dados = await DashboardService(db).get_dashboard_data(sistema_id=sistema_id)
+    return dados.kpis.model_dump(mode="json")
+
+async def _estado_runner(usuario_id: int) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        dados = await DashboardService(db).get_runner_dashboard_data(runner_id=usuario_id)
+    estado = dados.kpis.model_dump(mode="json")
+    estado["fila"] = {item.name: item.value for item in dados.charts.status_distribuicao}
+    return estado
+
+
+@router.get("/stream")
+async def stream_eventos(
+    request: Request,
+    sistema_id: Optional[int] = Query(None, description="Sistema acompanhado no dashboard geral"),
+    current_user: Usuario = Depends(get_current_user_query_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream SSE com os KPIs do dashboard e a fila do executor.
+
+    Envia um evento `snapshot` na conexão e, a cada alteração relevante,
+    eventos `dashboard` e `runner` só com os campos que mudaram.
+    """
+    usuario_id = current_user.id
+    # A conexão é longa: libera a sessão da autenticação para não segurar o pool
+    await db.close()
+
+    async def gerar():
+        fila = barramento.assinar()
+        try:
+            estado = {
+                "dashboard": await _estado_dashboard(sistema_id),
+                "runner": await _estado_runner(usuario_id),
+            }
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            yield _formatar_sse("snapshot", estado)
+
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                # Junta os eventos já enfileirados (rajadas de escrita) num único recálculo
+                sistemas, usuarios = set(evento.get("sistemas", [])), set(evento.get("usuarios", []))
+                while not fila.empty():
+                    proximo = fila.get_nowait()
+                    sistemas.update(proximo.get("sistemas", []))
+                    usuarios.update(proximo.get("usuarios", []))
+
+                if sistema_id is None or sistema_id in sistemas:
+                    atual = await _estado_dashboard(sistema_id)
+                    mudancas = _delta(estado["dashboard"], atual)
+                    if mudancas:
+                        estado["dashboard"] = atual
+                        yield _formatar_sse("dashboard", mudancas)
+
+                if usuario_id in usuarios:
+                    atual = await _estado_runner(usuario_id)
+                    mudancas = _delta(estado["runner"], atual)
+                    if mudancas:
+                        estado["runner"] = atual
+                        yield _formatar_sse("runner", mudancas)
+        finally:
+            barramento.cancelar(fila)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
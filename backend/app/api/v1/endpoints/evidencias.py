@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.evidencias import responder_objeto, validar_chave
+from app.services.evidencia_service import EvidenciaService
+
+# Montado na raiz (fora de /api/v1): as URLs gravadas em evidencias apontam para /evidencias/...
+router = APIRouter()
+
+def get_evidencia_service(db: AsyncSession = Depends(get_db)) -> EvidenciaService:
+    return EvidenciaService(db)
+
+@router.api_route("/evidencias/{chave:path}", methods=["GET", "HEAD"])
+async def servir_evidencia(
+    chave: str,
+    request: Request,
+    download: bool = False,
+    service: EvidenciaService = Depends(get_evidencia_service)
+):
+    """Arquivo de evidência com Range e cache (ou redirecionamento para o armazenamento remoto).
+
+    Objetos endereçados por conteúdo usam o hash como ETag e cache imutável; arquivos
+    antigos (nome com uuid) são revalidados por data e tamanho. O Content-Type vem do
+    registro do upload, nunca da extensão da chave.
+    """
+    chave, sha256 = validar_chave(chave)
+    return await responder_objeto(
+        request,
+        chave,
+        etag=f'"{sha256}"' if sha256 else None,
+        imutavel=sha256 is not None,
+        media_type=await service.tipo_para_servir(chave, sha256),
+        download=download
+    )
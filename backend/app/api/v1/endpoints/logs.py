@@ -1,21 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.services.log_service import LogService
 from app.schemas.log import LogResponse
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
 
 router = APIRouter()
 
 @router.get("/", response_model=List[LogResponse])
 async def listar_logs(
+    response: Response,
+    pagina: Pagina = Depends(paginacao(limite_padrao=200)),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     service = LogService(db)
-    return await service.listar_todos()
+    logs = await service.listar_todos(pagina)
+    expor_cursor(response, pagina)
+    return logs
 
 @router.delete("/{id}", status_code=204)
 async def deletar_log(
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence, List
 
 from app.core.database import get_db
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, etag_condicional, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
 from app.schemas.modulo import ModuloCreate, ModuloResponse, ModuloUpdate
 from app.services.modulo_service import ModuloService
@@ -21,26 +22,32 @@ async def create_modulo(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    novo_modulo = await service.create_modulo(modulo)
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="Modulo",
-        entidade_id=novo_modulo.id,
-        sistema_id=novo_modulo.sistema_id,
-        detalhes=f"Criou o módulo '{novo_modulo.nome}'"
+        sistema_id=modulo.sistema_id,
+        detalhes=f"Criou o módulo '{modulo.nome}'",
+        montar=lambda criado: {"entidade_id": criado.id}
     )
-    
+    novo_modulo = await service.create_modulo(modulo)
+
     return novo_modulo
 
-@router.get("/", response_model=Sequence[ModuloResponse], summary="Listar todos os módulos")
+@router.get(
+    "/", response_model=Sequence[ModuloResponse], summary="Listar todos os módulos",
+    dependencies=[Depends(etag_condicional("modulos", "sistemas"))]
+)
 async def get_modulos(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: ModuloService = Depends(get_modulo_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.get_all_modulos()
+    modulos = await service.get_all_modulos(pagina)
+    expor_cursor(response, pagina)
+    return modulos
 
 @router.get("/{modulo_id}", response_model=ModuloResponse, summary="Obter um módulo por ID")
 async def get_modulo(
@@ -61,18 +68,19 @@ async def update_modulo(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    updated_modulo = await service.update_modulo(modulo_id, modulo)
-    if not updated_modulo:
-        raise HTTPException(status_code=404, detail="Módulo não encontrado")
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="Modulo",
-        entidade_id=updated_modulo.id,
-        detalhes=f"Atualizou o módulo '{updated_modulo.nome}'"
+        entidade_id=modulo_id,
+        montar=lambda atualizado: {"detalhes": f"Atualizou o módulo '{atualizado.nome}'"}
     )
+    updated_modulo = await service.update_modulo(modulo_id, modulo)
+    if not updated_modulo:
+        raise HTTPException(status_code=404, detail="Módulo não encontrado")
+    # Atualização sem campos não grava nada: o log vai sozinho
+    await log_service.confirmar_acao(updated_modulo)
 
     return updated_modulo
 
@@ -86,17 +94,16 @@ async def delete_modulo(
     modulo_antigo = await service.get_modulo_by_id(modulo_id)
     nome_modulo = modulo_antigo.nome if modulo_antigo else str(modulo_id)
 
-    success = await service.delete_modulo(modulo_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Módulo não encontrado")
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="DELETAR",
         entidade="Modulo",
         entidade_id=modulo_id,
         detalhes=f"Apagou o módulo '{nome_modulo}'"
     )
-    
+    success = await service.delete_modulo(modulo_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Módulo não encontrado")
+
     return
\ No newline at end of file
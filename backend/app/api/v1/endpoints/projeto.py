@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.services.projeto_service import ProjetoService
 from app.services.log_service import LogService
 from app.schemas.projeto import ProjetoCreate, ProjetoResponse, ProjetoUpdate
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, etag_condicional, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
 
 router = APIRouter()
@@ -20,33 +21,40 @@ async def create_projeto(
     db: AsyncSession = Depends(get_db), # <--- Injeta DB
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    novo_projeto = await service.create_projeto(projeto_in)
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="Projeto",
-        entidade_id=novo_projeto.id,
-        sistema_id=novo_projeto.sistema_id, 
-        detalhes=f"Criou o projeto '{novo_projeto.nome}'"
+        sistema_id=projeto_in.sistema_id,
+        detalhes=f"Criou o projeto '{projeto_in.nome}'",
+        montar=lambda projeto: {"entidade_id": projeto.id}
     )
-    
+    novo_projeto = await service.create_projeto(projeto_in)
+
     return novo_projeto
 
-@router.get("/", response_model=List[ProjetoResponse])
+@router.get("/", response_model=List[ProjetoResponse], dependencies=[Depends(etag_condicional("projetos", "modulos", "sistemas"))])
 async def get_projetos(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: ProjetoService = Depends(get_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.get_all_projetos()
+    projetos = await service.get_all_projetos(pagina)
+    expor_cursor(response, pagina)
+    return projetos
 
-@router.get("/selection", response_model=List[ProjetoResponse])
+@router.get("/selection", response_model=List[ProjetoResponse], dependencies=[Depends(etag_condicional("projetos", "modulos", "sistemas"))])
 async def get_projetos_selection(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: ProjetoService = Depends(get_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.get_all_projetos()
+    projetos = await service.get_all_projetos(pagina)
+    expor_cursor(response, pagina)
+    return projetos
 
 @router.get("/{projeto_id}", response_model=ProjetoResponse)
 async def get_projeto(
@@ -67,19 +75,17 @@ async def update_projeto(
     db: AsyncSession = Depends(get_db), # <--- Injeta DB
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    projeto = await service.update_projeto(projeto_id, projeto_in)
-    if not projeto:
-        raise HTTPException(status_code=404, detail="Projeto não encontrado")
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="Projeto",
-        entidade_id=projeto.id,
-        sistema_id=projeto.sistema_id,
-        detalhes=f"Atualizou o projeto '{projeto.nome}'"
+        entidade_id=projeto_id,
+        montar=lambda projeto: {"sistema_id": projeto.sistema_id, "detalhes": f"Atualizou o projeto '{projeto.nome}'"}
     )
+    projeto = await service.update_projeto(projeto_id, projeto_in)
+    if not projeto:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
 
     return projeto
 
@@ -94,12 +100,8 @@ async def delete_projeto(
     if not projeto_antigo:
         raise HTTPException(status_code=404, detail="Projeto não encontrado")
 
-    success = await service.delete_projeto(projeto_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Erro ao apagar projeto")
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="DELETAR",
         entidade="Projeto",
@@ -107,5 +109,8 @@ async def delete_projeto(
         sistema_id=projeto_antigo.sistema_id,
         detalhes=f"Apagou o projeto '{projeto_antigo.nome}'"
     )
-    
+    success = await service.delete_projeto(projeto_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Erro ao apagar projeto")
+
     return
\ No newline at end of file
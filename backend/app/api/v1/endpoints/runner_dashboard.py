@@ -1,9 +1,9 @@
-from typing import Optional
+from typing import Optional, Literal, List
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.services.dashboard_service import DashboardService
-from app.schemas.dashboard import RunnerDashboardResponse, PerformanceResponse
+from app.schemas.dashboard import RunnerDashboardResponse, PerformanceResponse, DuracaoEstatistica
 from app.models.usuario import Usuario
 from app.api.deps import get_current_active_user
 
@@ -21,10 +21,24 @@ async def get_runner_dashboard(
 @router.get("/performance", response_model=PerformanceResponse)
 async def get_performance_dashboard(
     user_id: Optional[int] = Query(None, description="ID do usuário para visão individual"),
+    dias: int = Query(30, ge=1, le=365, description="Janela em dias (ex.: 7, 30, 90, 365)"),
+    agrupamento: Literal["dia", "semana", "mes"] = Query("dia", description="Agrupamento do gráfico de velocidade"),
     current_user: Usuario = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     # endpoint de analise de performance 
     # se user_id for passado, filtra pelo testador, senao mostra geral
     service = DashboardService(db)
-    return await service.get_performance_analytics(user_id=user_id)
\ No newline at end of file
+    return await service.get_performance_analytics(user_id=user_id, dias=dias, agrupamento=agrupamento)
+
+@router.get("/duracoes", response_model=List[DuracaoEstatistica])
+async def get_duracoes_execucao(
+    agrupar_por: Literal["responsavel", "caso", "projeto", "ciclo"] = Query("responsavel"),
+    dias: int = Query(90, ge=1, le=365, description="Janela em dias"),
+    id: Optional[int] = Query(None, description="Restringe a um testador/caso/projeto/ciclo"),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # duracao media, p50 e p95 das execucoes concluidas (em minutos)
+    service = DashboardService(db)
+    return await service.get_duracoes(agrupar_por, dias=dias, filtro_id=id)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence
 from app.core.database import AsyncSessionLocal
 from app.schemas.sistema import SistemaCreate, SistemaResponse, SistemaUpdate
 from app.services.sistema_service import SistemaService
 from app.services.log_service import LogService
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, etag_condicional, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
 
 router = APIRouter()
@@ -24,22 +25,28 @@ async def create_sistema(
     db: AsyncSession = Depends(get_db_session),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    novo_sistema = await service.create_sistema(sistema)
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="Sistema",
-        entidade_id=novo_sistema.id,
-        sistema_id=novo_sistema.id,
-        detalhes=f"Criou o sistema '{novo_sistema.nome}'",
-        entidade_nome=novo_sistema.nome 
+        detalhes=f"Criou o sistema '{sistema.nome}'",
+        entidade_nome=sistema.nome,
+        montar=lambda criado: {"entidade_id": criado.id, "sistema_id": criado.id}
     )
+    novo_sistema = await service.create_sistema(sistema)
     return novo_sistema
 
-@router.get("/", response_model=Sequence[SistemaResponse])
-async def get_sistemas(service: SistemaService = Depends(get_sistema_service), current_user: Usuario = Depends(get_current_active_user)):
-    return await service.get_all_sistemas()
+@router.get("/", response_model=Sequence[SistemaResponse], dependencies=[Depends(etag_condicional("sistemas"))])
+async def get_sistemas(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
+    service: SistemaService = Depends(get_sistema_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    sistemas = await service.get_all_sistemas(pagina)
+    expor_cursor(response, pagina)
+    return sistemas
 
 @router.get("/{sistema_id}", response_model=SistemaResponse)
 async def get_sistema(sistema_id: int, service: SistemaService = Depends(get_sistema_service), current_user: Usuario = Depends(get_current_active_user)):
@@ -56,19 +63,23 @@ async def update_sistema(
     db: AsyncSession = Depends(get_db_session),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    updated_sistema = await service.update_sistema(sistema_id, sistema)
-    if not updated_sistema:
-        raise HTTPException(status_code=404, detail="Sistema não encontrado")
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="Sistema",
-        entidade_id=updated_sistema.id,
-        sistema_id=updated_sistema.id,
-        detalhes=f"Atualizou o sistema '{updated_sistema.nome}'",
-        entidade_nome=updated_sistema.nome
+        entidade_id=sistema_id,
+        sistema_id=sistema_id,
+        montar=lambda atualizado: {
+            "detalhes": f"Atualizou o sistema '{atualizado.nome}'",
+            "entidade_nome": atualizado.nome
+        }
     )
+    updated_sistema = await service.update_sistema(sistema_id, sistema)
+    if not updated_sistema:
+        raise HTTPException(status_code=404, detail="Sistema não encontrado")
+    # Atualização sem campos não grava nada: o log vai sozinho
+    await log_service.confirmar_acao(updated_sistema)
     return updated_sistema
 
 @router.delete("/{sistema_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -82,23 +93,20 @@ async def delete_sistema(
     if not sistema:
         raise HTTPException(status_code=404, detail="Sistema não encontrado")
     nome_snapshot = sistema.nome 
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="DELETAR",
+        entidade="Sistema",
+        entidade_id=sistema_id,
+        detalhes=f"Apagou o sistema '{nome_snapshot}'",
+        sistema_id=None,
+        entidade_nome=nome_snapshot
+    )
     sucesso = await service.delete_sistema(sistema_id)
     
     if not sucesso:
         raise HTTPException(
             status_code=409, 
             detail="Não é possível excluir este sistema pois existem projetos ou dados vinculados a ele."
-        )
-    try:
-        log_service = LogService(db)
-        await log_service.registrar_acao(
-            usuario_id=current_user.id,
-            acao="DELETAR",
-            entidade="Sistema",
-            entidade_id=sistema_id,
-            detalhes=f"Apagou o sistema '{nome_snapshot}'",
-            sistema_id=None,
-            entidade_nome=nome_snapshot
-        )
-    except Exception as e:
-        print(f"Erro log: {e}")
\ No newline at end of file
+        )
\ No newline at end of file
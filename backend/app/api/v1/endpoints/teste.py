@@ -2,31 +2,45 @@ import shutil
 import uuid
 import os
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from fastapi.responses import FileResponse
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status, File, UploadFile
+from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from typing import List, Optional
 
+from app.core.evidencias import responder_objeto, validar_chave
+from app.core.compactacao import resposta_zip
 from app.core.database import get_db
-from app.api.deps import get_current_user, get_current_active_user
+from app.api.deps import get_current_user, get_current_active_user, etag_condicional, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
-from app.models.projeto import Projeto
-from app.models.modulo import Modulo
-from app.models.testing import StatusExecucaoEnum, CicloTeste
+from app.models.testing import StatusExecucaoEnum
 
 from app.services.caso_teste_service import CasoTesteService
 from app.services.ciclo_teste_service import CicloTesteService
 from app.services.execucao_teste_service import ExecucaoTesteService
+from app.services.evidencia_service import EvidenciaService
 from app.services.log_service import LogService
 
 from app.schemas.caso_teste import CasoTesteCreate, CasoTesteResponse, CasoTesteUpdate
-from app.schemas.ciclo_teste import CicloTesteCreate, CicloTesteResponse, CicloTesteUpdate
+from app.schemas.ciclo_teste import (
+    CicloTesteCreate, CicloTesteResponse, CicloTesteUpdate, CicloRetesteCreate, CicloRetesteResponse
+)
 from app.schemas.execucao_teste import (
     ExecucaoTesteCreate, 
     ExecucaoTesteResponse, 
+    ExecucaoTarefaResumo,
     ExecucaoPassoResponse, 
-    ExecucaoPassoUpdate
+    ExecucaoPassoUpdate,
+    AlocacaoLoteCreate,
+    AlocacaoLoteResponse,
+    ExecucaoPassoLote,
+    ExecucaoPassoLoteResponse
+)
+from app.schemas.sincronizacao import SincronizacaoResponse, PassosOfflineLote, PassosOfflineResponse
+from app.schemas.evidencia import (
+    EvidenciaResponse, EvidenciaUploadDireto, EvidenciaUploadDiretoResponse,
+    UploadEvidenciaCreate, UploadEvidenciaResponse, UploadEvidenciaConcluir
 )
 
 router = APIRouter()
@@ -41,46 +55,35 @@ def get_ciclo_service(db: AsyncSession = Depends(get_db)) -> CicloTesteService:
 def get_execucao_service(db: AsyncSession = Depends(get_db)) -> ExecucaoTesteService:
     return ExecucaoTesteService(db)
 
-# --- HELPER PARA OBTER SISTEMA_ID ---
-async def get_sistema_id_from_projeto(db: AsyncSession, projeto_id: int) -> Optional[int]:
-    query = select(Projeto.sistema_id, Projeto.modulo_id).where(Projeto.id == projeto_id)
-    result = await db.execute(query)
-    projeto = result.first()
-    
-    if not projeto: return None
-    if projeto.sistema_id: return projeto.sistema_id
-        
-    if projeto.modulo_id:
-        query_mod = select(Modulo.sistema_id).where(Modulo.id == projeto.modulo_id)
-        result_mod = await db.execute(query_mod)
-        return result_mod.scalar()
-    return None
-
-# --- HELPER QUE FALTAVA ---
-async def get_sistema_id_from_ciclo(db: AsyncSession, ciclo_id: int) -> Optional[int]:
-    query = select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id)
-    result = await db.execute(query)
-    projeto_id = result.scalar()
-    
-    if projeto_id:
-        return await get_sistema_id_from_projeto(db, projeto_id)
-    return None
+def get_evidencia_service(db: AsyncSession = Depends(get_db)) -> EvidenciaService:
+    return EvidenciaService(db)
 
 # --- GESTÃO DE CASOS DE TESTE ---
-@router.get("/casos", response_model=List[CasoTesteResponse])
+@router.get(
+    "/casos", response_model=List[CasoTesteResponse],
+    dependencies=[Depends(etag_condicional("casos", "projetos", "ciclos", "usuarios"))]
+)
 async def listar_todos_casos(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: CasoTesteService = Depends(get_caso_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.listar_todos()
+    casos = await service.listar_todos(pagina)
+    expor_cursor(response, pagina)
+    return casos
 
 @router.get("/projetos/{projeto_id}/casos", response_model=List[CasoTesteResponse])
 async def listar_casos_projeto(
     projeto_id: int,
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: CasoTesteService = Depends(get_caso_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.listar_casos_teste(projeto_id)
+    casos = await service.listar_casos_teste(projeto_id, pagina)
+    expor_cursor(response, pagina)
+    return casos
 
 @router.post("/projetos/{projeto_id}/casos", response_model=CasoTesteResponse, status_code=status.HTTP_201_CREATED)
 async def criar_caso_teste(
@@ -92,20 +95,18 @@ async def criar_caso_teste(
 ):
     if not dados.responsavel_id:
         dados.responsavel_id = current_user.id
-        
-    novo_caso = await service.criar_caso_teste(projeto_id, dados)
-    
-    sistema_id = await get_sistema_id_from_projeto(db, projeto_id)
 
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="CasoTeste",
-        entidade_id=novo_caso.id,
-        sistema_id=sistema_id,
-        detalhes=f"Criou o caso de teste '{novo_caso.nome}'"
+        projeto_id=projeto_id,
+        detalhes=f"Criou o caso de teste '{dados.nome}'",
+        montar=lambda caso: {"entidade_id": caso.id}
     )
+    novo_caso = await service.criar_caso_teste(projeto_id, dados)
+    await log_service.confirmar_acao(novo_caso)
 
     return novo_caso
 
@@ -125,20 +126,18 @@ async def atualizar_caso_teste(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="ATUALIZAR",
+        entidade="CasoTeste",
+        entidade_id=caso_id,
+        montar=lambda caso: {
+            "projeto_id": caso.projeto_id,
+            "detalhes": f"Atualizou o caso de teste '{caso.nome}'"
+        }
+    )
     caso = await service.atualizar_caso_teste(caso_id, dados)
-    
-    if caso:
-        sistema_id = await get_sistema_id_from_projeto(db, caso.projeto_id)
-        
-        log_service = LogService(db)
-        await log_service.registrar_acao(
-            usuario_id=current_user.id,
-            acao="ATUALIZAR",
-            entidade="CasoTeste",
-            entidade_id=caso.id,
-            sistema_id=sistema_id,
-            detalhes=f"Atualizou o caso de teste '{caso.nome}'"
-        )
 
     return caso
 
@@ -155,36 +154,45 @@ async def remover_caso_teste(
 
     nome_caso = caso_antigo.nome
     projeto_id = caso_antigo.projeto_id
-    sistema_id = await get_sistema_id_from_projeto(db, projeto_id)
-
-    await service.deletar_caso_teste(caso_id)
 
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="DELETAR",
         entidade="CasoTeste",
         entidade_id=caso_id,
-        sistema_id=sistema_id,
+        projeto_id=projeto_id,
         detalhes=f"Removeu o caso de teste '{nome_caso}'"
     )
+    await service.deletar_caso_teste(caso_id)
 
 # --- GESTÃO DE CICLOS DE TESTE ---
 @router.get("/projetos/{projeto_id}/ciclos", response_model=List[CicloTesteResponse])
 async def listar_ciclos_projeto(
     projeto_id: int,
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     service: CicloTesteService = Depends(get_ciclo_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.listar_por_projeto(projeto_id)
+    ciclos = await service.listar_por_projeto(projeto_id, pagina)
+    expor_cursor(response, pagina)
+    return ciclos
 
-@router.get("/ciclos", response_model=List[CicloTesteResponse])
+@router.get(
+    "/ciclos", response_model=List[CicloTesteResponse],
+    dependencies=[Depends(etag_condicional("ciclos", "projetos", "execucoes"))]
+)
 async def listar_todos_ciclos(
+    response: Response,
+    pagina: Pagina = Depends(paginacao()),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user) 
 ):
     service = CicloTesteService(db)
-    return await service.get_all_ciclos()
+    ciclos = await service.get_all_ciclos(pagina)
+    expor_cursor(response, pagina)
+    return ciclos
 
 @router.post("/projetos/{projeto_id}/ciclos", response_model=CicloTesteResponse, status_code=status.HTTP_201_CREATED)
 async def criar_ciclo(
@@ -194,21 +202,41 @@ async def criar_ciclo(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="CRIAR",
+        entidade="CicloTeste",
+        projeto_id=projeto_id,
+        montar=lambda ciclo: {"entidade_id": ciclo.id, "detalhes": f"Criou o ciclo '{ciclo.nome}'"}
+    )
     novo_ciclo = await service.criar_ciclo(projeto_id, dados)
-    
-    sistema_id = await get_sistema_id_from_projeto(db, projeto_id)
 
+    return novo_ciclo
+
+@router.post("/ciclos/{ciclo_id}/reteste", response_model=CicloRetesteResponse, status_code=status.HTTP_201_CREATED)
+async def gerar_ciclo_reteste(
+    ciclo_id: int,
+    dados: CicloRetesteCreate,
+    service: CicloTesteService = Depends(get_ciclo_service),
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="CicloTeste",
-        entidade_id=novo_ciclo.id,
-        sistema_id=sistema_id,
-        detalhes=f"Criou o ciclo '{novo_ciclo.nome}'"
+        montar=lambda criado: {
+            "entidade_id": criado[0].id,
+            "projeto_id": criado[0].projeto_id,
+            "detalhes": f"Gerou o ciclo de reteste '{criado[0].nome}' a partir do ciclo {ciclo_id} ({criado[1]['execucoes_criadas']} testes)"
+        }
     )
+    # Novo ciclo com as execuções não aprovadas deste, em uma única transação
+    resultado = await service.gerar_reteste(ciclo_id, dados)
 
-    return novo_ciclo
+    return resultado
 
 @router.put("/ciclos/{ciclo_id}", response_model=CicloTesteResponse)
 async def atualizar_ciclo(
@@ -218,21 +246,19 @@ async def atualizar_ciclo(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    ciclo = await service.atualizar_ciclo(ciclo_id, dados)
-    if not ciclo:
-        raise HTTPException(status_code=404, detail="Ciclo não encontrado")
-    
-    sistema_id = await get_sistema_id_from_projeto(db, ciclo.projeto_id)
-
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="CicloTeste",
-        entidade_id=ciclo.id,
-        sistema_id=sistema_id,
-        detalhes=f"Atualizou o ciclo '{ciclo.nome}'"
+        entidade_id=ciclo_id,
+        montar=lambda ciclo: {"projeto_id": ciclo.projeto_id, "detalhes": f"Atualizou o ciclo '{ciclo.nome}'"}
     )
+    ciclo = await service.atualizar_ciclo(ciclo_id, dados)
+    if not ciclo:
+        raise HTTPException(status_code=404, detail="Ciclo não encontrado")
+    # Atualização sem campos não grava nada: o log vai sozinho
+    await log_service.confirmar_acao(ciclo)
 
     return ciclo
 
@@ -247,22 +273,20 @@ async def remover_ciclo(
     if not ciclo:
          raise HTTPException(status_code=404, detail="Ciclo não encontrado")
          
-    sistema_id = await get_sistema_id_from_projeto(db, ciclo.projeto_id)
     nome_ciclo = ciclo.nome
 
-    sucesso = await service.remover_ciclo(ciclo_id)
-    if not sucesso:
-        raise HTTPException(status_code=404, detail="Erro ao remover ciclo")
-
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="DELETAR",
         entidade="CicloTeste",
         entidade_id=ciclo_id,
-        sistema_id=sistema_id,
+        projeto_id=ciclo.projeto_id,
         detalhes=f"Removeu o ciclo '{nome_ciclo}'"
     )
+    sucesso = await service.remover_ciclo(ciclo_id)
+    if not sucesso:
+        raise HTTPException(status_code=404, detail="Erro ao remover ciclo")
 
 # --- EXECUÇÃO E PLANEJAMENTO ---
 @router.post("/execucoes/", response_model=ExecucaoTesteResponse, status_code=status.HTTP_201_CREATED)
@@ -272,30 +296,85 @@ async def criar_execucao(
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    nova_exec = await service.alocar_teste(dados.ciclo_teste_id, dados.caso_teste_id, dados.responsavel_id)
-    sistema_id = await get_sistema_id_from_ciclo(db, dados.ciclo_teste_id)
-    
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="ExecucaoTeste",
-        entidade_id=nova_exec.id,
-        sistema_id=sistema_id,
-        detalhes=f"Alocou teste (Caso: {dados.caso_teste_id}, Ciclo: {dados.ciclo_teste_id})"
+        ciclo_id=dados.ciclo_teste_id,
+        detalhes=f"Alocou teste (Caso: {dados.caso_teste_id}, Ciclo: {dados.ciclo_teste_id})",
+        montar=lambda execucao: {"entidade_id": execucao.id}
     )
-    
+    nova_exec = await service.alocar_teste(dados.ciclo_teste_id, dados.caso_teste_id, dados.responsavel_id)
+
     return nova_exec
 
+@router.post("/execucoes/lote", response_model=AlocacaoLoteResponse, status_code=status.HTTP_201_CREATED)
+async def alocar_execucoes_lote(
+    dados: AlocacaoLoteCreate,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="CRIAR",
+        entidade="ExecucaoTeste",
+        entidade_id=dados.ciclo_teste_id,
+        ciclo_id=dados.ciclo_teste_id,
+        montar=lambda resultado: {
+            "detalhes": f"Alocou {resultado['execucoes_criadas']} testes em lote no ciclo {dados.ciclo_teste_id}"
+        }
+    )
+    resumo = await service.alocar_em_lote(dados)
+    # Lote sem execuções novas não grava nada: o log vai sozinho
+    await log_service.confirmar_acao(resumo.model_dump())
+
+    return resumo
+
 @router.get("/minhas-tarefas", response_model=List[ExecucaoTesteResponse]) 
 async def listar_meus_testes(
+    response: Response,
+    status: Optional[StatusExecucaoEnum] = None,
+    pagina: Pagina = Depends(paginacao(limite_padrao=20)),
+    skip: int = Query(0, ge=0, deprecated=True, description="Obsoleto: use o cursor de X-Next-Cursor"),
+    current_user: Usuario = Depends(get_current_user),
+    service: ExecucaoTesteService = Depends(get_execucao_service)
+):
+    tarefas = await service.listar_tarefas_usuario(current_user.id, status, pagina, skip)
+    expor_cursor(response, pagina)
+    return tarefas
+
+@router.get("/minhas-tarefas/resumo", response_model=List[ExecucaoTarefaResumo])
+async def listar_meus_testes_resumo(
+    response: Response,
     status: Optional[StatusExecucaoEnum] = None,
-    skip: int = 0,
-    limit: int = 20,
+    pagina: Pagina = Depends(paginacao(limite_padrao=20)),
     current_user: Usuario = Depends(get_current_user),
     service: ExecucaoTesteService = Depends(get_execucao_service)
 ):
-    return await service.listar_tarefas_usuario(current_user.id, status, skip, limit)
+    # Lista leve para a fila do executor; a execução completa carrega ao abrir a tarefa
+    tarefas = await service.listar_tarefas_resumo(current_user.id, status, pagina)
+    expor_cursor(response, pagina)
+    return tarefas
+
+@router.get("/sincronizacao", response_model=SincronizacaoResponse)
+async def sincronizar_tarefas(
+    desde: Optional[str] = None,
+    current_user: Usuario = Depends(get_current_user),
+    service: ExecucaoTesteService = Depends(get_execucao_service)
+):
+    # Delta para o executor: só o que mudou depois do token devolvido na chamada anterior
+    return await service.sincronizar(current_user.id, desde)
+
+@router.post("/sincronizacao/passos", response_model=PassosOfflineResponse)
+async def enviar_passos_offline(
+    dados: PassosOfflineLote,
+    current_user: Usuario = Depends(get_current_user),
+    service: ExecucaoTesteService = Depends(get_execucao_service)
+):
+    return await service.aplicar_passos_offline(current_user.id, dados)
 
 @router.get("/execucoes/{execucao_id}", response_model=ExecucaoTesteResponse)
 async def obter_execucao(
@@ -318,36 +397,43 @@ async def registrar_passo(
 ):
     return await service.registrar_resultado_passo(passo_id, dados)
 
+@router.put("/execucoes/passos", response_model=ExecucaoPassoLoteResponse)
+async def registrar_passos_lote(
+    dados: ExecucaoPassoLote,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    # varios resultados de passos (de uma ou mais execucoes) numa unica transacao
+    return await service.registrar_resultados_lote(dados)
+
 @router.put("/execucoes/{execucao_id}/finalizar")
 async def finalizar_execucao_manual(
     execucao_id: int,
     status: StatusExecucaoEnum,
+    versao: Optional[int] = None,
     service: ExecucaoTesteService = Depends(get_execucao_service),
     db: AsyncSession = Depends(get_db), 
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    execucao = await service.finalizar_execucao(execucao_id, status_final=status)
-    
-    if not execucao:
-        raise HTTPException(status_code=404, detail="Execução não encontrada")
-    sistema_id = None
-    if execucao.ciclo_teste_id:
-        sistema_id = await get_sistema_id_from_ciclo(db, execucao.ciclo_teste_id)
     status_str = status.value if hasattr(status, "value") else str(status)
 
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="ExecucaoTeste",
         entidade_id=execucao_id,
-        sistema_id=sistema_id,
-        detalhes=f"Finalizou execução com status: {status_str}"
+        detalhes=f"Finalizou execução com status: {status_str}",
+        montar=lambda execucao: {"ciclo_id": execucao.ciclo_teste_id}
     )
-        
-    return {"message": "Execução atualizada", "status": status}
+    execucao = await service.finalizar_execucao(execucao_id, status_final=status, versao=versao)
 
-@router.post("/passos/{passo_id}/evidencia") 
+    if not execucao:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+
+    return {"message": "Execução atualizada", "status": status, "versao": execucao.versao}
+
+@router.post("/passos/{passo_id}/evidencia", response_model=EvidenciaResponse)
 async def upload_evidencia_passo(
     passo_id: int,
     file: UploadFile = File(...),
@@ -355,28 +441,134 @@ async def upload_evidencia_passo(
     db: AsyncSession = Depends(get_db), 
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    resultado = await service.upload_evidencia(passo_id, file)
-
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="PassoExecucao",
         entidade_id=passo_id,
         detalhes=f"Upload de evidência para o passo #{passo_id}"
     )
+    resultado = await service.upload_evidencia(passo_id, file)
+    # Conteúdo repetido não grava nada: o log vai sozinho
+    await log_service.confirmar_acao()
 
     return resultado
 
-@router.get("/evidencias/download/{filename}")
-async def download_evidencia(filename: str):
-    file_path = f"evidencias/{filename}"
+@router.post("/evidencias/upload-direto", response_model=EvidenciaUploadDiretoResponse)
+async def solicitar_upload_direto(
+    dados: EvidenciaUploadDireto,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """URL pré-assinada para enviar a evidência direto ao armazenamento, sem passar pela API.
 
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
-    
-    return FileResponse(
-        path=file_path, 
-        filename=filename, 
-        media_type='application/octet-stream' 
-    )
\ No newline at end of file
+    Se o conteúdo (pelo sha256) já existe, devolve a evidência pronta e nada precisa ser enviado.
+    """
+    return await service.solicitar_upload_direto(dados)
+
+@router.post("/evidencias/upload-direto/confirmar", response_model=EvidenciaResponse)
+async def confirmar_upload_direto(
+    dados: EvidenciaUploadDireto,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.confirmar_upload_direto(dados)
+
+# --- Upload retomável (arquivos grandes, em blocos numerados) ---
+
+@router.post("/passos/{passo_id}/evidencia/uploads", response_model=UploadEvidenciaResponse, status_code=status.HTTP_201_CREATED)
+async def iniciar_upload_evidencia(
+    passo_id: int,
+    dados: UploadEvidenciaCreate,
+    service: ExecucaoTesteService = Depends(get_execucao_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Abre a sessão de upload; o cliente envia os blocos e, se cair, consulta o progresso e continua."""
+    return await service.iniciar_upload_evidencia(passo_id, dados, current_user.id)
+
+@router.get("/evidencias/uploads/{upload_id}", response_model=UploadEvidenciaResponse)
+async def progresso_upload_evidencia(
+    upload_id: str,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return await service.progresso_upload(upload_id, current_user.id)
+
+@router.put("/evidencias/uploads/{upload_id}/blocos/{indice}", response_model=UploadEvidenciaResponse)
+async def enviar_bloco_evidencia(
+    upload_id: str,
+    indice: int,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Corpo cru do bloco `indice`, que começa em `offset` bytes do arquivo."""
+    return await service.receber_bloco(upload_id, current_user.id, indice, offset, request.stream())
+
+@router.post("/evidencias/uploads/{upload_id}/concluir", response_model=EvidenciaResponse)
+async def concluir_upload_evidencia(
+    upload_id: str,
+    dados: UploadEvidenciaConcluir,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    db: AsyncSession = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    upload = await service.progresso_upload(upload_id, current_user.id)
+
+    log_service = LogService(db)
+    log_service.preparar_acao(
+        usuario_id=current_user.id,
+        acao="ATUALIZAR",
+        entidade="PassoExecucao",
+        entidade_id=upload.passo_id,
+        detalhes=f"Upload de evidência para o passo #{upload.passo_id}"
+    )
+    resultado = await service.concluir_upload(upload_id, current_user.id, dados.sha256)
+    await log_service.confirmar_acao()
+
+    return resultado
+
+@router.delete("/evidencias/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancelar_upload_evidencia(
+    upload_id: str,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    await service.cancelar_upload(upload_id, current_user.id)
+
+# --- Exportação de evidências (ZIP gerado durante o envio) ---
+
+@router.get("/ciclos/{ciclo_id}/evidencias.zip")
+async def exportar_evidencias_ciclo(
+    ciclo_id: int,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Todas as evidências dos passos e defeitos do ciclo, com manifesto.csv."""
+    return resposta_zip(await service.exportar_zip(ciclo_id=ciclo_id), f"ciclo-{ciclo_id}-evidencias.zip")
+
+@router.get("/execucoes/{execucao_id}/evidencias.zip")
+async def exportar_evidencias_execucao(
+    execucao_id: int,
+    service: EvidenciaService = Depends(get_evidencia_service),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    return resposta_zip(await service.exportar_zip(execucao_id=execucao_id), f"execucao-{execucao_id}-evidencias.zip")
+
+@router.get("/evidencias/download/{filename:path}")
+async def download_evidencia(filename: str):
+    # O envio (Range, cache) fica num só lugar: /evidencias/{chave}
+    chave, _ = validar_chave(filename)
+    return RedirectResponse(url=f"/evidencias/{quote(chave)}?download=true", status_code=status.HTTP_308_PERMANENT_REDIRECT)
+
+@router.get("/evidencias/{sha256}/{variante}")
+async def obter_variante_evidencia(
+    request: Request,
+    sha256: str = Path(..., pattern=r"^[0-9a-f]{64}$"),
+    variante: str = Path(..., description="miniatura ou previa"),
+    service: EvidenciaService = Depends(get_evidencia_service)
+):
+    chave = await service.obter_variante(sha256, variante)
+    return await responder_objeto(request, chave, etag=f'"{sha256}-{variante}"', imutavel=True, media_type="image/webp")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence, Optional
 
@@ -6,7 +6,8 @@ from app.core.database import AsyncSessionLocal
 from app.schemas.usuario import UsuarioCreate, UsuarioResponse, UsuarioUpdate
 from app.services.usuario_service import UsuarioService
 from app.services.log_service import LogService 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, paginacao
+from app.core.paginacao import Pagina, expor_cursor
 from app.models.usuario import Usuario
 
 router = APIRouter()
@@ -32,28 +33,31 @@ async def create_usuario(
     db: AsyncSession = Depends(get_db_session),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    novo_usuario = await service.create_usuario(usuario)
-    
-    nome_log = truncar_texto(novo_usuario.nome, 5)
-
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="CRIAR",
         entidade="Usuario",
-        entidade_id=novo_usuario.id,
-        detalhes=f"Criou o usuário '{nome_log}' ({novo_usuario.username})"
+        montar=lambda criado: {
+            "entidade_id": criado.id,
+            "detalhes": f"Criou o usuário '{truncar_texto(criado.nome, 5)}' ({criado.username})"
+        }
     )
-    
+    novo_usuario = await service.create_usuario(usuario)
+
     return novo_usuario
 
 @router.get("/", response_model=Sequence[UsuarioResponse], summary="Listar todos usuários")
 async def get_usuarios(
+    response: Response,
     ativo: Optional[bool] = None,
+    pagina: Pagina = Depends(paginacao()),
     service: UsuarioService = Depends(get_usuario_service),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    return await service.get_all_usuarios(ativo)
+    usuarios = await service.get_all_usuarios(ativo, pagina)
+    expor_cursor(response, pagina)
+    return usuarios
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse, summary="Obter usuário por ID")
 async def get_usuario(
@@ -74,20 +78,19 @@ async def update_usuario(
     db: AsyncSession = Depends(get_db_session),
     current_user: Usuario = Depends(get_current_active_user)
 ):
-    updated_usuario = await service.update_usuario(usuario_id, usuario)
-    if not updated_usuario:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
-    nome_log = truncar_texto(updated_usuario.nome, 5)
-
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="ATUALIZAR",
         entidade="Usuario",
-        entidade_id=updated_usuario.id,
-        detalhes=f"Atualizou o usuário '{nome_log}' ({updated_usuario.username})"
+        entidade_id=usuario_id,
+        montar=lambda atualizado: {
+            "detalhes": f"Atualizou o usuário '{truncar_texto(atualizado.nome, 5)}' ({atualizado.username})"
+        }
     )
+    updated_usuario = await service.update_usuario(usuario_id, usuario)
+    if not updated_usuario:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
     return updated_usuario
 
@@ -104,16 +107,16 @@ async def delete_usuario(
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     nome_log = truncar_texto(usuario_alvo.nome, 5)
     username_log = usuario_alvo.username
-    success = await service.delete_usuario(usuario_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Erro ao remover usuário")
     log_service = LogService(db)
-    await log_service.registrar_acao(
+    log_service.preparar_acao(
         usuario_id=current_user.id,
         acao="DELETAR",
         entidade="Usuario",
         entidade_id=usuario_id,
         detalhes=f"Apagou o usuário '{nome_log}' ({username_log})"
     )
+    success = await service.delete_usuario(usuario_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Erro ao remover usuário")
     
     return
\ No newline at end of file
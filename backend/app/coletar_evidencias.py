@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.core.armazenamento import encerrar_armazenamento
+from app.services.coleta_evidencia_service import ColetaEvidenciaService
+
+def _megabytes(valor: int) -> str:
+    return f"{valor / (1024 * 1024):.1f} MB"
+
+async def coletar_evidencias(args):
+    async with AsyncSessionLocal() as session:
+        try:
+            modo = "REMOÇÃO" if args.executar else "SIMULAÇÃO (use --executar para remover)"
+            print(f"--- Coleta de evidências órfãs: {modo} ---")
+            ao_remover = (lambda item, motivo: print(f"{item.chave}\t{item.tamanho}\t{motivo}")) if args.listar else None
+            relatorio = await ColetaEvidenciaService(
+                session,
+                executar=args.executar,
+                carencia_horas=args.carencia_horas,
+                remocoes_por_segundo=args.remocoes_por_segundo,
+                ao_remover=ao_remover
+            ).coletar()
+
+            print(f"Listas de evidências lidas: {relatorio.get('listas_lidas', 0)}")
+            print(f"Arquivos no armazenamento: {relatorio.get('arquivos', 0)} ({_megabytes(relatorio.get('bytes', 0))})")
+            print(f"Referenciados: {relatorio.get('referenciados', 0)}")
+            print(f"Sem referência, ainda na carência: {relatorio.get('em_carencia', 0)}")
+            print(f"Uploads em andamento: {relatorio.get('uploads_em_andamento', 0)}")
+            verbo = "Removidos" if args.executar else "A remover"
+            print(f"{verbo}: {relatorio.get('removidos', 0)} ({_megabytes(relatorio.get('bytes_removidos', 0))})")
+            print(f"Contadores de referência divergentes na varredura: {relatorio.get('contadores_divergentes', 0)}")
+            if args.executar:
+                print(f"Contadores corrigidos (recontados na hora): {relatorio.get('contadores_corrigidos', 0)}")
+                print(f"Sessões de upload expiradas removidas: {relatorio.get('sessoes_upload_expiradas', 0)}")
+            print("--- Coleta concluída ---")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"Erro na coleta de evidências: {e}")
+            sys.exit(1)
+        finally:
+            await encerrar_armazenamento()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove evidências que nenhum passo ou defeito referencia mais.")
+    parser.add_argument("--executar", action="store_true", help="remove de fato (sem ele, só relata)")
+    parser.add_argument("--listar", action="store_true", help="imprime cada arquivo removido ou a remover")
+    parser.add_argument("--carencia-horas", type=float, default=None, help="padrão: EVIDENCE_GC_GRACE_HOURS")
+    parser.add_argument("--remocoes-por-segundo", type=float, default=None, help="padrão: EVIDENCE_GC_DELETES_PER_SECOND (0 = sem limite)")
+    try:
+        asyncio.run(coletar_evidencias(parser.parse_args()))
+    except Exception as e:
+        print(f"Execution Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,458 @@
+import base64
+import hashlib
+import hmac
+import os
+import posixpath
+import stat
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+from urllib.parse import quote
+
+import anyio
+import httpx
+
+from app.core.config import settings
+
+DIRETORIO_TEMPORARIO = ".tmp"
+
+_limitador: Optional[anyio.CapacityLimiter] = None
+
+
+def _limitador_io() -> anyio.CapacityLimiter:
+    """Threads de disco compartilhadas por todos os uploads do worker (EVIDENCE_IO_THREADS)."""
+    global _limitador
+    if _limitador is None:
+        _limitador = anyio.CapacityLimiter(settings.EVIDENCE_IO_THREADS)
+    return _limitador
+
+async def em_thread(funcao, *args):
+    return await anyio.to_thread.run_sync(funcao, *args, limiter=_limitador_io())
+
+
+class ObjetoArmazenado(NamedTuple):
+    chave: str
+    tamanho: int
+    modificado_em: datetime
+
+
+def normalizar_chave(chave: str) -> Optional[str]:
+    """Chave relativa ("ab/cd/arquivo.png"); None se sair da raiz ou apontar para a área temporária."""
+    chave = posixpath.normpath(chave.replace("\\", "/")).lstrip("/")
+    if not chave or chave == "." or chave.startswith("..") or chave.split("/")[0] == DIRETORIO_TEMPORARIO:
+        return None
+    return chave
+
+
+class Armazenamento:
+    """Interface dos drivers de evidências. Chaves são caminhos relativos separados por "/"."""
+
+    async def info(self, chave: str) -> Optional[ObjetoArmazenado]:
+        raise NotImplementedError
+
+    async def existe(self, chave: str) -> bool:
+        return await self.info(chave) is not None
+
+    async def gravar(self, chave: str, blocos: AsyncIterator[bytes], tamanho: int, mime_type: str):
+        """Grava o objeto a partir de um iterador de blocos; leitores nunca veem um objeto pela metade."""
+        raise NotImplementedError
+
+    def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def remover(self, chave: str):
+        raise NotImplementedError
+
+    async def tocar(self, chave: str, mime_type: str) -> bool:
+        """Atualiza a data de modificação do objeto (a coleta de órfãos não remove o recém-tocado); False se não existe."""
+        raise NotImplementedError
+
+    def listar(self, prefixo: str = "") -> AsyncIterator[ObjetoArmazenado]:
+        raise NotImplementedError
+
+    def caminho_local(self, chave: str) -> Optional[str]:
+        """Arquivo no disco do próprio servidor, quando o driver tem um (permite sendfile)."""
+        return None
+
+    def url_download(self, chave: str, nome_download: Optional[str] = None, media_type: Optional[str] = None) -> Optional[str]:
+        """URL pré-assinada para o cliente baixar direto do armazenamento; None se não houver."""
+        return None
+
+    def url_upload(self, chave: str, mime_type: str, sha256: str) -> Optional[dict]:
+        """Instruções ({metodo, url, headers}) para o cliente enviar direto ao armazenamento; None se não houver."""
+        return None
+
+    async def encerrar(self):
+        pass
+
+
+# --- Disco local ---
+
+class ArmazenamentoLocal(Armazenamento):
+    def __init__(self, raiz: str):
+        self.raiz = raiz
+
+    def caminho_local(self, chave: str) -> Optional[str]:
+        normalizada = normalizar_chave(chave)
+        if normalizada is None:
+            return None
+        raiz = os.path.realpath(self.raiz)
+        caminho = os.path.realpath(os.path.join(raiz, *normalizada.split("/")))
+        return caminho if caminho.startswith(raiz + os.sep) else None
+
+    def _caminho(self, chave: str) -> str:
+        caminho = self.caminho_local(chave)
+        if caminho is None:
+            raise ValueError(f"Chave de evidência inválida: {chave}")
+        return caminho
+
+    async def info(self, chave: str) -> Optional[ObjetoArmazenado]:
+        caminho = self.caminho_local(chave)
+        if caminho is None:
+            return None
+        try:
+            st = await em_thread(os.stat, caminho)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return ObjetoArmazenado(chave, st.st_size, datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+    async def gravar(self, chave: str, blocos: AsyncIterator[bytes], tamanho: int, mime_type: str):
+        destino = self._caminho(chave)
+        diretorio_tmp = os.path.join(self.raiz, DIRETORIO_TEMPORARIO)
+        await em_thread(lambda: [os.makedirs(d, exist_ok=True) for d in (diretorio_tmp, os.path.dirname(destino))])
+        temporario = os.path.join(diretorio_tmp, uuid.uuid4().hex)
+
+        arquivo = await em_thread(open, temporario, "wb")
+        try:
+            async for bloco in blocos:
+                await em_thread(arquivo.write, bloco)
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                await em_thread(_descartar, arquivo, temporario)
+            raise
+        await em_thread(arquivo.close)
+        # Gravações simultâneas da mesma chave têm o mesmo conteúdo; o último replace vence sem prejuízo
+        await em_thread(_publicar, temporario, destino)
+
+    async def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> AsyncIterator[bytes]:
+        async with await anyio.open_file(self._caminho(chave), mode="rb") as arquivo:
+            await arquivo.seek(inicio)
+            restante = None if fim is None else fim - inicio + 1
+            while restante is None or restante > 0:
+                bloco = await arquivo.read(settings.EVIDENCE_CHUNK_BYTES if restante is None else min(settings.EVIDENCE_CHUNK_BYTES, restante))
+                if not bloco:
+                    break
+                if restante is not None:
+                    restante -= len(bloco)
+                yield bloco
+
+    async def remover(self, chave: str):
+        await em_thread(_remover_arquivo, self._caminho(chave), os.path.realpath(self.raiz))
+
+    async def tocar(self, chave: str, mime_type: str) -> bool:
+        try:
+            await em_thread(os.utime, self._caminho(chave))
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        return True
+
+    async def listar(self, prefixo: str = "") -> AsyncIterator[ObjetoArmazenado]:
+        """Percorre um diretório por vez (cada leitura numa thread), sem carregar a árvore inteira."""
+        raiz = os.path.realpath(self.raiz)
+        pendentes = [raiz]
+        while pendentes:
+            diretorio = pendentes.pop()
+            try:
+                entradas = await em_thread(_listar_diretorio, diretorio)
+            except FileNotFoundError:
+                continue
+            for nome, eh_diretorio, tamanho, modificado in sorted(entradas, reverse=True):
+                caminho = os.path.join(diretorio, nome)
+                chave = os.path.relpath(caminho, raiz).replace(os.sep, "/")
+                if eh_diretorio:
+                    if chave != DIRETORIO_TEMPORARIO:
+                        pendentes.append(caminho)
+                elif chave.startswith(prefixo):
+                    yield ObjetoArmazenado(chave, tamanho, datetime.fromtimestamp(modificado, timezone.utc))
+
+
+def _publicar(temporario: str, destino: str):
+    try:
+        os.replace(temporario, destino)
+    except FileNotFoundError:
+        # O diretório pode ter sido removido por uma remoção concorrente que o deixou vazio
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporario, destino)
+
+def _remover_arquivo(caminho: str, raiz: str):
+    """Remove o arquivo e os diretórios que ficaram vazios acima dele, até a raiz."""
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        return
+    diretorio = os.path.dirname(caminho)
+    while diretorio != raiz and diretorio.startswith(raiz + os.sep):
+        try:
+            os.rmdir(diretorio)
+        except OSError:
+            break
+        diretorio = os.path.dirname(diretorio)
+
+def _descartar(arquivo, caminho: str):
+    arquivo.close()
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+def _listar_diretorio(diretorio: str) -> list:
+    entradas = []
+    with os.scandir(diretorio) as it:
+        for entrada in it:
+            if entrada.is_dir(follow_symlinks=False):
+                entradas.append((entrada.name, True, 0, 0.0))
+            elif entrada.is_file(follow_symlinks=False):
+                st = entrada.stat(follow_symlinks=False)
+                entradas.append((entrada.name, False, st.st_size, st.st_mtime))
+    return entradas
+
+
+# --- API S3 (AWS, MinIO e compatíveis), com assinatura SigV4 ---
+
+SEM_PAYLOAD = "UNSIGNED-PAYLOAD"
+_NS_S3 = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def _codificar(valor: str, seguros: str = "-_.~") -> str:
+    return quote(valor, safe=seguros)
+
+def _hmac(chave: bytes, mensagem: str) -> bytes:
+    return hmac.new(chave, mensagem.encode(), hashlib.sha256).digest()
+
+
+class ArmazenamentoS3(Armazenamento):
+    """Driver para a API S3 usando httpx (endereçamento por caminho: <endpoint>/<bucket>/<chave>)."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        regiao: str = "us-east-1",
+        prefixo: str = "",
+        expiracao: int = 900,
+        endpoint_publico: Optional[str] = None
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.endpoint_publico = (endpoint_publico or endpoint).rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.regiao = regiao
+        self.prefixo = prefixo.strip("/") + "/" if prefixo.strip("/") else ""
+        self.expiracao = expiracao
+        self.host = httpx.URL(self.endpoint).netloc.decode()
+        self.host_publico = httpx.URL(self.endpoint_publico).netloc.decode()
+        self._cliente: Optional[httpx.AsyncClient] = None
+
+    @property
+    def cliente(self) -> httpx.AsyncClient:
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=300.0))
+        return self._cliente
+
+    async def encerrar(self):
+        cliente, self._cliente = self._cliente, None
+        if cliente is not None:
+            await cliente.aclose()
+
+    # --- Assinatura ---
+    def _caminho_uri(self, chave: Optional[str]) -> str:
+        caminho = f"/{_codificar(self.bucket)}"
+        if chave is not None:
+            caminho += "/" + _codificar(self.prefixo + chave, "-_.~/")
+        return caminho
+
+    def _assinatura(self, metodo: str, caminho: str, query: Dict[str, str], headers: Dict[str, str], payload: str, quando: datetime):
+        data = quando.strftime("%Y%m%d")
+        escopo = f"{data}/{self.regiao}/s3/aws4_request"
+        nomes = sorted(k.lower() for k in headers)
+        valores = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+        requisicao_canonica = "\n".join([
+            metodo,
+            caminho,
+            "&".join(f"{_codificar(k)}={_codificar(v)}" for k, v in sorted(query.items())),
+            "".join(f"{n}:{valores[n]}\n" for n in nomes),
+            ";".join(nomes),
+            payload,
+        ])
+        texto = "\n".join([
+            "AWS4-HMAC-SHA256",
+            quando.strftime("%Y%m%dT%H%M%SZ"),
+            escopo,
+            hashlib.sha256(requisicao_canonica.encode()).hexdigest(),
+        ])
+        chave = _hmac(_hmac(_hmac(_hmac(f"AWS4{self.secret_key}".encode(), data), self.regiao), "s3"), "aws4_request")
+        return escopo, ";".join(nomes), hmac.new(chave, texto.encode(), hashlib.sha256).hexdigest()
+
+    def _pre_assinar(self, metodo: str, chave: str, headers: Optional[Dict[str, str]] = None, query: Optional[Dict[str, str]] = None, quando: Optional[datetime] = None) -> str:
+        quando = quando or datetime.now(timezone.utc)
+        # Quem usa a URL é o navegador: o host assinado é o que ele acessa
+        headers = {"host": self.host_publico, **(headers or {})}
+        query = dict(query or {})
+        query.update({
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{quando.strftime('%Y%m%d')}/{self.regiao}/s3/aws4_request",
+            "X-Amz-Date": quando.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": str(self.expiracao),
+            "X-Amz-SignedHeaders": ";".join(sorted(k.lower() for k in headers)),
+        })
+        caminho = self._caminho_uri(chave)
+        _, _, assinatura = self._assinatura(metodo, caminho, query, headers, SEM_PAYLOAD, quando)
+        query["X-Amz-Signature"] = assinatura
+        return f"{self.endpoint_publico}{caminho}?" + "&".join(f"{_codificar(k)}={_codificar(v)}" for k, v in query.items())
+
+    async def _requisicao(self, metodo: str, chave: Optional[str], query: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None, conteudo=None, stream: bool = False):
+        quando = datetime.now(timezone.utc)
+        query = query or {}
+        assinados = {
+            "host": self.host,
+            "x-amz-date": quando.strftime("%Y%m%dT%H%M%SZ"),
+            "x-amz-content-sha256": SEM_PAYLOAD,
+            **{k.lower(): v for k, v in (headers or {}).items()},
+        }
+        caminho = self._caminho_uri(chave)
+        escopo, nomes, assinatura = self._assinatura(metodo, caminho, query, assinados, SEM_PAYLOAD, quando)
+        assinados["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{escopo}, SignedHeaders={nomes}, Signature={assinatura}"
+        )
+        assinados.pop("host")
+        url = f"{self.endpoint}{caminho}"
+        if query:
+            url += "?" + "&".join(f"{_codificar(k)}={_codificar(v)}" for k, v in sorted(query.items()))
+        requisicao = self.cliente.build_request(metodo, url, headers=assinados, content=conteudo)
+        return await self.cliente.send(requisicao, stream=stream)
+
+    # --- Operações ---
+    async def info(self, chave: str) -> Optional[ObjetoArmazenado]:
+        resposta = await self._requisicao("HEAD", chave)
+        if resposta.status_code == 404:
+            return None
+        resposta.raise_for_status()
+        return ObjetoArmazenado(
+            chave,
+            int(resposta.headers.get("content-length", 0)),
+            parsedate_to_datetime(resposta.headers["last-modified"]) if "last-modified" in resposta.headers else datetime.now(timezone.utc)
+        )
+
+    async def gravar(self, chave: str, blocos: AsyncIterator[bytes], tamanho: int, mime_type: str):
+        # Tamanho conhecido: o PUT vai com Content-Length (sem chunked) e o S3 só publica o objeto completo
+        resposta = await self._requisicao(
+            "PUT", chave,
+            headers={"content-length": str(tamanho), "content-type": mime_type},
+            conteudo=blocos
+        )
+        resposta.raise_for_status()
+
+    async def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> AsyncIterator[bytes]:
+        headers = {}
+        if inicio or fim is not None:
+            headers["range"] = f"bytes={inicio}-{'' if fim is None else fim}"
+        resposta = await self._requisicao("GET", chave, headers=headers, stream=True)
+        try:
+            resposta.raise_for_status()
+            async for bloco in resposta.aiter_bytes(settings.EVIDENCE_CHUNK_BYTES):
+                yield bloco
+        finally:
+            await resposta.aclose()
+
+    async def remover(self, chave: str):
+        resposta = await self._requisicao("DELETE", chave)
+        if resposta.status_code != 404:
+            resposta.raise_for_status()
+
+    async def tocar(self, chave: str, mime_type: str) -> bool:
+        # CopyObject do objeto sobre ele mesmo (cópia no servidor): só é aceito trocando os metadados
+        resposta = await self._requisicao(
+            "PUT", chave,
+            headers={
+                "x-amz-copy-source": self._caminho_uri(chave),
+                "x-amz-metadata-directive": "REPLACE",
+                "content-type": mime_type,
+            }
+        )
+        if resposta.status_code == 404:
+            return False
+        resposta.raise_for_status()
+        return True
+
+    async def listar(self, prefixo: str = "") -> AsyncIterator[ObjetoArmazenado]:
+        """ListObjectsV2 página a página (até 1000 chaves por requisição)."""
+        continuacao = None
+        while True:
+            query = {"list-type": "2", "prefix": self.prefixo + prefixo}
+            if continuacao:
+                query["continuation-token"] = continuacao
+            resposta = await self._requisicao("GET", None, query=query)
+            resposta.raise_for_status()
+            raiz = ET.fromstring(resposta.content)
+            for item in raiz.iter(f"{_NS_S3}Contents"):
+                chave = item.findtext(f"{_NS_S3}Key")[len(self.prefixo):]
+                if chave.split("/")[0] == DIRETORIO_TEMPORARIO:
+                    continue
+                yield ObjetoArmazenado(
+                    chave,
+                    int(item.findtext(f"{_NS_S3}Size") or 0),
+                    datetime.fromisoformat(item.findtext(f"{_NS_S3}LastModified").replace("Z", "+00:00"))
+                )
+            if raiz.findtext(f"{_NS_S3}IsTruncated") != "true":
+                break
+            continuacao = raiz.findtext(f"{_NS_S3}NextContinuationToken")
+
+    def url_download(self, chave: str, nome_download: Optional[str] = None, media_type: Optional[str] = None) -> Optional[str]:
+        query = {}
+        if nome_download:
+            query["response-content-disposition"] = f"attachment; filename*=utf-8''{quote(nome_download)}"
+        if media_type:
+            query["response-content-type"] = media_type
+        return self._pre_assinar("GET", chave, query=query)
+
+    def url_upload(self, chave: str, mime_type: str, sha256: str) -> Optional[dict]:
+        # O checksum entra na assinatura: o S3 recusa um corpo cujo SHA-256 não seja o anunciado
+        headers = {
+            "content-type": mime_type,
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        return {"metodo": "PUT", "url": self._pre_assinar("PUT", chave, headers=headers), "headers": headers}
+
+
+_armazenamento: Optional[Armazenamento] = None
+
+
+def obter_armazenamento() -> Armazenamento:
+    """Driver configurado em EVIDENCE_STORAGE ("local" ou "s3"), criado no primeiro uso."""
+    global _armazenamento
+    if _armazenamento is None:
+        if settings.EVIDENCE_STORAGE == "s3":
+            _armazenamento = ArmazenamentoS3(
+                endpoint=settings.S3_ENDPOINT_URL or f"https://s3.{settings.S3_REGION}.amazonaws.com",
+                bucket=settings.S3_BUCKET,
+                access_key=settings.S3_ACCESS_KEY_ID,
+                secret_key=settings.S3_SECRET_ACCESS_KEY,
+                regiao=settings.S3_REGION,
+                prefixo=settings.S3_PREFIX,
+                expiracao=settings.S3_PRESIGN_EXPIRES_SECONDS,
+                endpoint_publico=settings.S3_PUBLIC_ENDPOINT_URL
+            )
+        else:
+            _armazenamento = ArmazenamentoLocal(settings.EVIDENCE_DIR)
+    return _armazenamento
+
+async def encerrar_armazenamento():
+    global _armazenamento
+    armazenamento, _armazenamento = _armazenamento, None
+    if armazenamento is not None:
+        await armazenamento.encerrar()
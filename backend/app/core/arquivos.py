@@ -0,0 +1,173 @@
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException, Request, Response, status
+from starlette.types import Receive, Scope, Send
+
+BLOCO_LEITURA = 256 * 1024
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "public, no-cache"
+
+_INTERVALO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RespostaArquivo(Response):
+    """Envia um arquivo inteiro ou um intervalo dele.
+
+    Usa as extensões ASGI de envio sem cópia quando o servidor as anuncia
+    ("http.response.zerocopysend" para qualquer intervalo, "http.response.pathsend" para o
+    arquivo inteiro); sem elas, lê em blocos numa thread.
+    """
+
+    def __init__(self, caminho: str, inicio: int, fim: int, tamanho: int, status_code: int, headers: dict):
+        self.caminho = caminho
+        self.inicio = inicio
+        self.quantidade = fim - inicio + 1
+        self.completo = inicio == 0 and self.quantidade == tamanho
+        super().__init__(status_code=status_code, headers=headers)
+        self.headers["content-length"] = str(self.quantidade)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        extensoes = scope.get("extensions") or {}
+
+        if scope["method"].upper() == "HEAD" or self.quantidade == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif self.completo and "http.response.pathsend" in extensoes:
+            await send({"type": "http.response.pathsend", "path": self.caminho})
+        else:
+            async with await anyio.open_file(self.caminho, mode="rb") as arquivo:
+                if "http.response.zerocopysend" in extensoes:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": arquivo.wrapped,
+                        "offset": self.inicio,
+                        "count": self.quantidade,
+                        "more_body": False,
+                    })
+                    return
+                await arquivo.seek(self.inicio)
+                restante = self.quantidade
+                while restante > 0:
+                    bloco = await arquivo.read(min(BLOCO_LEITURA, restante))
+                    if not bloco:
+                        break
+                    restante -= len(bloco)
+                    await send({"type": "http.response.body", "body": bloco, "more_body": restante > 0})
+                if restante > 0:
+                    # Arquivo encolheu durante o envio: encerra a resposta mesmo incompleta
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _lista_etags(valor: str) -> list[str]:
+    return [t.strip().removeprefix("W/") for t in valor.split(",") if t.strip()]
+
+def _nao_modificado(request: Request, etag: str, modificado_em: float) -> bool:
+    """If-None-Match tem precedência; If-Modified-Since só vale sem ele (RFC 9110, 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in _lista_etags(if_none_match)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modificado_em) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _intervalo(request: Request, etag: str, modificado_em: float, tamanho: int) -> Optional[Tuple[int, int]]:
+    """(início, fim) pedido em Range, ou None para enviar o arquivo inteiro.
+
+    Só um intervalo é atendido; pedidos com vários recebem o arquivo inteiro (permitido pela RFC).
+    Intervalo impossível responde 416.
+    """
+    cabecalho = request.headers.get("range")
+    if not cabecalho or request.method.upper() not in ("GET", "HEAD"):
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range.strip() != etag:
+                return None
+        else:
+            try:
+                if parsedate_to_datetime(if_range).timestamp() < int(modificado_em):
+                    return None
+            except (TypeError, ValueError):
+                return None
+
+    encontrado = _INTERVALO.match(cabecalho.strip())
+    if not encontrado:
+        return None
+    inicio_txt, fim_txt = encontrado.groups()
+    if inicio_txt:
+        inicio = int(inicio_txt)
+        fim = min(int(fim_txt), tamanho - 1) if fim_txt else tamanho - 1
+    elif fim_txt:
+        # "bytes=-N": os últimos N bytes
+        inicio = max(tamanho - int(fim_txt), 0)
+        fim = tamanho - 1
+    else:
+        return None
+
+    if tamanho == 0 or inicio >= tamanho or inicio > fim:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Intervalo fora do arquivo",
+            headers={"Content-Range": f"bytes */{tamanho}"}
+        )
+    return inicio, fim
+
+
+async def servir_arquivo(
+    request: Request,
+    caminho: str,
+    *,
+    etag: Optional[str] = None,
+    imutavel: bool = False,
+    media_type: Optional[str] = None,
+    nome_download: Optional[str] = None
+) -> Response:
+    """Resposta de arquivo com Range, ETag/Last-Modified e GET condicional.
+
+    `etag` deve identificar o conteúdo (o hash, para objetos endereçados por conteúdo);
+    sem ele, é derivado de tamanho e data de modificação. `imutavel` libera cache de longo prazo.
+    """
+    try:
+        info = await anyio.to_thread.run_sync(os.stat, caminho)
+    except (FileNotFoundError, NotADirectoryError):
+        info = None
+    if info is None or not stat.S_ISREG(info.st_mode):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    etag = etag or f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(info.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR,
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+        # Conteúdo enviado por usuários: um SVG ou HTML aberto direto não roda script na origem da API
+        "Content-Security-Policy": "sandbox",
+    }
+    if _nao_modificado(request, etag, info.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Type"] = media_type or mimetypes.guess_type(caminho)[0] or "application/octet-stream"
+    if nome_download:
+        headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(nome_download)}"
+
+    intervalo = _intervalo(request, etag, info.st_mtime, info.st_size)
+    if intervalo is None:
+        return RespostaArquivo(caminho, 0, info.st_size - 1, info.st_size, status.HTTP_200_OK, headers)
+
+    inicio, fim = intervalo
+    headers["Content-Range"] = f"bytes {inicio}-{fim}/{info.st_size}"
+    return RespostaArquivo(caminho, inicio, fim, info.st_size, status.HTTP_206_PARTIAL_CONTENT, headers)
@@ -0,0 +1,50 @@
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.outbox import registrar_evento, EVENTO_AUDITORIA
+from app.schemas.log import LogCreate
+
+logger = logging.getLogger(__name__)
+
+# Chave em session.info: ação preparada pelo endpoint, ainda não enfileirada no outbox
+AUDITORIA_PENDENTE = "auditoria_pendente"
+
+# Recebe o registro gravado e devolve os campos do log que dependem dele (id, nome...)
+Montagem = Callable[[Any], Union[dict, Awaitable[dict]]]
+
+
+def preparar_auditoria(db: AsyncSession, dados: dict, montar: Optional[Montagem] = None):
+    """Guarda na sessão a ação a auditar; ela entra na transação da escrita (enfileirar_auditoria)."""
+    db.info[AUDITORIA_PENDENTE] = (dados, montar)
+
+async def enfileirar_auditoria(db: AsyncSession, registro: Any = None) -> bool:
+    """Adiciona à transação corrente o evento da ação preparada, se houver.
+
+    Os repositórios chamam logo antes do commit da escrita auditada: o log e a escrita
+    confirmam (ou falham) juntos. Uma falha ao montar o log não derruba a escrita.
+    """
+    pendente = db.info.pop(AUDITORIA_PENDENTE, None)
+    if pendente is None:
+        return False
+    dados, montar = pendente
+    if montar is not None:
+        # Garante o id (e os padrões do banco) de um registro recém-adicionado
+        await db.flush()
+    try:
+        if montar is not None:
+            complemento = montar(registro)
+            if inspect.isawaitable(complemento):
+                complemento = await complemento
+            dados = {**dados, **complemento}
+        projeto_id = dados.pop("projeto_id", None)
+        ciclo_id = dados.pop("ciclo_id", None)
+        log = LogCreate(**dados)
+    except Exception as e:
+        logger.warning(f"Falha ao montar o log de auditoria ({dados.get('acao')} {dados.get('entidade')}): {e}")
+        return False
+    # Sem sistema_id, o despachante o obtém do projeto_id ou do ciclo_id na entrega
+    registrar_evento(db, EVENTO_AUDITORIA, **log.model_dump(), projeto_id=projeto_id, ciclo_id=ciclo_id)
+    return True
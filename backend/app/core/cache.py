@@ -0,0 +1,230 @@
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.eventos import barramento
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+# Chave em session.info onde os repositórios acumulam os escopos alterados na transação
+ESCOPOS_ALTERADOS = "escopos_alterados"
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, chave: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def set(self, chave: str, valor: str, ttl: int, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> int: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache em processo com TTL e descarte LRU. Cada worker do uvicorn tem o seu."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._itens: "OrderedDict[str, tuple[float, str, tuple]]" = OrderedDict()
+        self._tags: Dict[str, set] = defaultdict(set)
+
+    def _remover(self, chave: str):
+        item = self._itens.pop(chave, None)
+        if item:
+            for tag in item[2]:
+                self._tags[tag].discard(chave)
+
+    async def get(self, chave: str) -> Optional[str]:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        expira_em, valor, _ = item
+        if expira_em < time.monotonic():
+            self._remover(chave)
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+
+    async def set(self, chave: str, valor: str, ttl: int, tags: Iterable[str]) -> None:
+        self._remover(chave)
+        tags = tuple(tags)
+        self._itens[chave] = (time.monotonic() + ttl, valor, tags)
+        for tag in tags:
+            self._tags[tag].add(chave)
+        while len(self._itens) > self.max_entries:
+            self._remover(next(iter(self._itens)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removidos = 0
+        for tag in tags:
+            for chave in list(self._tags.pop(tag, ())):
+                self._remover(chave)
+                removidos += 1
+        return removidos
+
+    async def clear(self) -> None:
+        self._itens.clear()
+        self._tags.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend compartilhado entre workers, para qualquer servidor que fale o protocolo Redis.
+
+    O descarte LRU fica a cargo do servidor (maxmemory-policy allkeys-lru).
+    Requer o pacote opcional `redis`.
+    """
+
+    PREFIXO = "veritus:cache:"
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote 'redis' instalado.") from e
+        self.client = redis_asyncio.from_url(url, decode_responses=True)
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.PREFIXO}tag:{tag}"
+
+    async def get(self, chave: str) -> Optional[str]:
+        return await self.client.get(self.PREFIXO + chave)
+
+    async def set(self, chave: str, valor: str, ttl: int, tags: Iterable[str]) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.PREFIXO + chave, valor, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), chave)
+                pipe.expire(self._tag(tag), ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removidos = 0
+        for tag in tags:
+            chaves = await self.client.smembers(self._tag(tag))
+            if chaves:
+                removidos += await self.client.delete(*[self.PREFIXO + c for c in chaves])
+            await self.client.delete(self._tag(tag))
+        return removidos
+
+    async def clear(self) -> None:
+        async for chave in self.client.scan_iter(match=self.PREFIXO + "*"):
+            await self.client.delete(chave)
+
+
+def tags_sistema(sistema_id: Optional[int]) -> list[str]:
+    return [f"sistema:{sistema_id}" if sistema_id else "sistema:*"]
+
+def tags_usuario(usuario_id: Optional[int]) -> list[str]:
+    return [f"usuario:{usuario_id}" if usuario_id else "usuario:*"]
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def montar_chave(endpoint: str, **escopo: Any) -> str:
+        partes = [f"{k}={escopo[k]}" for k in sorted(escopo)]
+        return ":".join([endpoint, *partes])
+
+    async def get_or_set(
+        self,
+        endpoint: str,
+        modelo: Type[T],
+        calcular: Callable[[], Awaitable[T]],
+        tags: Iterable[str],
+        **escopo: Any
+    ) -> T:
+        chave = self.montar_chave(endpoint, **escopo)
+        try:
+            em_cache = await self.backend.get(chave)
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache ({chave}): {e}")
+            em_cache = None
+
+        if em_cache is not None:
+            self.hits[endpoint] += 1
+            return modelo.model_validate_json(em_cache)
+
+        self.misses[endpoint] += 1
+        resposta = await calcular()
+        try:
+            await self.backend.set(chave, resposta.model_dump_json(), self.ttl, tags)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache ({chave}): {e}")
+        return resposta
+
+    async def invalidate(self, sistema_ids: Iterable[Optional[int]] = (), usuario_ids: Iterable[Optional[int]] = ()):
+        """Invalida as visões afetadas por uma escrita. As visões globais (sem filtro) sempre caem juntas."""
+        tags = {"sistema:*", "usuario:*"}
+        tags.update(f"sistema:{s}" for s in sistema_ids if s)
+        tags.update(f"usuario:{u}" for u in usuario_ids if u)
+        try:
+            await self.backend.invalidate_tags(tags)
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar cache ({tags}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = sorted(set(self.hits) | set(self.misses))
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_segundos": self.ttl,
+            "endpoints": {
+                e: {"hits": self.hits[e], "misses": self.misses[e]} for e in endpoints
+            },
+            "total_hits": sum(self.hits.values()),
+            "total_misses": sum(self.misses.values()),
+        }
+
+
+def _criar_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        if not settings.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_BACKEND=redis requer CACHE_REDIS_URL.")
+        return RedisCacheBackend(settings.CACHE_REDIS_URL)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_criar_backend(), settings.CACHE_TTL_SECONDS)
+
+
+# --- Integração com os repositórios de escrita ---
+
+def marcar_alteracao(db: AsyncSession, sistema_id: Optional[int] = None, usuario_id: Optional[int] = None):
+    """Registra na sessão um escopo (sistema, usuário) tocado pela transação corrente."""
+    db.info.setdefault(ESCOPOS_ALTERADOS, set()).add((sistema_id, usuario_id))
+
+async def invalidar_alteracoes(db: AsyncSession):
+    """Após o commit, invalida as respostas em cache dos escopos marcados na sessão
+    e publica a alteração no barramento de eventos (streams SSE e demais workers)."""
+    escopos = db.info.pop(ESCOPOS_ALTERADOS, None)
+    if not escopos:
+        return
+    sistemas = sorted({s for s, _ in escopos if s})
+    usuarios = sorted({u for _, u in escopos if u})
+    await response_cache.invalidate(sistema_ids=sistemas, usuario_ids=usuarios)
+    await barramento.publicar({"sistemas": sistemas, "usuarios": usuarios})
+
+async def _invalidar_evento(evento: dict):
+    # Eventos vindos de outros workers: o cache em memória deste worker também precisa cair
+    await response_cache.invalidate(
+        sistema_ids=evento.get("sistemas", ()),
+        usuario_ids=evento.get("usuarios", ())
+    )
+
+barramento.ao_receber(_invalidar_evento)
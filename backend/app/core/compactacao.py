@@ -0,0 +1,65 @@
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Tuple
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+
+# (nome no arquivo, data de modificação, conteúdo em blocos, comprimir)
+EntradaZip = Tuple[str, datetime, AsyncIterator[bytes], bool]
+
+
+class _Saida:
+    """Destino sem seek para o zipfile: guarda o que foi escrito até ser drenado.
+
+    Sem seek, o zipfile grava tamanhos e CRC num descritor depois de cada arquivo,
+    então nada precisa ser conhecido antes de o conteúdo passar.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+async def zip_em_fluxo(entradas: AsyncIterator[EntradaZip]) -> AsyncIterator[bytes]:
+    """Gera um ZIP (ZIP64) à medida que as entradas chegam, sem arquivo temporário.
+
+    A memória fica limitada a um bloco por vez, qualquer que seja o tamanho total.
+    """
+    saida = _Saida()
+    with zipfile.ZipFile(saida, mode="w", allowZip64=True) as arquivo_zip:
+        async for nome, modificado_em, blocos, comprimir in entradas:
+            info = zipfile.ZipInfo(nome, date_time=max(modificado_em.timetuple()[:6], (1980, 1, 1, 0, 0, 0)))
+            info.compress_type = zipfile.ZIP_DEFLATED if comprimir else zipfile.ZIP_STORED
+            with arquivo_zip.open(info, mode="w", force_zip64=True) as destino:
+                async for bloco in blocos:
+                    destino.write(bloco)
+                    if dados := saida.drenar():
+                        yield dados
+            if dados := saida.drenar():
+                yield dados
+    # Diretório central, gravado no fechamento
+    if dados := saida.drenar():
+        yield dados
+
+
+def resposta_zip(conteudo: AsyncIterator[bytes], nome_arquivo: str) -> StreamingResponse:
+    return StreamingResponse(
+        conteudo,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(nome_arquivo)}",
+            "Cache-Control": "no-store",
+        }
+    )
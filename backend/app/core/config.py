@@ -46,6 +46,69 @@ class Settings(BaseSettings):
 
         return url
 
+    # Cache de respostas do dashboard ("memory" ou "redis")
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_REDIS_URL: str | None = None
+
+    # Consultas paralelas do dashboard (sessões simultâneas por requisição)
+    FANOUT_MAX_CONCURRENCY: int = 4
+    FANOUT_QUERY_TIMEOUT_SECONDS: float = 10.0
+
+    # Stream SSE de eventos (/eventos/stream)
+    SSE_KEEPALIVE_SECONDS: int = 15
+    SSE_RETRY_MS: int = 3000
+
+    # Paginação por cursor das listagens (?cursor=&limit=)
+    PAGINATION_DEFAULT_LIMIT: int = 50
+    PAGINATION_MAX_LIMIT: int = 500
+
+    # Outbox de eventos de domínio (despachante no lifespan)
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2.0
+    OUTBOX_LEASE_SECONDS: int = 60
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETENTION_HOURS: int = 24
+
+    # Upload de evidências (gravado em blocos por um pool limitado de threads)
+    EVIDENCE_DIR: str = "evidencias"
+    EVIDENCE_MAX_BYTES: int = 100 * 1024 * 1024
+    EVIDENCE_ALLOWED_TYPES: str = "image/*,video/*,application/pdf,text/plain"
+    EVIDENCE_CHUNK_BYTES: int = 1024 * 1024
+    EVIDENCE_IO_THREADS: int = 4
+    # Base das URLs gravadas nas evidências
+    EVIDENCE_PUBLIC_URL: str = "http://localhost:8000"
+
+    # Armazenamento das evidências: "local" (EVIDENCE_DIR) ou "s3" (AWS, MinIO e compatíveis)
+    EVIDENCE_STORAGE: str = "local"
+    S3_ENDPOINT_URL: str | None = None
+    # Endereço do S3 nas URLs pré-assinadas, quando o navegador não o alcança pelo S3_ENDPOINT_URL
+    # (ex.: MinIO no Docker: a API usa http://minio:9000, o navegador http://localhost:9000)
+    S3_PUBLIC_ENDPOINT_URL: str | None = None
+    S3_BUCKET: str | None = None
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str | None = None
+    S3_SECRET_ACCESS_KEY: str | None = None
+    S3_PREFIX: str = ""
+    S3_PRESIGN_EXPIRES_SECONDS: int = 900
+
+    # Upload retomável em blocos (gravações de tela e outros arquivos grandes)
+    EVIDENCE_RESUMABLE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    EVIDENCE_UPLOAD_BLOCK_BYTES: int = 8 * 1024 * 1024
+    EVIDENCE_UPLOAD_EXPIRES_HOURS: int = 24
+
+    # Coleta de evidências órfãs (python -m app.coletar_evidencias)
+    EVIDENCE_GC_GRACE_HOURS: int = 7 * 24
+    EVIDENCE_GC_BATCH_SIZE: int = 1000
+    EVIDENCE_GC_DELETES_PER_SECOND: float = 50.0
+    EVIDENCE_GC_PAUSE_SECONDS: float = 0.05
+
+    # Miniaturas e prévias de imagens (geradas num pool de processos, fora do event loop)
+    THUMBNAIL_SIZE_PX: int = 320
+    PREVIEW_SIZE_PX: int = 1280
+    THUMBNAIL_WORKERS: int = 2
+
     PROJECT_NAME: str = "Projeto GE"
     API_V1_STR: str = "/api/v1"
 
@@ -1,6 +1,7 @@
 import logging
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
 
 logger = logging.getLogger(__name__)
 
@@ -20,4 +21,22 @@ def tratar_erro_integridade(e: IntegrityError, mensagens_personalizadas: dict[st
     raise HTTPException(
         status_code=status.HTTP_409_CONFLICT,
         detail="Operação negada devido a conflito de dados (violação de integridade)."
-    )
\ No newline at end of file
+    )
+
+class ConflitoVersao(Exception):
+    """O registro mudou (outra requisição) depois da versão lida ou informada pelo cliente."""
+
+    def __init__(self, entidade: str, id: int):
+        self.entidade = entidade
+        self.id = id
+        super().__init__(f"{entidade} {id} foi alterado por outra requisição")
+
+def erro_conflito_versao(atual) -> HTTPException:
+    """409 com o estado atual, para o cliente reaplicar a alteração sobre ele."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "mensagem": "O registro foi alterado por outra pessoa. Recarregue e tente novamente.",
+            "atual": jsonable_encoder(atual)
+        }
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Canal do LISTEN/NOTIFY compartilhado entre os workers
+CANAL = "veritus_eventos"
+
+Evento = Dict[str, Any]
+Tratador = Callable[[Evento], Awaitable[None]]
+
+
+class BarramentoEventos:
+    """Pub/sub em processo para as alterações de dados, com fan-out entre workers.
+
+    No Postgres, cada publicação vira um NOTIFY e todo worker (inclusive o que publicou)
+    recebe o evento pelo LISTEN; em outros bancos a entrega é só local.
+    Os tratadores registrados rodam antes da entrega às filas dos assinantes.
+    """
+
+    def __init__(self, tamanho_fila: int = 100):
+        self.tamanho_fila = tamanho_fila
+        self._assinantes: Set[asyncio.Queue] = set()
+        self._tratadores: List[Tratador] = []
+        self._tarefas: Set[asyncio.Task] = set()
+        self._conexao: Optional[AsyncConnection] = None
+        self._driver = None
+        self._encerrando = False
+
+    # --- Assinantes (ex.: streams SSE) ---
+    def assinar(self) -> asyncio.Queue:
+        fila: asyncio.Queue = asyncio.Queue(maxsize=self.tamanho_fila)
+        self._assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila: asyncio.Queue):
+        self._assinantes.discard(fila)
+
+    def ao_receber(self, tratador: Tratador):
+        self._tratadores.append(tratador)
+
+    async def _processar(self, evento: Evento):
+        for tratador in self._tratadores:
+            try:
+                await tratador(evento)
+            except Exception as e:
+                logger.warning(f"Falha no tratador de eventos: {e}")
+        for fila in list(self._assinantes):
+            try:
+                fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Assinante lento: o próximo evento recalcula o estado completo
+                pass
+
+    # --- Publicação ---
+    async def publicar(self, evento: Evento):
+        if self._conexao is not None:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(select(func.pg_notify(CANAL, json.dumps(evento))))
+                    await conn.commit()
+                return
+            except Exception as e:
+                logger.warning(f"Falha no NOTIFY, entregando só localmente: {e}")
+        await self._processar(evento)
+
+    def _ao_notificar(self, conexao, pid, canal, payload: str):
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            return
+        tarefa = asyncio.get_running_loop().create_task(self._processar(evento))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    # --- Ciclo de vida (lifespan) ---
+    async def iniciar(self):
+        if engine.dialect.name != "postgresql":
+            return
+        self._encerrando = False
+        try:
+            self._conexao = await engine.connect()
+            bruta = await self._conexao.get_raw_connection()
+            self._driver = bruta.driver_connection
+            await self._driver.add_listener(CANAL, self._ao_notificar)
+            self._driver.add_termination_listener(self._ao_perder_conexao)
+        except Exception as e:
+            logger.warning(f"LISTEN indisponível, eventos ficam restritos a este worker: {e}")
+            await self._fechar()
+
+    def _ao_perder_conexao(self, conexao):
+        if self._encerrando:
+            return
+        logger.warning("Conexão do LISTEN perdida; reconectando.")
+        tarefa = asyncio.get_running_loop().create_task(self._reconectar())
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _reconectar(self, espera: float = 5.0):
+        await self._fechar()
+        await asyncio.sleep(espera)
+        if not self._encerrando:
+            await self.iniciar()
+
+    async def _fechar(self):
+        conexao, driver = self._conexao, self._driver
+        self._conexao, self._driver = None, None
+        if driver is not None and not driver.is_closed():
+            try:
+                await driver.remove_listener(CANAL, self._ao_notificar)
+                driver.remove_termination_listener(self._ao_perder_conexao)
+            except Exception:
+                pass
+        if conexao is not None:
+            try:
+                await conexao.close()
+            except Exception:
+                pass
+
+    async def encerrar(self):
+        self._encerrando = True
+        await self._fechar()
+
+
+barramento = BarramentoEventos()
@@ -0,0 +1,330 @@
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from collections import Counter
+from fnmatch import fnmatch
+from typing import AsyncIterator, Iterable, Iterator, Optional, Union
+from urllib.parse import unquote, urlsplit
+
+from fastapi import HTTPException, Request, Response, UploadFile, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy import case, event, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, attributes
+
+from app.core.armazenamento import em_thread, normalizar_chave, obter_armazenamento
+from app.core.arquivos import servir_arquivo
+from app.core.config import settings
+from app.models.evidencia import ObjetoEvidencia
+from app.models.testing import Defeito, ExecucaoPasso
+
+# Objeto na chave ab/cd/<sha256><ext>: os dois primeiros bytes do hash viram subdiretórios
+PADRAO_OBJETO = re.compile(r"(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$")
+# Objeto ou uma de suas variantes (ab/cd/<sha256>.miniatura.webp)
+PADRAO_ARMAZENADO = re.compile(r"([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(?:\.[A-Za-z0-9]+)*")
+GENERICO = "application/octet-stream"
+# Área dos blocos de uploads retomáveis ainda não concluídos (nunca servida publicamente)
+DIRETORIO_UPLOADS = "_uploads"
+
+# Assinaturas (bytes iniciais) usadas quando o cliente não informa o tipo
+ASSINATURAS = [
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF8", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (0, b"%PDF", "application/pdf"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+]
+
+def tipos_permitidos() -> list[str]:
+    return [t.strip() for t in settings.EVIDENCE_ALLOWED_TYPES.split(",") if t.strip()]
+
+def tipo_declarado(content_type: Optional[str], nome: Optional[str]) -> str:
+    """Tipo MIME informado pelo cliente ou, se genérico, o da extensão do nome."""
+    mime_type = (content_type or "").split(";")[0].strip().lower()
+    if not mime_type or mime_type == GENERICO:
+        mime_type = mimetypes.guess_type(nome or "")[0] or GENERICO
+    return mime_type
+
+def tipo_por_assinatura(inicio: bytes) -> str:
+    for posicao, assinatura, tipo in ASSINATURAS:
+        if inicio[posicao:posicao + len(assinatura)] == assinatura:
+            return tipo
+    return GENERICO
+
+def identificar_tipo(file: UploadFile, inicio: bytes) -> str:
+    """Tipo MIME do upload: o declarado pelo cliente, o da extensão ou o da assinatura do conteúdo."""
+    mime_type = tipo_declarado(file.content_type, file.filename)
+    return tipo_por_assinatura(inicio) if mime_type == GENERICO else mime_type
+
+def tipo_permitido(mime_type: str) -> bool:
+    return any(fnmatch(mime_type, padrao) for padrao in tipos_permitidos())
+
+def validar_tipo(mime_type: str):
+    if not tipo_permitido(mime_type):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Tipo de arquivo não permitido: {mime_type}."
+        )
+
+def _erro_tamanho(limite: Optional[int] = None) -> HTTPException:
+    limite_mb = (limite or settings.EVIDENCE_MAX_BYTES) / (1024 * 1024)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Arquivo excede o limite de {limite_mb:.0f} MB."
+    )
+
+def validar_tamanho(tamanho: int, limite: Optional[int] = None):
+    if tamanho > (limite or settings.EVIDENCE_MAX_BYTES):
+        raise _erro_tamanho(limite)
+
+def definir_extensao(nome: Optional[str], mime_type: str) -> str:
+    """Extensão do nome enviado pelo cliente, se corresponder ao tipo MIME validado; senão, a do tipo.
+
+    Sem a conferência, um `.html` declarado como `image/png` passaria pela lista de tipos
+    permitidos e seria gravado (e servido) como HTML.
+    """
+    extensao = os.path.splitext(nome or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,10}", extensao) or mimetypes.guess_type(f"arquivo{extensao}")[0] != mime_type:
+        extensao = mimetypes.guess_extension(mime_type) or ""
+    return extensao
+
+def _hash_bloco(digest, bloco: bytes):
+    # hashlib libera o GIL em blocos grandes, então o hash não segura o event loop
+    digest.update(bloco)
+
+
+# --- Endereçamento por conteúdo ---
+
+def chave_objeto(sha256: str, extensao: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao}"
+
+def validar_chave(chave: str) -> tuple[str, Optional[str]]:
+    """Chave normalizada e o hash, se for um objeto por conteúdo; chave inválida responde 404."""
+    normalizada = normalizar_chave(chave)
+    if normalizada is None or normalizada.split("/")[0] == DIRETORIO_UPLOADS:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    encontrado = PADRAO_OBJETO.fullmatch(normalizada)
+    if encontrado and encontrado.group(3).startswith(encontrado.group(1) + encontrado.group(2)):
+        return normalizada, encontrado.group(3)
+    return normalizada, None
+
+def chave_bloco_upload(upload_id: str, indice: int) -> str:
+    return f"{DIRETORIO_UPLOADS}/{upload_id}/{indice:06d}"
+
+def url_objeto(chave: str) -> str:
+    return f"{settings.EVIDENCE_PUBLIC_URL}/evidencias/{chave}"
+
+def url_variante(sha256: str, variante: str) -> str:
+    return f"{settings.EVIDENCE_PUBLIC_URL}{settings.API_V1_STR}/testes/evidencias/{sha256}/{variante}"
+
+async def objeto_existe(chave: str) -> bool:
+    return await obter_armazenamento().existe(chave)
+
+async def responder_objeto(
+    request: Request,
+    chave: str,
+    *,
+    etag: Optional[str] = None,
+    imutavel: bool = False,
+    media_type: Optional[str] = None,
+    download: bool = False
+) -> Response:
+    """Entrega o objeto: do disco local (Range, sendfile) ou redirecionando para uma URL pré-assinada.
+
+    Com o driver S3 os bytes vão direto do armazenamento para o cliente; a API só assina a URL.
+    """
+    armazenamento = obter_armazenamento()
+    nome_download = posixpath.basename(chave) if download else None
+    caminho = armazenamento.caminho_local(chave)
+    if caminho is not None:
+        return await servir_arquivo(
+            request, caminho, etag=etag, imutavel=imutavel, media_type=media_type, nome_download=nome_download
+        )
+
+    url = armazenamento.url_download(chave, nome_download=nome_download, media_type=media_type)
+    if url is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    # A URL assinada expira: o redirecionamento só pode ficar em cache por menos tempo que ela
+    validade = max(settings.S3_PRESIGN_EXPIRES_SECONDS // 2, 0)
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Cache-Control": f"private, max-age={validade}"})
+
+def hash_da_chave(chave: str) -> Optional[str]:
+    """Hash do objeto a que a chave pertence (o próprio objeto ou uma variante); None para outras chaves."""
+    encontrado = PADRAO_ARMAZENADO.fullmatch(chave)
+    if encontrado and encontrado.group(3).startswith(encontrado.group(1) + encontrado.group(2)):
+        return encontrado.group(3)
+    return None
+
+def urls_evidencias(evidencias: Union[str, Iterable[str], None]) -> Iterator[str]:
+    """URLs (sem query string) de uma lista de evidências em JSON ou já decodificada."""
+    if not evidencias:
+        return
+    if isinstance(evidencias, str):
+        try:
+            evidencias = json.loads(evidencias)
+        except ValueError:
+            evidencias = [evidencias]
+        if isinstance(evidencias, str):
+            evidencias = [evidencias]
+    for url in evidencias or []:
+        yield str(url).split("?")[0]
+
+def extrair_hashes(evidencias: Union[str, Iterable[str], None]) -> set[str]:
+    """Hashes dos objetos citados numa lista de evidências (JSON ou lista de URLs).
+
+    URLs antigas, fora do armazenamento por conteúdo, são ignoradas.
+    """
+    return {sha256 for url in urls_evidencias(evidencias) if (sha256 := hash_da_url(url))}
+
+def extrair_chaves_legadas(evidencias: Union[str, Iterable[str], None]) -> set[str]:
+    """Chaves dos arquivos antigos (nome com uuid, fora do armazenamento por conteúdo) citados na lista."""
+    return {chave for url in urls_evidencias(evidencias) if (chave := chave_legada_da_url(url))}
+
+def hash_da_url(url: str) -> Optional[str]:
+    encontrado = PADRAO_OBJETO.search(url)
+    if encontrado and encontrado.group(3).startswith(encontrado.group(1) + encontrado.group(2)):
+        return encontrado.group(3)
+    return None
+
+def chave_legada_da_url(url: str) -> Optional[str]:
+    caminho = unquote(urlsplit(url).path)
+    if "/evidencias/" not in caminho or PADRAO_OBJETO.search(caminho):
+        return None
+    chave = normalizar_chave(caminho.rsplit("/evidencias/", 1)[1])
+    # Blocos de uploads em andamento não são evidências, mesmo que uma URL forjada aponte para eles
+    if chave is None or chave.split("/")[0] == DIRETORIO_UPLOADS:
+        return None
+    return chave
+
+
+async def analisar_upload(file: UploadFile) -> dict:
+    """Primeira passada pelo upload: valida tipo e tamanho e calcula o SHA-256, sem gravar nada.
+
+    O corpo já está no arquivo temporário do Starlette; ler de novo custa menos do que
+    gravar uma cópia que, se o conteúdo já existir, seria descartada.
+    """
+    if file.size is not None:
+        validar_tamanho(file.size)
+
+    await file.seek(0)
+    bloco = await file.read(settings.EVIDENCE_CHUNK_BYTES)
+    if not bloco:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Arquivo vazio.")
+    mime_type = identificar_tipo(file, bloco)
+    validar_tipo(mime_type)
+
+    extensao = definir_extensao(file.filename, mime_type)
+
+    digest = hashlib.sha256()
+    tamanho = 0
+    while bloco:
+        tamanho += len(bloco)
+        if tamanho > settings.EVIDENCE_MAX_BYTES:
+            raise _erro_tamanho()
+        await em_thread(_hash_bloco, digest, bloco)
+        bloco = await file.read(settings.EVIDENCE_CHUNK_BYTES)
+
+    return {"sha256": digest.hexdigest(), "tamanho": tamanho, "mime_type": mime_type, "extensao": extensao}
+
+async def calcular_hash(blocos: AsyncIterator[bytes]) -> tuple[str, int]:
+    """SHA-256 e tamanho de um fluxo de blocos."""
+    digest = hashlib.sha256()
+    tamanho = 0
+    async for bloco in blocos:
+        tamanho += len(bloco)
+        await em_thread(_hash_bloco, digest, bloco)
+    return digest.hexdigest(), tamanho
+
+async def conferir_tamanho(blocos: AsyncIterator[bytes], esperado: int) -> AsyncIterator[bytes]:
+    """Repassa os blocos recebidos, interrompendo se o corpo passar de `esperado` ou ficar aquém dele."""
+    recebido = 0
+    async for bloco in blocos:
+        recebido += len(bloco)
+        if recebido > esperado:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Bloco maior que os {esperado} bytes esperados.")
+        yield bloco
+    if recebido != esperado:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Bloco incompleto: {recebido} de {esperado} bytes.")
+
+async def _blocos_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    await file.seek(0)
+    while bloco := await file.read(settings.EVIDENCE_CHUNK_BYTES):
+        yield bloco
+
+async def gravar_objeto(file: UploadFile, chave: str, tamanho: int, mime_type: str):
+    """Segunda passada: envia o upload, em blocos, para o objeto `chave` no armazenamento configurado."""
+    await obter_armazenamento().gravar(chave, _blocos_upload(file), tamanho, mime_type)
+
+
+# --- Contagem de referências (ExecucaoPasso.evidencias e Defeito.evidencias) ---
+
+# Chave em session.info: {sha256: variação} acumulada na transação corrente
+REFERENCIAS_PENDENTES = "referencias_evidencia_pendentes"
+
+def acumular_referencias(session: Union[Session, AsyncSession], antigas, novas):
+    """Registra a troca de uma lista de evidências por outra; aplicado no commit.
+
+    Usado diretamente pelos UPDATEs em massa, que não passam pelo flush do ORM.
+    """
+    removidas, adicionadas = extrair_hashes(antigas), extrair_hashes(novas)
+    if removidas == adicionadas:
+        return
+    deltas = session.info.setdefault(REFERENCIAS_PENDENTES, Counter())
+    deltas.update(adicionadas - removidas)
+    deltas.subtract(removidas - adicionadas)
+
+def liberar_referencias(session: Union[Session, AsyncSession], listas: Iterable):
+    """Desconta as evidências de linhas apagadas em massa (DELETE ... RETURNING evidencias)."""
+    for evidencias in listas:
+        acumular_referencias(session, evidencias, None)
+
+def _valor_anterior(obj, chave: str):
+    historico = attributes.get_history(obj, chave, passive=attributes.PASSIVE_NO_INITIALIZE)
+    anteriores = historico.deleted or historico.unchanged
+    return anteriores[0] if anteriores else None
+
+@event.listens_for(Session, "before_flush")
+def _coletar_referencias(session: Session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, (ExecucaoPasso, Defeito)):
+            acumular_referencias(session, None, obj.evidencias)
+    for obj in session.dirty:
+        if isinstance(obj, (ExecucaoPasso, Defeito)):
+            historico = attributes.get_history(obj, "evidencias", passive=attributes.PASSIVE_NO_INITIALIZE)
+            if historico.added:
+                acumular_referencias(session, _valor_anterior(obj, "evidencias"), historico.added[0])
+    for obj in session.deleted:
+        if isinstance(obj, (ExecucaoPasso, Defeito)):
+            acumular_referencias(session, _valor_anterior(obj, "evidencias"), None)
+
+@event.listens_for(Session, "before_commit")
+def _aplicar_referencias(session: Session):
+    session.flush()
+    deltas = session.info.pop(REFERENCIAS_PENDENTES, None)
+    por_variacao = {}
+    for sha256, delta in (deltas or {}).items():
+        if delta:
+            por_variacao.setdefault(delta, []).append(sha256)
+    for delta, hashes in sorted(por_variacao.items()):
+        novo_total = ObjetoEvidencia.referencias + delta
+        session.execute(
+            update(ObjetoEvidencia)
+            .where(ObjetoEvidencia.sha256.in_(sorted(hashes)))
+            .values(
+                referencias=func.greatest(novo_total, 0),
+                sem_referencia_desde=case(
+                    (novo_total <= 0, func.coalesce(ObjetoEvidencia.sem_referencia_desde, func.now())),
+                    else_=None
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_referencias(session: Session):
+    session.info.pop(REFERENCIAS_PENDENTES, None)
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+Consulta = Callable[[AsyncSession], Awaitable[Any]]
+
+
+async def executar_em_paralelo(
+    consultas: Dict[str, Consulta],
+    limite: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Executa consultas de leitura independentes ao mesmo tempo, cada uma na sua sessão do pool.
+
+    `consultas` mapeia um nome para uma função que recebe a sessão e devolve o resultado.
+    O número de sessões simultâneas por chamada é limitado por `limite`, e cada consulta
+    tem o seu `timeout`. Se uma falhar, as demais são canceladas e o erro é propagado.
+    """
+    limite = limite or settings.FANOUT_MAX_CONCURRENCY
+    timeout = timeout or settings.FANOUT_QUERY_TIMEOUT_SECONDS
+    semaforo = asyncio.Semaphore(limite)
+
+    async def _executar(nome: str, consulta: Consulta) -> Any:
+        async with semaforo:
+            async with AsyncSessionLocal() as session:
+                try:
+                    async with asyncio.timeout(timeout):
+                        return await consulta(session)
+                except TimeoutError:
+                    logger.warning(f"Consulta '{nome}' excedeu {timeout}s e foi cancelada.")
+                    raise HTTPException(
+                        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        detail="Tempo limite excedido ao consultar os dados do dashboard."
+                    )
+
+    try:
+        async with asyncio.TaskGroup() as grupo:
+            tarefas = {nome: grupo.create_task(_executar(nome, c)) for nome, c in consultas.items()}
+    except BaseExceptionGroup as erros:
+        # Propaga o primeiro erro como exceção simples, para os handlers do FastAPI
+        raise erros.exceptions[0]
+
+    return {nome: tarefa.result() for nome, tarefa in tarefas.items()}
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import posixpath
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import anyio
+
+from app.core.armazenamento import em_thread, obter_armazenamento
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Variantes geradas para imagens: nome -> (maior lado em px, qualidade WebP)
+VARIANTES: Dict[str, Tuple[int, int]] = {
+    "miniatura": (settings.THUMBNAIL_SIZE_PX, 70),
+    "previa": (settings.PREVIEW_SIZE_PX, 82),
+}
+TIPOS_SUPORTADOS = {"image/png", "image/jpeg", "image/gif", "image/webp", "image/bmp"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def suporta_variantes(mime_type: str) -> bool:
+    return mime_type in TIPOS_SUPORTADOS
+
+def chave_variante(chave: str, variante: str) -> str:
+    """Variante ao lado do original: ab/cd/<sha256>.<variante>.webp."""
+    return posixpath.splitext(chave)[0] + f".{variante}.webp"
+
+
+def _gerar(origem: str, destinos: Dict[str, Tuple[int, int]]):
+    """Roda no processo do pool: abre o original uma vez e grava cada variante pedida."""
+    from PIL import Image, ImageOps
+
+    with Image.open(origem) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode not in ("RGB", "RGBA"):
+            imagem = imagem.convert("RGBA" if "A" in imagem.getbands() or "transparency" in imagem.info else "RGB")
+        for destino, (lado, qualidade) in destinos.items():
+            copia = imagem.copy()
+            copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            copia.save(destino, "WEBP", quality=qualidade, method=4)
+
+def _obter_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # "spawn": o processo da API tem threads (pool de I/O, driver), e fork com threads pode travar
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+async def _copiar_para(armazenamento, chave: str, destino: str):
+    arquivo = await em_thread(open, destino, "wb")
+    try:
+        async for bloco in armazenamento.ler(chave):
+            await em_thread(arquivo.write, bloco)
+    finally:
+        await em_thread(arquivo.close)
+
+async def _blocos_arquivo(caminho: str):
+    async with await anyio.open_file(caminho, mode="rb") as arquivo:
+        while bloco := await arquivo.read(settings.EVIDENCE_CHUNK_BYTES):
+            yield bloco
+
+async def gerar_variantes(chave: str, mime_type: str, variantes=tuple(VARIANTES)) -> bool:
+    """Gera no pool de processos as variantes que ainda não existem; False se o tipo não tem variantes.
+
+    As imagens são montadas numa pasta temporária e gravadas pelo driver de armazenamento;
+    num driver remoto, o original é baixado para essa pasta antes.
+    """
+    if not suporta_variantes(mime_type):
+        return False
+    armazenamento = obter_armazenamento()
+    pendentes = [v for v in variantes if not await armazenamento.existe(chave_variante(chave, v))]
+    if not pendentes:
+        return True
+
+    pasta = await em_thread(tempfile.mkdtemp)
+    try:
+        origem = armazenamento.caminho_local(chave)
+        if origem is None:
+            origem = os.path.join(pasta, "original")
+            await _copiar_para(armazenamento, chave, origem)
+        destinos = {os.path.join(pasta, f"{v}.webp"): VARIANTES[v] for v in pendentes}
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_obter_pool(), _gerar, origem, destinos)
+
+        for variante, destino in zip(pendentes, destinos):
+            tamanho = (await em_thread(os.stat, destino)).st_size
+            await armazenamento.gravar(chave_variante(chave, variante), _blocos_arquivo(destino), tamanho, "image/webp")
+    finally:
+        await em_thread(shutil.rmtree, pasta, True)
+    return True
+
+def encerrar_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import invalidar_alteracoes
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.outbox import EventoOutbox
+
+logger = logging.getLogger(__name__)
+
+# --- Tipos de evento ---
+EVENTO_AUDITORIA = "auditoria"
+EVENTO_DEFEITO_STATUS = "defeito.status_alterado"
+EVENTO_CASO_CICLO = "caso.ciclo_alterado"
+EVENTO_EVIDENCIA_ARMAZENADA = "evidencia.armazenada"
+
+# Chave em session.info: a transação corrente gravou eventos
+EVENTOS_PENDENTES = "eventos_outbox_pendentes"
+
+Tratador = Callable[[AsyncSession, Any], Awaitable[None]]
+
+
+def registrar_evento(db: AsyncSession, tipo: str, **dados) -> EventoOutbox:
+    """Adiciona o evento à transação corrente; ele só existe para o despachante se ela confirmar."""
+    evento = EventoOutbox(tipo=tipo, dados=jsonable_encoder(dados))
+    db.add(evento)
+    db.info[EVENTOS_PENDENTES] = True
+    return evento
+
+
+class DespachanteOutbox:
+    """Entrega os eventos pendentes aos tratadores registrados, em lotes, fora das requisições.
+
+    Cada lote é reservado com FOR UPDATE SKIP LOCKED e um prazo (OUTBOX_LEASE_SECONDS), então
+    vários workers podem despachar ao mesmo tempo; um worker que cair devolve os eventos quando
+    o prazo vence. A entrega é "pelo menos uma vez": os tratadores devem tolerar repetição.
+    """
+
+    def __init__(self):
+        self._tratadores: Dict[str, List[Tratador]] = {}
+        self._acordar = asyncio.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._ultima_limpeza = datetime.min.replace(tzinfo=timezone.utc)
+
+    def tratador(self, tipo: str):
+        def registrar(funcao: Tratador) -> Tratador:
+            self._tratadores.setdefault(tipo, []).append(funcao)
+            return funcao
+        return registrar
+
+    def acordar(self):
+        self._acordar.set()
+
+    # --- Ciclo de vida (lifespan) ---
+    async def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._laco())
+
+    async def encerrar(self):
+        tarefa, self._tarefa = self._tarefa, None
+        if tarefa is not None:
+            tarefa.cancel()
+            try:
+                await tarefa
+            except asyncio.CancelledError:
+                pass
+
+    async def _laco(self):
+        while True:
+            try:
+                processados = await self.despachar_lote()
+                await self._limpar()
+            except Exception as e:
+                logger.warning(f"Falha ao despachar eventos do outbox: {e}")
+                processados = 0
+            if processados < settings.OUTBOX_BATCH_SIZE:
+                # Acorda antes do intervalo quando este worker confirma novos eventos
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), settings.OUTBOX_POLL_INTERVAL_SECONDS)
+                except TimeoutError:
+                    pass
+                self._acordar.clear()
+
+    # --- Despacho ---
+    async def despachar_lote(self) -> int:
+        async with AsyncSessionLocal() as db:
+            eventos = await self._reservar(db)
+        for evento in eventos:
+            await self._executar(evento)
+        return len(eventos)
+
+    async def _reservar(self, db: AsyncSession):
+        agora = datetime.now(timezone.utc)
+        pendentes = (
+            select(EventoOutbox.id)
+            .where(EventoOutbox.processado_em.is_(None), EventoOutbox.disponivel_em <= agora)
+            .order_by(EventoOutbox.id)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(EventoOutbox)
+            .where(EventoOutbox.id.in_(pendentes))
+            .values(
+                disponivel_em=agora + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+                tentativas=EventoOutbox.tentativas + 1
+            )
+            .returning(EventoOutbox.id, EventoOutbox.tipo, EventoOutbox.dados, EventoOutbox.tentativas)
+            .execution_options(synchronize_session=False)
+        )
+        eventos = sorted(result.all(), key=lambda e: e.id)
+        await db.commit()
+        return eventos
+
+    async def _executar(self, evento):
+        async with AsyncSessionLocal() as db:
+            try:
+                # Trava o evento durante a entrega: se a reserva vencer e outro worker o pegar,
+                # ele espera esta transação e encontra o evento já processado
+                pendente = (await db.execute(
+                    select(EventoOutbox.id)
+                    .where(EventoOutbox.id == evento.id, EventoOutbox.processado_em.is_(None))
+                    .with_for_update()
+                )).scalar()
+                if pendente is None:
+                    return
+                for tratador in self._tratadores.get(evento.tipo, []):
+                    await tratador(db, evento)
+                await db.execute(
+                    update(EventoOutbox)
+                    .where(EventoOutbox.id == evento.id)
+                    .values(processado_em=datetime.now(timezone.utc), ultimo_erro=None)
+                )
+                await db.commit()
+                # Tratadores que não confirmam sozinhos deixam os escopos alterados na sessão
+                await invalidar_alteracoes(db)
+            except Exception as e:
+                await db.rollback()
+                await self._adiar(db, evento, e)
+
+    async def _adiar(self, db: AsyncSession, evento, erro: Exception):
+        agora = datetime.now(timezone.utc)
+        valores = {"ultimo_erro": f"{type(erro).__name__}: {erro}"[:2000]}
+        if evento.tentativas >= settings.OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Evento {evento.id} ({evento.tipo}) descartado após {evento.tentativas} tentativas: {erro}")
+            valores["processado_em"] = agora
+        else:
+            logger.warning(f"Evento {evento.id} ({evento.tipo}) falhou (tentativa {evento.tentativas}): {erro}")
+            valores["disponivel_em"] = agora + timedelta(seconds=min(2 ** evento.tentativas, 300))
+        await db.execute(update(EventoOutbox).where(EventoOutbox.id == evento.id).values(**valores))
+        await db.commit()
+
+    async def _limpar(self):
+        """Remove, no máximo uma vez por hora, os eventos entregues há mais de OUTBOX_RETENTION_HOURS."""
+        agora = datetime.now(timezone.utc)
+        if agora - self._ultima_limpeza < timedelta(hours=1):
+            return
+        self._ultima_limpeza = agora
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(EventoOutbox).where(
+                    EventoOutbox.processado_em < agora - timedelta(hours=settings.OUTBOX_RETENTION_HOURS),
+                    EventoOutbox.ultimo_erro.is_(None)
+                )
+            )
+            await db.commit()
+
+
+despachante = DespachanteOutbox()
+
+
+@event.listens_for(Session, "after_commit")
+def _acordar_despachante(session: Session):
+    if session.info.pop(EVENTOS_PENDENTES, None):
+        despachante.acordar()
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(session: Session):
+    session.info.pop(EVENTOS_PENDENTES, None)
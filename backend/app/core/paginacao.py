@@ -0,0 +1,99 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import literal, tuple_
+
+# Cabeçalho com o cursor da próxima página (ausente na última página)
+CABECALHO_CURSOR = "X-Next-Cursor"
+
+
+@dataclass
+class Pagina:
+    """Pedido de página (limite + cursor opaco) e, após a consulta, o cursor seguinte."""
+    limite: int
+    cursor: Optional[str] = None
+    proximo_cursor: Optional[str] = None
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return getattr(valor, "value", valor)
+
+def _desserializar(valor: Any, coluna) -> Any:
+    if valor is None:
+        return None
+    try:
+        tipo = coluna.type.python_type
+    except NotImplementedError:
+        return valor
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    return tipo(valor)
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    bruto = json.dumps([_serializar(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, ordem: Sequence) -> list:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(bruto)
+        if not isinstance(valores, list) or len(valores) != len(ordem):
+            raise ValueError
+        return [_desserializar(v, c) for v, c in zip(valores, ordem)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+
+
+def paginar(query, pagina: Optional[Pagina], *ordem, decrescente: bool = True):
+    """Ordena por `ordem` (a última coluna deve ser o id, para desempate) e aplica cursor e limite.
+
+    Sem `pagina` a consulta só recebe a ordenação estável, sem limite.
+    Busca uma linha a mais para saber se existe próxima página (ver fechar_pagina).
+    """
+    query = query.order_by(*[c.desc() if decrescente else c.asc() for c in ordem])
+    if pagina is None:
+        return query
+
+    if pagina.cursor:
+        valores = decodificar_cursor(pagina.cursor, ordem)
+        chave = tuple_(*ordem)
+        referencia = tuple_(*[literal(v, c.type) for v, c in zip(valores, ordem)])
+        query = query.where(chave < referencia if decrescente else chave > referencia)
+    return query.limit(pagina.limite + 1)
+
+def fechar_pagina(
+    linhas: Sequence, pagina: Optional[Pagina], *ordem, chave: Optional[Callable[[Any], Sequence]] = None
+) -> list:
+    """Descarta a linha extra buscada por paginar e grava em `pagina` o cursor da próxima página.
+
+    Os valores do cursor saem dos atributos (ou chaves, em mappings) com o nome das colunas
+    de `ordem`; para expressões, informe `chave`.
+    """
+    linhas = list(linhas)
+    if pagina is None:
+        return linhas
+
+    pagina.proximo_cursor = None
+    if len(linhas) > pagina.limite:
+        linhas = linhas[:pagina.limite]
+        ultima = linhas[-1]
+        if chave is not None:
+            valores = chave(ultima)
+        elif hasattr(ultima, "keys"):
+            valores = [ultima[c.key] for c in ordem]
+        else:
+            valores = [getattr(ultima, c.key) for c in ordem]
+        pagina.proximo_cursor = codificar_cursor(valores)
+    return linhas
+
+def expor_cursor(response: Response, pagina: Optional[Pagina]):
+    if pagina is not None and pagina.proximo_cursor:
+        response.headers[CABECALHO_CURSOR] = pagina.proximo_cursor
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, Text, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def transacao_atual():
+    """xid (64 bits) da transação que grava a linha; usado como marca de alteração."""
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+async def obter_token(db: AsyncSession) -> int:
+    """Menor xid ainda em andamento no momento da leitura.
+
+    Toda transação com xid abaixo dele já terminou; as que estavam em andamento têm xid
+    maior ou igual e entram na próxima sincronização (`alteracao >= token`), mesmo que
+    confirmem depois de uma transação mais nova. Por isso o token deve ser lido antes dos dados.
+    """
+    xmin = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    return (await db.execute(select(cast(cast(xmin, Text), BigInteger)))).scalar()
+
+def decodificar_token(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    try:
+        valor = int(token)
+    except ValueError:
+        valor = -1
+    if valor < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de sincronização inválido.")
+    return valor
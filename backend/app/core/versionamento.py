@@ -0,0 +1,58 @@
+import hashlib
+from typing import Iterable, Sequence
+
+from sqlalchemy import BigInteger, Text, cast, func, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.nivel_acesso import NivelAcesso
+from app.models.modulo import Modulo
+from app.models.projeto import Projeto
+from app.models.sistema import Sistema
+from app.models.testing import CasoTeste, CicloTeste, Defeito, ExecucaoPasso, ExecucaoTeste, PassoCasoTeste
+from app.models.usuario import Usuario
+
+# Família de recursos -> tabelas cujas alterações mudam as listagens dela
+FAMILIAS_RECURSO = {
+    "sistemas": (Sistema,),
+    "modulos": (Modulo,),
+    "projetos": (Projeto,),
+    "casos": (CasoTeste, PassoCasoTeste),
+    "ciclos": (CicloTeste,),
+    "execucoes": (ExecucaoTeste, ExecucaoPasso),
+    "defeitos": (Defeito,),
+    "usuarios": (Usuario, NivelAcesso),
+}
+
+
+def _como_inteiro(xid):
+    return cast(cast(xid, Text), BigInteger)
+
+async def obter_marcas(db: AsyncSession, recursos: Sequence[str]) -> list[str]:
+    """Marca d'água de cada tabela das famílias: maior `alteracao` (índice) e total de linhas.
+
+    Nenhuma escrita disputa uma linha compartilhada: a marca é lida, não mantida. Uma transação
+    com xid abaixo da maior marca ainda pode estar em andamento e confirmar sem mudar o máximo;
+    enquanto isso seu xid entra na marca, e a confirmação muda o ETag. O total cobre exclusões.
+    """
+    tabelas = sorted({m for r in recursos for m in FAMILIAS_RECURSO[r]}, key=lambda m: m.__tablename__)
+    consultas = [
+        select(literal(m.__tablename__), func.coalesce(func.max(m.alteracao), 0), func.count()).select_from(m)
+        for m in tabelas
+    ]
+    result = await db.execute(union_all(*consultas))
+    marcas = sorted(result.all())
+    if not marcas:
+        return []
+    maior = max(alteracao for _, alteracao, _ in marcas)
+    em_andamento = await db.execute(
+        select(_como_inteiro(func.pg_snapshot_xip(func.pg_current_snapshot())))
+    )
+    pendentes = sorted(x for x in em_andamento.scalars() if x <= maior)
+    return [f"{tabela}={alteracao}:{total}" for tabela, alteracao, total in marcas] + [f"~{x}" for x in pendentes]
+
+async def calcular_etag(db: AsyncSession, recursos: Sequence[str], variacoes: Iterable[str] = ()) -> str:
+    """ETag fraco a partir das marcas das famílias e das variações da requisição (query, usuário)."""
+    marcas = await obter_marcas(db, recursos)
+    base = "|".join(marcas + list(variacoes))
+    return f'W/"{hashlib.sha1(base.encode()).hexdigest()[:20]}"'
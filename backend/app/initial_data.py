@@ -9,6 +9,8 @@ from app.seeds.projetos import seed_projetos
 from app.seeds.ciclos import seed_ciclos
 from app.seeds.casos import seed_casos
 from app.seeds.execucoes import seed_execucoes
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
 
 async def seed_db():
     async with AsyncSessionLocal() as session:
@@ -35,6 +37,18 @@ async def seed_db():
 
             await seed_execucoes(session)
 
+            # Step counters per execution (data created before the counters existed)
+            execucao_repo = ExecucaoTesteRepository(session)
+            if await execucao_repo.contadores_vazios():
+                await execucao_repo.recalcular_contadores()
+
+            # 5. Dashboard rollups (first boot or tables created after the data)
+            rollup_repo = RollupRepository(session)
+            if await rollup_repo.esta_vazio():
+                await rollup_repo.reconstruir()
+            if await rollup_repo.conclusoes_vazias():
+                await rollup_repo.semear_conclusoes()
+
             # Final commit for all changes
             await session.commit()
             print("--- Seed Completed Successfully! ---")
@@ -1,13 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import Base, engine
 from app.api.v1.api import api_router
+from app.api.v1.endpoints import evidencias
+from app.core.eventos import barramento
+from app.core.outbox import despachante
+from app.core.miniaturas import encerrar_pool
+from app.core.armazenamento import encerrar_armazenamento
+from app.services import tratadores_eventos  # noqa: F401 (registra os tratadores do outbox)
+from app.core.paginacao import CABECALHO_CURSOR
 import os
 
-os.makedirs("evidencias", exist_ok=True)
+os.makedirs(settings.EVIDENCE_DIR, exist_ok=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,7 +23,13 @@ async def lifespan(app: FastAPI):
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await barramento.iniciar()
+    await despachante.iniciar()
     yield
+    await despachante.encerrar()
+    encerrar_pool()
+    await encerrar_armazenamento()
+    await barramento.encerrar()
     await engine.dispose()
 
 app = FastAPI(
@@ -33,9 +45,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CABECALHO_CURSOR],
 )
 
-app.mount("/evidencias", StaticFiles(directory="evidencias"), name="evidencias")
+app.include_router(evidencias.router, tags=["Evidências"])
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/", summary="Endpoint raiz da API")
@@ -6,4 +6,8 @@ from .projeto import Projeto
 from .testing import (CasoTeste, CicloTeste, PassoCasoTeste, ExecucaoTeste, ExecucaoPasso, StatusExecucaoEnum, StatusPassoEnum)
 from .metrica import Metrica
 from .password_reset import PasswordReset
-from .log import LogSistema
\ No newline at end of file
+from .log import LogSistema
+from .rollup import RollupExecucao, RollupDefeito, RollupProjeto, ConclusaoDiaria, DuracaoExecucao
+from .outbox import EventoOutbox
+from .evidencia import ObjetoEvidencia, UploadEvidencia
+from .sincronizacao import RemocaoSincronizacao
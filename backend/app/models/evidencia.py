@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ObjetoEvidencia(Base):
+    """Arquivo de evidência armazenado pelo hash do conteúdo (SHA-256).
+
+    `referencias` conta as listas de evidências (passos executados e defeitos) que apontam
+    para o objeto; `sem_referencia_desde` guarda quando o contador chegou a zero.
+    """
+    __tablename__ = "objetos_evidencia"
+
+    sha256 = Column(String(64), primary_key=True)
+    extensao = Column(String(16), nullable=False, default="")
+    mime_type = Column(String(100), nullable=False)
+    tamanho = Column(BigInteger, nullable=False)
+    referencias = Column(Integer, nullable=False, default=0, server_default="0")
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    sem_referencia_desde = Column(DateTime(timezone=True), nullable=True, server_default=func.now())
+
+class UploadEvidencia(Base):
+    """Sessão de upload retomável: o arquivo chega em blocos numerados de `tamanho_bloco` bytes.
+
+    Os blocos ficam na área de uploads do armazenamento até a conclusão; `blocos_recebidos`
+    guarda (em JSON) os índices já gravados.
+    """
+    __tablename__ = "uploads_evidencia"
+
+    id = Column(String(32), primary_key=True)
+    passo_id = Column(Integer, ForeignKey("execucoes_passos.id", ondelete="CASCADE"), nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
+    nome = Column(String(255), nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    tamanho = Column(BigInteger, nullable=False)
+    tamanho_bloco = Column(Integer, nullable=False)
+    blocos_recebidos = Column(Text, nullable=False, default="[]", server_default="[]")
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,9 +1,10 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Enum, text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, text
 from sqlalchemy.dialects.postgresql import JSONB 
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.sincronizacao import transacao_atual
 
 class NivelAcessoEnum(str, enum.Enum):
     admin = "admin"
@@ -18,6 +19,9 @@ class NivelAcesso(Base):
     permissoes = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     usuarios = relationship("Usuario", back_populates="nivel_acesso")
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class EventoOutbox(Base):
+    """Evento de domínio gravado na mesma transação da escrita que o originou.
+
+    O despachante (app.core.outbox) entrega os pendentes aos tratadores fora da requisição.
+    Evento com processado_em e ultimo_erro preenchidos foi descartado após esgotar as tentativas.
+    """
+    __tablename__ = "eventos_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    tipo = Column(String(60), nullable=False)
+    dados = Column(JSONB, nullable=False, default=dict)
+    tentativas = Column(Integer, nullable=False, default=0, server_default="0")
+    ultimo_erro = Column(Text, nullable=True)
+    criado_em = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Próxima tentativa (ou fim da reserva de um despachante)
+    disponivel_em = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    processado_em = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_eventos_outbox_pendentes", "disponivel_em", "id", postgresql_where=processado_em.is_(None)),
+    )
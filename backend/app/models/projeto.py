@@ -1,8 +1,9 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.sincronizacao import transacao_atual
 
 class StatusProjetoEnum(str, enum.Enum):
     ativo = "ativo"
@@ -24,6 +25,9 @@ class Projeto(Base):
     status = Column(Enum(StatusProjetoEnum, name='status_projeto_enum', create_type=False), default=StatusProjetoEnum.ativo)    
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
@@ -0,0 +1,78 @@
+from sqlalchemy import Column, Integer, Float, Enum, Date, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+from app.models.projeto import StatusProjetoEnum
+from app.models.testing import StatusExecucaoEnum, StatusDefeitoEnum, SeveridadeDefeitoEnum
+
+# Tabelas de contagem mantidas incrementalmente pelos repositórios de escrita.
+# São desnormalizadas (sem FK) e usam 0 em responsavel_id para "sem responsável",
+# já que a chave primária não aceita NULL.
+
+class RollupExecucao(Base):
+    __tablename__ = "rollup_execucoes"
+
+    sistema_id = Column(Integer, primary_key=True)
+    projeto_id = Column(Integer, primary_key=True, index=True)
+    modulo_id = Column(Integer, primary_key=True)
+    responsavel_id = Column(Integer, primary_key=True, index=True)
+    status_geral = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RollupDefeito(Base):
+    __tablename__ = "rollup_defeitos"
+
+    sistema_id = Column(Integer, primary_key=True)
+    projeto_id = Column(Integer, primary_key=True, index=True)
+    modulo_id = Column(Integer, primary_key=True)
+    responsavel_id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(StatusDefeitoEnum, name='status_defeito_enum', create_type=False), primary_key=True)
+    severidade = Column(Enum(SeveridadeDefeitoEnum, name='severidade_defeito_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RollupProjeto(Base):
+    __tablename__ = "rollup_projetos"
+
+    sistema_id = Column(Integer, primary_key=True)
+    status = Column(Enum(StatusProjetoEnum, name='status_projeto_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ConclusaoDiaria(Base):
+    """Série temporal de conclusões por dia e testador.
+
+    Append-only: recebe +1 quando uma execução entra em fechado/falha/bloqueado
+    e nunca é decrementada, então edições posteriores não mudam o histórico.
+    """
+    __tablename__ = "conclusoes_diarias"
+
+    responsavel_id = Column(Integer, primary_key=True)
+    dia = Column(Date, primary_key=True, index=True)
+    status_geral = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DuracaoExecucao(Base):
+    """Fato de duração de cada execução concluída (append-only).
+
+    Uma linha por entrada em status final; retestes geram novas linhas.
+    Médias e percentis por testador, caso, projeto e ciclo são calculados sobre esta tabela.
+    """
+    __tablename__ = "duracoes_execucao"
+
+    id = Column(Integer, primary_key=True)
+    execucao_teste_id = Column(Integer, nullable=False, index=True)
+    responsavel_id = Column(Integer, nullable=False, index=True)
+    caso_teste_id = Column(Integer, nullable=False, index=True)
+    projeto_id = Column(Integer, nullable=False, index=True)
+    ciclo_teste_id = Column(Integer, nullable=False, index=True)
+    status_geral = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), nullable=False)
+
+    iniciado_em = Column(DateTime(timezone=True), nullable=False)
+    finalizado_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    duracao_segundos = Column(Float, nullable=False)
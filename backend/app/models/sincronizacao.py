@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+from app.core.sincronizacao import transacao_atual
+
+class RemocaoSincronizacao(Base):
+    """Item que saiu da lista de um executor (excluído ou reatribuído a outro).
+
+    Linhas excluídas não deixam `alteracao` para o delta-sync; este registro é o que
+    avisa o executor para descartar a cópia local.
+    """
+    __tablename__ = "remocoes_sincronizacao"
+
+    id = Column(BigInteger, primary_key=True)
+    responsavel_id = Column(Integer, nullable=False)
+    # "execucao", "passo" ou "defeito"
+    entidade = Column(String(20), nullable=False)
+    entidade_id = Column(Integer, nullable=False)
+    alteracao = Column(BigInteger, nullable=False, server_default="0", default=transacao_atual())
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_remocoes_sincronizacao_responsavel", "responsavel_id", "alteracao"),
+    )
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.sincronizacao import transacao_atual
 
 class Sistema(Base):
     __tablename__ = "sistemas"
@@ -12,6 +13,9 @@ class Sistema(Base):
     ativo = Column(Boolean, default=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     modulos = relationship("Modulo", back_populates="sistema")
@@ -1,8 +1,9 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, DateTime, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.sincronizacao import transacao_atual
 from app.models.usuario import Usuario
 
 class PrioridadeEnum(str, enum.Enum):
@@ -66,6 +67,9 @@ class CicloTeste(Base):
     status = Column(Enum(StatusCicloEnum, name='status_ciclo_enum', create_type=False), default=StatusCicloEnum.planejado)    
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
@@ -105,6 +109,9 @@ class CasoTeste(Base):
     status = Column(Enum(StatusCasoTesteEnum, name='status_caso_teste_enum', create_type=False), default=StatusCasoTesteEnum.rascunho)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
@@ -131,6 +138,9 @@ class PassoCasoTeste(Base):
     resultado_esperado = Column(Text, nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Transação da última escrita; marca d'água dos ETags das listagens
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
@@ -149,9 +159,24 @@ class ExecucaoTeste(Base):
     responsavel_id = Column(Integer, ForeignKey("usuarios.id"))
     
     status_geral = Column(Enum(StatusExecucaoEnum, name='status_execucao_enum', create_type=False), default=StatusExecucaoEnum.pendente)
+    # Início = primeiro resultado de passo registrado; fim = entrada em fechado/falha/bloqueado
+    iniciado_em = Column(DateTime(timezone=True), nullable=True)
+    finalizado_em = Column(DateTime(timezone=True), nullable=True)
+    # Contadores de passos por status, mantidos pelo repositório a cada alteração de passo
+    passos_pendentes = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_aprovados = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_reprovados = Column(Integer, nullable=False, default=0, server_default="0")
+    passos_bloqueados = Column(Integer, nullable=False, default=0, server_default="0")
+    # Controle de concorrência otimista: UPDATEs condicionados à versão lida
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    # Transação da última escrita (INSERT/UPDATE, ORM ou em massa); base do delta-sync dos executores
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __mapper_args__ = {"version_id_col": versao}
+
     ciclo = relationship("CicloTeste", back_populates="execucoes")
     caso_teste = relationship("CasoTeste", back_populates="execucoes")
     responsavel = relationship("Usuario", back_populates="execucoes_atribuidas")
@@ -169,9 +194,16 @@ class ExecucaoPasso(Base):
     resultado_obtido = Column(Text)
     status = Column(Enum(StatusPassoEnum, name='status_passo_enum', create_type=False), default=StatusPassoEnum.pendente)
     evidencias = Column(Text) 
-    
+
+    iniciado_em = Column(DateTime(timezone=True), nullable=True)
+    finalizado_em = Column(DateTime(timezone=True), nullable=True)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __mapper_args__ = {"version_id_col": versao}
+
     execucao_pai = relationship("ExecucaoTeste", back_populates="passos_executados")
     passo_template = relationship("PassoCasoTeste", back_populates="execucoes_deste_passo")
 
@@ -186,8 +218,13 @@ class Defeito(Base):
     logs_erro = Column(Text, nullable=True) 
     severidade = Column(Enum(SeveridadeDefeitoEnum, name='severidade_defeito_enum', create_type=False), nullable=False)
     status = Column(Enum(StatusDefeitoEnum, name='status_defeito_enum', create_type=False), default=StatusDefeitoEnum.aberto)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    alteracao = Column(BigInteger, nullable=False, index=True, server_default="0",
+                       default=transacao_atual(), onupdate=transacao_atual())
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __mapper_args__ = {"version_id_col": versao}
+
     execucao = relationship("ExecucaoTeste", back_populates="defeitos")
\ No newline at end of file
@@ -0,0 +1,33 @@
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+
+async def reconstruir_rollups():
+    async with AsyncSessionLocal() as session:
+        try:
+            print("--- Reconstruindo rollups do dashboard ---")
+            # Contadores de passos primeiro: são a base do status geral das execuções
+            corrigidas = await ExecucaoTesteRepository(session).recalcular_contadores()
+            print(f"Contadores de passos corrigidos em {corrigidas} execução(ões)")
+
+            rollup_repo = RollupRepository(session)
+            await rollup_repo.reconstruir()
+            # A série de conclusões é append-only; só recebe a carga inicial se estiver vazia
+            if await rollup_repo.conclusoes_vazias():
+                await rollup_repo.semear_conclusoes()
+            await session.commit()
+            print("--- Rollups reconstruídos com sucesso! ---")
+
+        except Exception as e:
+            await session.rollback()
+            print(f"Erro ao reconstruir rollups: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(reconstruir_rollups())
+    except Exception as e:
+        print(f"Execution Error: {e}")
+        sys.exit(1)
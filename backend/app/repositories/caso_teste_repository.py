@@ -4,20 +4,31 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy import delete, update as sqlalchemy_update, desc, and_
 from typing import Sequence, Optional
 
-from app.models.testing import CasoTeste, PassoCasoTeste, ExecucaoTeste, StatusExecucaoEnum, ExecucaoPasso, Defeito
+from app.models.testing import CasoTeste, PassoCasoTeste, ExecucaoTeste, StatusExecucaoEnum, ExecucaoPasso, Defeito, StatusCasoTesteEnum
 from app.models.usuario import Usuario
 from app.schemas.caso_teste import CasoTesteCreate, CasoTesteUpdate
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.repositories.sincronizacao_repository import SincronizacaoRepository, REMOCAO_EXECUCAO
+from app.core.cache import invalidar_alteracoes
+from app.core.auditoria import enfileirar_auditoria
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.outbox import registrar_evento, EVENTO_CASO_CICLO
+from app.core.evidencias import liberar_referencias
 
 class CasoTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = RollupRepository(db)
+        self.execucao_repo = ExecucaoTesteRepository(db)
+        self.sincronizacao = SincronizacaoRepository(db)
 
     async def get_by_nome_projeto(self, nome: str, projeto_id: int) -> Optional[CasoTeste]:
         query = select(CasoTeste).where(CasoTeste.nome == nome, CasoTeste.projeto_id == projeto_id)
         result = await self.db.execute(query)
         return result.scalars().first()
     
-    async def get_all(self) -> Sequence[CasoTeste]:
+    async def get_all(self, pagina: Optional[Pagina] = None) -> Sequence[CasoTeste]:
         query = (
             select(CasoTeste)
             .options(
@@ -26,12 +37,11 @@ class CasoTesteRepository:
                 selectinload(CasoTeste.ciclo),
                 selectinload(CasoTeste.projeto)
             )
-            .order_by(CasoTeste.id.desc())
         )
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        result = await self.db.execute(paginar(query, pagina, CasoTeste.id))
+        return fechar_pagina(result.scalars().all(), pagina, CasoTeste.id)
     
-    async def get_all_by_projeto(self, projeto_id: int) -> Sequence[CasoTeste]:
+    async def get_all_by_projeto(self, projeto_id: int, pagina: Optional[Pagina] = None) -> Sequence[CasoTeste]:
         query = (
             select(CasoTeste)
             .options(
@@ -41,7 +51,15 @@ class CasoTesteRepository:
                 selectinload(CasoTeste.projeto)
             )
             .where(CasoTeste.projeto_id == projeto_id)
-            .order_by(CasoTeste.id.desc())
+        )
+        result = await self.db.execute(paginar(query, pagina, CasoTeste.id))
+        return fechar_pagina(result.scalars().all(), pagina, CasoTeste.id)
+
+    async def listar_ids_ativos(self, projeto_id: int) -> Sequence[int]:
+        query = (
+            select(CasoTeste.id)
+            .where(CasoTeste.projeto_id == projeto_id, CasoTeste.status == StatusCasoTesteEnum.ativo)
+            .order_by(CasoTeste.id)
         )
         result = await self.db.execute(query)
         return result.scalars().all()
@@ -82,7 +100,8 @@ class CasoTesteRepository:
                 ciclo_teste_id=caso_data.ciclo_id,
                 caso_teste_id=db_caso.id,
                 responsavel_id=caso_data.responsavel_id,
-                status_geral=StatusExecucaoEnum.pendente
+                status_geral=StatusExecucaoEnum.pendente,
+                passos_pendentes=len(passos_objs)
             )
             self.db.add(nova_execucao)
             await self.db.flush() 
@@ -99,13 +118,28 @@ class CasoTesteRepository:
                 ]
                 self.db.add_all(passos_execucao)
 
+            await self.rollup.registrar_execucoes([nova_execucao.id])
+
+        if caso_data.ciclo_id:
+            registrar_evento(self.db, EVENTO_CASO_CICLO, caso_id=db_caso.id, ciclo_anterior_id=None, ciclo_novo_id=caso_data.ciclo_id)
+        await self.rollup.marcar_projeto(projeto_id)
+        await enfileirar_auditoria(self.db, db_caso)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         return await self.get_by_id(db_caso.id)
 
     async def update(self, caso_id: int, dados: CasoTesteUpdate) -> Optional[CasoTeste]:
         dados_dict = dados.model_dump(exclude_unset=True)
         passos_data = dados_dict.pop('passos', None)
 
+        if 'ciclo_id' in dados_dict:
+            ciclo_anterior_id = (await self.db.execute(select(CasoTeste.ciclo_id).where(CasoTeste.id == caso_id))).scalar()
+            if ciclo_anterior_id != dados_dict['ciclo_id']:
+                registrar_evento(
+                    self.db, EVENTO_CASO_CICLO,
+                    caso_id=caso_id, ciclo_anterior_id=ciclo_anterior_id, ciclo_novo_id=dados_dict['ciclo_id']
+                )
+
         if dados_dict:
             await self.db.execute(
                 sqlalchemy_update(CasoTeste).where(CasoTeste.id == caso_id).values(**dados_dict)
@@ -121,7 +155,13 @@ class CasoTesteRepository:
             ids_para_deletar = [id_ for id_ in ids_no_banco if id_ not in incoming_ids]
 
             if ids_para_deletar:
-                await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.passo_caso_teste_id.in_(ids_para_deletar)))
+                removidos = (await self.db.execute(
+                    delete(ExecucaoPasso)
+                    .where(ExecucaoPasso.passo_caso_teste_id.in_(ids_para_deletar))
+                    .returning(ExecucaoPasso.id, ExecucaoPasso.execucao_teste_id, ExecucaoPasso.evidencias)
+                )).all()
+                liberar_referencias(self.db, [r.evidencias for r in removidos])
+                await self.sincronizacao.registrar_passos_removidos([(r.id, r.execucao_teste_id) for r in removidos])
                 await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.id.in_(ids_para_deletar)))
 
             for passo in passos_data:
@@ -151,25 +191,42 @@ class CasoTesteRepository:
         execucao_ativa = exec_result.scalars().first()
 
         if execucao_ativa:
-            has_changes = False
-            if 'responsavel_id' in dados_dict and execucao_ativa.responsavel_id != dados_dict['responsavel_id']:
-                execucao_ativa.responsavel_id = dados_dict['responsavel_id']
-                has_changes = True
-            
+            valores = {}
+            troca_responsavel = 'responsavel_id' in dados_dict and execucao_ativa.responsavel_id != dados_dict['responsavel_id']
+            if troca_responsavel:
+                valores['responsavel_id'] = dados_dict['responsavel_id']
+
             if 'ciclo_id' in dados_dict and execucao_ativa.ciclo_teste_id != dados_dict['ciclo_id']:
                 if dados_dict['ciclo_id']:
-                    execucao_ativa.ciclo_teste_id = dados_dict['ciclo_id']
-                    has_changes = True
-            
-            if has_changes:
-                self.db.add(execucao_ativa)
+                    valores['ciclo_teste_id'] = dados_dict['ciclo_id']
 
-            if passos_data is not None:
+            if valores:
+                if troca_responsavel:
+                    # responsável faz parte da chave do rollup: sai da chave antiga e entra na nova
+                    await self.rollup.registrar_execucoes([execucao_ativa.id], -1)
+                # UPDATE direto, sem conferir a versão lida: um resultado de passo gravado em paralelo
+                # (que incrementa a versão da execução) não deve derrubar a edição do caso
                 await self.db.execute(
+                    sqlalchemy_update(ExecucaoTeste)
+                    .where(ExecucaoTeste.id == execucao_ativa.id)
+                    .values(**valores, versao=ExecucaoTeste.versao + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                if troca_responsavel:
+                    await self.rollup.registrar_execucoes([execucao_ativa.id])
+                    # Sai da lista do executor anterior; o novo recebe também os passos e defeitos
+                    self.sincronizacao.registrar_remocoes(REMOCAO_EXECUCAO, [(execucao_ativa.id, execucao_ativa.responsavel_id)])
+                    await self.sincronizacao.reenviar_execucao(execucao_ativa.id)
+
+            if passos_data is not None:
+                removidos = (await self.db.execute(
                     delete(ExecucaoPasso)
                     .where(ExecucaoPasso.execucao_teste_id == execucao_ativa.id)
                     .where(ExecucaoPasso.passo_caso_teste_id.notin_(current_passos_ids))
-                )
+                    .returning(ExecucaoPasso.id, ExecucaoPasso.execucao_teste_id, ExecucaoPasso.evidencias)
+                )).all()
+                liberar_referencias(self.db, [r.evidencias for r in removidos])
+                await self.sincronizacao.registrar_passos_removidos([(r.id, r.execucao_teste_id) for r in removidos])
                 subquery_existentes = select(ExecucaoPasso.passo_caso_teste_id).where(ExecucaoPasso.execucao_teste_id == execucao_ativa.id)
                 
                 query_passos_faltantes = select(PassoCasoTeste).where(
@@ -187,19 +244,43 @@ class CasoTesteRepository:
                         resultado_obtido=""
                     ))
 
+        if passos_data is not None:
+            # Passos removidos/incluídos mudam os contadores das execuções do caso
+            await self.execucao_repo.recalcular_contadores(ExecucaoTeste.caso_teste_id == caso_id)
+
+        caso = await self.get_by_id(caso_id)
+        if caso:
+            await enfileirar_auditoria(self.db, caso)
         await self.db.commit()
-        return await self.get_by_id(caso_id)
+        await invalidar_alteracoes(self.db)
+        return caso
 
     async def delete(self, caso_id: int) -> bool:
+        caso = (await self.db.execute(select(CasoTeste.projeto_id, CasoTeste.ciclo_id).where(CasoTeste.id == caso_id))).first()
+        if caso:
+            await self.rollup.marcar_projeto(caso.projeto_id)
+            if caso.ciclo_id:
+                registrar_evento(self.db, EVENTO_CASO_CICLO, caso_id=caso_id, ciclo_anterior_id=caso.ciclo_id, ciclo_novo_id=None)
+
         execs = await self.db.execute(select(ExecucaoTeste.id).where(ExecucaoTeste.caso_teste_id == caso_id))
         execs_ids = execs.scalars().all()
 
         if execs_ids:
-            await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)))
+            await self.rollup.registrar_execucoes(execs_ids, -1)
+            for modelo in (ExecucaoPasso, Defeito):
+                removidos = await self.db.execute(
+                    delete(modelo).where(modelo.execucao_teste_id.in_(execs_ids)).returning(modelo.evidencias)
+                )
+                liberar_referencias(self.db, removidos.scalars())
+            excluidas = await self.db.execute(
+                delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)).returning(ExecucaoTeste.id, ExecucaoTeste.responsavel_id)
+            )
+            self.sincronizacao.registrar_remocoes(REMOCAO_EXECUCAO, excluidas.all())
 
         await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.caso_teste_id == caso_id))
         result = await self.db.execute(delete(CasoTeste).where(CasoTeste.id == caso_id))
+        if result.rowcount > 0:
+            await enfileirar_auditoria(self.db)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         return result.rowcount > 0
\ No newline at end of file
@@ -1,41 +1,81 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import delete, update as sqlalchemy_update
+from sqlalchemy import delete, func, update as sqlalchemy_update
 from typing import Sequence, Optional
 
-from app.models.testing import CicloTeste, ExecucaoTeste
+from app.models.testing import CicloTeste, ExecucaoTeste, CasoTeste
 from app.models.usuario import Usuario
-from app.schemas.ciclo_teste import CicloTesteCreate
+from app.schemas.ciclo_teste import CicloTesteCreate, CicloRetesteCreate
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.core.cache import invalidar_alteracoes
+from app.core.auditoria import enfileirar_auditoria
+from app.core.paginacao import Pagina, paginar, fechar_pagina
 
 class CicloTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = RollupRepository(db)
+        self.execucao_repo = ExecucaoTesteRepository(db)
+
+    async def _marcar_ciclo(self, ciclo_id: int):
+        projeto_id = (await self.db.execute(select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id))).scalar()
+        if projeto_id:
+            await self.rollup.marcar_projeto(projeto_id)
 
     async def get_by_nome_projeto(self, nome: str, projeto_id: int) -> Optional[CicloTeste]:
         query = select(CicloTeste).where(CicloTeste.nome == nome, CicloTeste.projeto_id == projeto_id)
         result = await self.db.execute(query)
         return result.scalars().first()
 
-    async def list_by_projeto(self, projeto_id: int) -> Sequence[CicloTeste]:
+    async def list_by_projeto(self, projeto_id: int, pagina: Optional[Pagina] = None) -> Sequence[CicloTeste]:
         query = (
             select(CicloTeste)
             .options(
                 selectinload(CicloTeste.execucoes).selectinload(ExecucaoTeste.responsavel)
             )
             .where(CicloTeste.projeto_id == projeto_id)
-            .order_by(CicloTeste.data_inicio.desc())
         )
-        result = await self.db.execute(query)
-        return result.unique().scalars().all()
+        return await self._listar_pagina(query, pagina)
 
     async def create(self, projeto_id: int, ciclo_data: CicloTesteCreate) -> CicloTeste:
         dados_ciclo = ciclo_data.model_dump(exclude={'projeto_id'})        
         db_ciclo = CicloTeste(projeto_id=projeto_id, **dados_ciclo)        
         self.db.add(db_ciclo)
+        await self.rollup.marcar_projeto(projeto_id)
+        await enfileirar_auditoria(self.db, db_ciclo)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         return await self.get_by_id(db_ciclo.id)
 
+    async def create_reteste(self, origem: CicloTeste, nome: str, dados: CicloRetesteCreate) -> tuple[CicloTeste, dict]:
+        """Cria o ciclo de reteste e copia as execuções não aprovadas da origem na mesma transação."""
+        db_ciclo = CicloTeste(
+            projeto_id=origem.projeto_id,
+            nome=nome,
+            descricao=dados.descricao,
+            data_inicio=dados.data_inicio,
+            data_fim=dados.data_fim
+        )
+        self.db.add(db_ciclo)
+        await self.db.flush()
+
+        resumo = await self.execucao_repo.copiar_para_reteste(origem.id, db_ciclo.id, dados.apenas_defeitos_corrigidos)
+        await self.rollup.marcar_projeto(origem.projeto_id)
+        await enfileirar_auditoria(self.db, (db_ciclo, resumo))
+        await self.db.commit()
+        await invalidar_alteracoes(self.db)
+        return await self.get_by_id(db_ciclo.id), resumo
+
+    async def contar_casos(self, ciclo_id: int) -> int:
+        result = await self.db.execute(select(func.count()).select_from(CasoTeste).where(CasoTeste.ciclo_id == ciclo_id))
+        return result.scalar()
+
+    async def get_projeto_id(self, ciclo_id: int) -> Optional[int]:
+        result = await self.db.execute(select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id))
+        return result.scalar()
+
     async def get_by_id(self, ciclo_id: int) -> Optional[CicloTeste]:
         query = (
             select(CicloTeste)
@@ -45,16 +85,23 @@ class CicloTesteRepository:
         result = await self.db.execute(query)
         return result.scalars().first()
     
-    async def get_all(self) -> Sequence[CicloTeste]:
+    async def get_all(self, pagina: Optional[Pagina] = None) -> Sequence[CicloTeste]:
         query = (
             select(CicloTeste)
             .options(
                 selectinload(CicloTeste.execucoes).selectinload(ExecucaoTeste.responsavel)
             )
-            .order_by(CicloTeste.data_inicio.desc())
         )
-        result = await self.db.execute(query)
-        return result.unique().scalars().all()
+        return await self._listar_pagina(query, pagina)
+
+    async def _listar_pagina(self, query, pagina: Optional[Pagina]) -> Sequence[CicloTeste]:
+        # Mais recentes primeiro; ciclos sem data de início entram pela data de criação
+        inicio = func.coalesce(CicloTeste.data_inicio, CicloTeste.created_at)
+        result = await self.db.execute(paginar(query, pagina, inicio, CicloTeste.id))
+        return fechar_pagina(
+            result.unique().scalars().all(), pagina,
+            chave=lambda c: (c.data_inicio or c.created_at, c.id)
+        )
 
     async def update(self, ciclo_id: int, dados: dict) -> Optional[CicloTeste]:
         if not dados:
@@ -63,10 +110,20 @@ class CicloTesteRepository:
         await self.db.execute(
             sqlalchemy_update(CicloTeste).where(CicloTeste.id == ciclo_id).values(**dados)
         )
+        if 'status' in dados:
+            await self._marcar_ciclo(ciclo_id)
+        ciclo = await self.get_by_id(ciclo_id)
+        if ciclo:
+            await enfileirar_auditoria(self.db, ciclo)
         await self.db.commit()
-        return await self.get_by_id(ciclo_id)
+        await invalidar_alteracoes(self.db)
+        return ciclo
 
     async def delete(self, ciclo_id: int) -> bool:
+        await self._marcar_ciclo(ciclo_id)
         result = await self.db.execute(delete(CicloTeste).where(CicloTeste.id == ciclo_id))
+        if result.rowcount > 0:
+            await enfileirar_auditoria(self.db)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         return result.rowcount > 0
\ No newline at end of file
@@ -1,8 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, desc, case, or_, and_
+from sqlalchemy import func, desc, case, or_, and_, true, Date
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 
 from app.models.modulo import Modulo
 from app.models.projeto import Projeto, StatusProjetoEnum
@@ -13,197 +13,228 @@ from app.models.testing import (
     ExecucaoTeste, StatusExecucaoEnum
 )
 from app.models.usuario import Usuario
+from app.models.rollup import RollupExecucao, RollupDefeito, RollupProjeto, ConclusaoDiaria, DuracaoExecucao
+
+# Agrupamentos aceitos pela série de velocidade -> unidade do date_trunc
+AGRUPAMENTOS_VELOCIDADE = {"dia": "day", "semana": "week", "mes": "month"}
+
+# Dimensões das estatísticas de duração -> (coluna do fato, nome exibido, id da tabela do nome)
+DIMENSOES_DURACAO = {
+    "responsavel": (DuracaoExecucao.responsavel_id, Usuario.nome, Usuario.id),
+    "caso": (DuracaoExecucao.caso_teste_id, CasoTeste.nome, CasoTeste.id),
+    "projeto": (DuracaoExecucao.projeto_id, Projeto.nome, Projeto.id),
+    "ciclo": (DuracaoExecucao.ciclo_teste_id, CicloTeste.nome, CicloTeste.id),
+}
 
 class DashboardRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_kpis_gerais(self, sistema_id: Optional[int] = None) -> Dict[str, Any]:
-        # --- 1. PROJETOS ---
-        q_projetos = select(func.count(Projeto.id)).where(Projeto.status == StatusProjetoEnum.ativo)
-        if sistema_id:
-            q_projetos = q_projetos.where(Projeto.sistema_id == sistema_id)
+    def _total(self, modelo, *condicoes):
+        """SUM(total) FILTER (WHERE ...) sobre uma tabela de rollup, com 0 no lugar de NULL."""
+        soma = func.sum(modelo.total)
+        if condicoes:
+            soma = soma.filter(*condicoes)
+        return func.coalesce(soma, 0)
 
-        # --- 2. CICLOS ---
-        q_ciclos = select(func.count(CicloTeste.id)).join(Projeto).where(
-            CicloTeste.status.in_([StatusCicloEnum.em_execucao, StatusCicloEnum.planejado])
-        )
-        if sistema_id:
-            q_ciclos = q_ciclos.where(Projeto.sistema_id == sistema_id)
+    def _montar_consulta_kpis(self, sistema_id: Optional[int] = None):
+        """Monta uma única instrução com todos os KPIs do dashboard geral.
 
-        # --- 3. CASOS DE TESTE ---
-        q_casos = select(func.count(CasoTeste.id)).join(Projeto)
-        if sistema_id:
-            q_casos = q_casos.where(Projeto.sistema_id == sistema_id)
+        Execuções, defeitos e projetos vêm das tabelas de rollup (já chaveadas por
+        sistema); ciclos e casos, que não crescem com o histórico, vêm das tabelas base
+        filtradas pelo CTE de projetos do sistema.
+        """
+        def _escopo(consulta, coluna_sistema):
+            return consulta.where(coluna_sistema == sistema_id) if sistema_id else consulta
 
-        # --- 4. DEFEITOS ABERTOS ---
-        q_defeitos_abertos = (
-            select(func.count(Defeito.id))
-            .join(Defeito.execucao)
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .where(Defeito.status.in_([StatusDefeitoEnum.aberto, StatusDefeitoEnum.em_teste]))
-        )
-        if sistema_id:
-            q_defeitos_abertos = q_defeitos_abertos.where(Projeto.sistema_id == sistema_id)
+        projetos_escopo = _escopo(select(Projeto.id), Projeto.sistema_id).cte("projetos_escopo")
 
-        # --- 5. DEFEITOS CRITICOS/ALTOS ---
-        q_criticos = (
-            select(func.count(Defeito.id))
-            .join(Defeito.execucao)
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .where(
-                Defeito.status != StatusDefeitoEnum.fechado,
-                Defeito.severidade.in_([SeveridadeDefeitoEnum.critico, SeveridadeDefeitoEnum.alto])
-            )
+        # --- PROJETOS ---
+        kpi_projetos = _escopo(
+            select(
+                self._total(RollupProjeto, RollupProjeto.status == StatusProjetoEnum.ativo).label("total_projetos")
+            ),
+            RollupProjeto.sistema_id
+        ).cte("kpi_projetos")
+
+        # --- CICLOS ---
+        kpi_ciclos = (
+            select(func.count().label("total_ciclos_ativos"))
+            .select_from(CicloTeste)
+            .join(projetos_escopo, CicloTeste.projeto_id == projetos_escopo.c.id)
+            .where(CicloTeste.status.in_([StatusCicloEnum.em_execucao, StatusCicloEnum.planejado]))
+            .cte("kpi_ciclos")
         )
-        if sistema_id:
-            q_criticos = q_criticos.where(Projeto.sistema_id == sistema_id)
 
-        # --- 6. AGUARDANDO RETESTE (Defeitos corrigidos) ---
-        q_reteste = (
-            select(func.count(Defeito.id))
-            .join(Defeito.execucao)
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .where(Defeito.status == StatusDefeitoEnum.corrigido)
+        # --- CASOS DE TESTE ---
+        kpi_casos = (
+            select(func.count().label("total_casos_teste"))
+            .select_from(CasoTeste)
+            .join(projetos_escopo, CasoTeste.projeto_id == projetos_escopo.c.id)
+            .cte("kpi_casos")
         )
-        if sistema_id:
-            q_reteste = q_reteste.where(Projeto.sistema_id == sistema_id)
 
-        # --- 7. STATUS DE EXECUÇÃO (Para KPIs e Taxas) ---
-        #  Passou (fechado), Falhou (falha) e Pendentes separadamente
-        q_exec_stats = (
+        # --- STATUS DE EXECUÇÃO (uma coluna por status) ---
+        kpi_execucoes = _escopo(
+            select(*[
+                self._total(RollupExecucao, RollupExecucao.status_geral == s).label(f"exec_{s.value}")
+                for s in StatusExecucaoEnum
+            ]),
+            RollupExecucao.sistema_id
+        ).cte("kpi_execucoes")
+
+        # --- DEFEITOS (abertos, críticos, reteste e distribuição por severidade) ---
+        nao_fechado = RollupDefeito.status != StatusDefeitoEnum.fechado
+        kpi_defeitos = _escopo(
             select(
-                func.sum(case((ExecucaoTeste.status_geral == StatusExecucaoEnum.fechado, 1), else_=0)), # Passou
-                func.sum(case((ExecucaoTeste.status_geral == StatusExecucaoEnum.falha, 1), else_=0)),   # Falhou
-                func.sum(case((ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.pendente, StatusExecucaoEnum.em_progresso]), 1), else_=0)), # Pendente
-                func.sum(case((ExecucaoTeste.status_geral == StatusExecucaoEnum.bloqueado, 1), else_=0)) # Bloqueado
+                self._total(
+                    RollupDefeito,
+                    RollupDefeito.status.in_([StatusDefeitoEnum.aberto, StatusDefeitoEnum.em_teste])
+                ).label("total_defeitos_abertos"),
+                self._total(
+                    RollupDefeito,
+                    nao_fechado,
+                    RollupDefeito.severidade.in_([SeveridadeDefeitoEnum.critico, SeveridadeDefeitoEnum.alto])
+                ).label("total_defeitos_criticos"),
+                self._total(
+                    RollupDefeito, RollupDefeito.status == StatusDefeitoEnum.corrigido
+                ).label("total_aguardando_reteste"),
+                *[
+                    self._total(RollupDefeito, nao_fechado, RollupDefeito.severidade == sev).label(f"sev_{sev.value}")
+                    for sev in SeveridadeDefeitoEnum
+                ]
+            ),
+            RollupDefeito.sistema_id
+        ).cte("kpi_defeitos")
+
+        # cada CTE devolve exatamente uma linha; o join em TRUE apenas as justapõe
+        return (
+            select(kpi_projetos, kpi_ciclos, kpi_casos, kpi_execucoes, kpi_defeitos)
+            .select_from(
+                kpi_projetos
+                .join(kpi_ciclos, true())
+                .join(kpi_casos, true())
+                .join(kpi_execucoes, true())
+                .join(kpi_defeitos, true())
             )
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
         )
-        if sistema_id:
-            q_exec_stats = q_exec_stats.where(Projeto.sistema_id == sistema_id)
-
-        # EXECUÇÃO DAS QUERIES
-        total_projetos = (await self.db.execute(q_projetos)).scalar() or 0
-        total_ciclos = (await self.db.execute(q_ciclos)).scalar() or 0
-        total_casos = (await self.db.execute(q_casos)).scalar() or 0
-        total_defeitos = (await self.db.execute(q_defeitos_abertos)).scalar() or 0
-        total_criticos = (await self.db.execute(q_criticos)).scalar() or 0
-        total_reteste_def = (await self.db.execute(q_reteste)).scalar() or 0
-        
-        exec_stats_result = (await self.db.execute(q_exec_stats)).first()
-        
-        passed = exec_stats_result[0] or 0
-        failed = exec_stats_result[1] or 0
-        pending = exec_stats_result[2] or 0
-        blocked = exec_stats_result[3] or 0
 
-        
+    async def get_kpis_gerais(self, sistema_id: Optional[int] = None) -> Dict[str, Any]:
+        row = (await self.db.execute(self._montar_consulta_kpis(sistema_id))).mappings().one()
+
+        passed = row["exec_fechado"] or 0
+        failed = row["exec_falha"] or 0
+        pending = (row["exec_pendente"] or 0) + (row["exec_em_progresso"] or 0)
+        blocked = row["exec_bloqueado"] or 0
+
         total_executed_valid = passed + failed
         taxa = round((passed / total_executed_valid * 100), 1) if total_executed_valid > 0 else 0.0
 
-        total_aguardando_reteste = total_reteste_def
+        # Distribuições já no formato (chave, total) usado pelos gráficos, sem as fatias vazias
+        status_execucao = [
+            (s, row[f"exec_{s.value}"]) for s in StatusExecucaoEnum if row[f"exec_{s.value}"]
+        ]
+        defeitos_por_severidade = [
+            (sev, row[f"sev_{sev.value}"]) for sev in SeveridadeDefeitoEnum if row[f"sev_{sev.value}"]
+        ]
 
         return {
-            "total_projetos": total_projetos,
-            "total_ciclos_ativos": total_ciclos,
-            "total_casos_teste": total_casos,
+            "total_projetos": row["total_projetos"] or 0,
+            "total_ciclos_ativos": row["total_ciclos_ativos"] or 0,
+            "total_casos_teste": row["total_casos_teste"] or 0,
             "taxa_sucesso_ciclos": taxa,
-            "total_defeitos_abertos": total_defeitos,
-            "total_defeitos_criticos": total_criticos,
+            "total_defeitos_abertos": row["total_defeitos_abertos"] or 0,
+            "total_defeitos_criticos": row["total_defeitos_criticos"] or 0,
             "total_pendentes": pending,
             "total_bloqueados": blocked,
-            "total_aguardando_reteste": total_aguardando_reteste
+            "total_aguardando_reteste": row["total_aguardando_reteste"] or 0,
+            "status_execucao": status_execucao,
+            "defeitos_por_severidade": defeitos_por_severidade
         }
 
     async def get_status_execucao_geral(self, sistema_id: Optional[int] = None) -> List[tuple]:
         query = (
-            select(ExecucaoTeste.status_geral, func.count(ExecucaoTeste.id))
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .group_by(ExecucaoTeste.status_geral)
+            select(RollupExecucao.status_geral, func.sum(RollupExecucao.total))
+            .group_by(RollupExecucao.status_geral)
+            .having(func.sum(RollupExecucao.total) > 0)
         )
         if sistema_id:
-            query = query.where(Projeto.sistema_id == sistema_id)
+            query = query.where(RollupExecucao.sistema_id == sistema_id)
             
         result = await self.db.execute(query)
         return result.all()
 
     async def get_defeitos_por_severidade(self, sistema_id: Optional[int] = None) -> List[tuple]:
         query = (
-            select(Defeito.severidade, func.count(Defeito.id))
-            .join(Defeito.execucao)
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .where(Defeito.status != StatusDefeitoEnum.fechado)
-            .group_by(Defeito.severidade)
+            select(RollupDefeito.severidade, func.sum(RollupDefeito.total))
+            .where(RollupDefeito.status != StatusDefeitoEnum.fechado)
+            .group_by(RollupDefeito.severidade)
+            .having(func.sum(RollupDefeito.total) > 0)
         )
         if sistema_id:
-            query = query.where(Projeto.sistema_id == sistema_id)
+            query = query.where(RollupDefeito.sistema_id == sistema_id)
             
         result = await self.db.execute(query)
         return result.all()
     
     async def get_modulos_com_mais_defeitos(self, limit: int = 5, sistema_id: Optional[int] = None) -> List[tuple]:
+        total = func.sum(RollupDefeito.total)
         query = (
-            select(Modulo.nome, func.count(Defeito.id))
-            .select_from(Defeito)
-            .join(Defeito.execucao)
-            .join(ExecucaoTeste.caso_teste)
-            .join(CasoTeste.projeto)
-            .join(Projeto.modulo)
+            select(Modulo.nome, total)
+            .select_from(RollupDefeito)
+            .join(Modulo, RollupDefeito.modulo_id == Modulo.id)
             .group_by(Modulo.nome)
-            .order_by(desc(func.count(Defeito.id)))
+            .having(total > 0)
+            .order_by(desc(total))
             .limit(limit)
         )
         
         if sistema_id:
-            query = query.where(Projeto.sistema_id == sistema_id)
+            query = query.where(RollupDefeito.sistema_id == sistema_id)
 
         result = await self.db.execute(query)
         return result.all()
 
     # --- metodos do runner ---
     async def get_runner_kpis(self, runner_id: int) -> Dict[str, Any]:
-        q_concluidos = select(func.count(ExecucaoTeste.id)).where(
-            ExecucaoTeste.responsavel_id == runner_id,
-            ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado])
-        )
+        concluidos = [StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]
 
-        q_defeitos = select(func.count(Defeito.id)).join(Defeito.execucao).where(
-            ExecucaoTeste.responsavel_id == runner_id
-        )
+        q_execucoes = select(
+            self._total(RollupExecucao, RollupExecucao.status_geral.in_(concluidos)).label("concluidos"),
+            self._total(RollupExecucao, RollupExecucao.status_geral == StatusExecucaoEnum.pendente).label("fila")
+        ).where(RollupExecucao.responsavel_id == runner_id)
 
-        q_fila = select(func.count(ExecucaoTeste.id)).where(
-            ExecucaoTeste.responsavel_id == runner_id,
-            ExecucaoTeste.status_geral == StatusExecucaoEnum.pendente
-        )
+        q_defeitos = select(self._total(RollupDefeito)).where(RollupDefeito.responsavel_id == runner_id)
 
         q_last = select(func.max(ExecucaoTeste.updated_at)).where(
             ExecucaoTeste.responsavel_id == runner_id
         )
 
-        total_concluidos = (await self.db.execute(q_concluidos)).scalar() or 0
+        q_tempo = select(func.avg(DuracaoExecucao.duracao_segundos)).where(
+            DuracaoExecucao.responsavel_id == runner_id
+        )
+
+        execucoes = (await self.db.execute(q_execucoes)).first()
         total_defeitos = (await self.db.execute(q_defeitos)).scalar() or 0
-        total_fila = (await self.db.execute(q_fila)).scalar() or 0
         ultima_atividade = (await self.db.execute(q_last)).scalar()
+        tempo_medio_segundos = (await self.db.execute(q_tempo)).scalar() or 0.0
 
         return {
-            "total_concluidos": total_concluidos,
+            "total_concluidos": execucoes.concluidos,
             "total_defeitos": total_defeitos,
-            "tempo_medio_minutos": 0.0,
-            "total_fila": total_fila,
+            "tempo_medio_minutos": round(tempo_medio_segundos / 60, 1),
+            "total_fila": execucoes.fila,
             "ultima_atividade": ultima_atividade
         }
 
     async def get_status_distribution(self, runner_id: Optional[int] = None) -> List[tuple]:
-        query = select(ExecucaoTeste.status_geral, func.count(ExecucaoTeste.id)).group_by(ExecucaoTeste.status_geral)
+        query = (
+            select(RollupExecucao.status_geral, func.sum(RollupExecucao.total))
+            .group_by(RollupExecucao.status_geral)
+            .having(func.sum(RollupExecucao.total) > 0)
+        )
         if runner_id:
-            query = query.where(ExecucaoTeste.responsavel_id == runner_id)
+            query = query.where(RollupExecucao.responsavel_id == runner_id)
         
         result = await self.db.execute(query)
         return result.all()
@@ -224,12 +255,14 @@ class DashboardRepository:
         return result.scalars().all()
 
     async def get_ranking_runners(self, limit: int = 5) -> List[tuple]:
+        total = func.sum(RollupExecucao.total)
         query = (
-            select(Usuario.nome, func.count(ExecucaoTeste.id))
-            .join(ExecucaoTeste, Usuario.id == ExecucaoTeste.responsavel_id)
-            .where(ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]))
+            select(Usuario.nome, total)
+            .join(RollupExecucao, Usuario.id == RollupExecucao.responsavel_id)
+            .where(RollupExecucao.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]))
             .group_by(Usuario.nome)
-            .order_by(desc(func.count(ExecucaoTeste.id)))
+            .having(total > 0)
+            .order_by(desc(total))
             .limit(limit)
         )
         result = await self.db.execute(query)
@@ -237,22 +270,25 @@ class DashboardRepository:
 
     # --- metodos de performance (novos) ---
 
-    async def get_performance_velocity(self, user_id: Optional[int] = None, days: int = 30) -> List[tuple]:
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
+    async def get_performance_velocity(
+        self, user_id: Optional[int] = None, days: int = 30, agrupamento: str = "dia"
+    ) -> List[tuple]:
+        """Conclusões por período, lidas da série temporal (conclusoes_diarias)."""
+        cutoff_date = date.today() - timedelta(days=days)
+
+        periodo = ConclusaoDiaria.dia
+        if agrupamento != "dia":
+            periodo = func.date_trunc(AGRUPAMENTOS_VELOCIDADE[agrupamento], ConclusaoDiaria.dia).cast(Date)
+
         query = (
-            select(
-                func.date(ExecucaoTeste.updated_at).label('date'), 
-                func.count(ExecucaoTeste.id)
-            )
-            .where(ExecucaoTeste.updated_at >= cutoff_date)
-            .where(ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado]))
-            .group_by(func.date(ExecucaoTeste.updated_at))
-            .order_by(func.date(ExecucaoTeste.updated_at))
+            select(periodo.label('date'), func.sum(ConclusaoDiaria.total))
+            .where(ConclusaoDiaria.dia > cutoff_date)
+            .group_by(periodo)
+            .order_by(periodo)
         )
 
         if user_id:
-            query = query.where(ExecucaoTeste.responsavel_id == user_id)
+            query = query.where(ConclusaoDiaria.responsavel_id == user_id)
 
         result = await self.db.execute(query)
         return result.all()
@@ -301,6 +337,34 @@ class DashboardRepository:
         result = await self.db.execute(query)
         return result.all()
 
+    async def get_duracoes(
+        self, agrupar_por: str, days: int = 90, filtro_id: Optional[int] = None
+    ) -> List[tuple]:
+        """Média, p50 e p95 das durações (segundos) por testador, caso, projeto ou ciclo."""
+        chave, nome, id_nome = DIMENSOES_DURACAO[agrupar_por]
+        cutoff_date = datetime.now() - timedelta(days=days)
+        segundos = DuracaoExecucao.duracao_segundos
+
+        query = (
+            select(
+                chave,
+                func.coalesce(nome, "Não identificado").label("label"),
+                func.count(),
+                func.avg(segundos),
+                func.percentile_cont(0.5).within_group(segundos),
+                func.percentile_cont(0.95).within_group(segundos)
+            )
+            .outerjoin(id_nome.table, id_nome == chave)
+            .where(DuracaoExecucao.finalizado_em >= cutoff_date)
+            .group_by(chave, nome)
+            .order_by(chave)
+        )
+        if filtro_id:
+            query = query.where(chave == filtro_id)
+
+        result = await self.db.execute(query)
+        return result.all()
+
     async def get_team_performance_stats(self, days: int = 30) -> Dict[str, Any]:
         """4 métricas gerais (equipe) focadas em testadores."""
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -441,52 +505,45 @@ class DashboardRepository:
         }
 
     async def get_team_stats_aggregates(self) -> Dict[str, Any]:
-        # 1. total de execucoes 
-        q_total_exec = select(func.count(ExecucaoTeste.id)).where(
-            ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado])
+        q_execucoes = select(
+            # 1. total de execucoes 
+            self._total(
+                RollupExecucao,
+                RollupExecucao.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado])
+            ).label("total"),
+            # 2. execucoes aprovadas
+            self._total(RollupExecucao, RollupExecucao.status_geral == StatusExecucaoEnum.fechado).label("aprovadas")
         )
-        
-        # 2. execucoes aprovadas
-        q_passed = select(func.count(ExecucaoTeste.id)).where(ExecucaoTeste.status_geral == StatusExecucaoEnum.fechado)
-        
+
         # 3. total de defeitos
-        q_defects = select(func.count(Defeito.id))
+        q_defects = select(self._total(RollupDefeito))
 
-        total_exec = (await self.db.execute(q_total_exec)).scalar() or 0
-        passed = (await self.db.execute(q_passed)).scalar() or 0
+        execucoes = (await self.db.execute(q_execucoes)).first()
         total_defects = (await self.db.execute(q_defects)).scalar() or 0
 
         return {
-            "total_executions": total_exec,
-            "passed_executions": passed,
+            "total_executions": execucoes.total,
+            "passed_executions": execucoes.aprovadas,
             "total_defects": total_defects
         }
 
     async def get_user_stats_aggregates(self, user_id: int) -> Dict[str, Any]:
     
-        q_bugs = (
-            select(func.count(Defeito.id))
-            .select_from(Defeito)
-            .join(Defeito.execucao)
-            .where(ExecucaoTeste.responsavel_id == user_id)
-        )
+        q_bugs = select(self._total(RollupDefeito)).where(RollupDefeito.responsavel_id == user_id)
 
-        q_execs = select(func.count(ExecucaoTeste.id)).where(
-            ExecucaoTeste.responsavel_id == user_id,
-            ExecucaoTeste.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado])
-        )
-
-        q_blocked = select(func.count(ExecucaoTeste.id)).where(
-            ExecucaoTeste.responsavel_id == user_id,
-            ExecucaoTeste.status_geral == StatusExecucaoEnum.bloqueado
-        )
+        q_execs = select(
+            self._total(
+                RollupExecucao,
+                RollupExecucao.status_geral.in_([StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado])
+            ).label("total"),
+            self._total(RollupExecucao, RollupExecucao.status_geral == StatusExecucaoEnum.bloqueado).label("bloqueadas")
+        ).where(RollupExecucao.responsavel_id == user_id)
 
         reported_bugs = (await self.db.execute(q_bugs)).scalar() or 0
-        total_execs = (await self.db.execute(q_execs)).scalar() or 0
-        blocked_execs = (await self.db.execute(q_blocked)).scalar() or 0
+        execucoes = (await self.db.execute(q_execs)).first()
 
         return {
             "reported_bugs": reported_bugs,
-            "total_executions": total_execs,
-            "blocked_executions": blocked_execs
-        }
\ No newline at end of file
+            "total_executions": execucoes.total,
+            "blocked_executions": execucoes.bloqueadas
+        }
@@ -3,16 +3,26 @@ import json
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, aliased
-from sqlalchemy import desc
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.models.testing import Defeito, ExecucaoTeste, CasoTeste, ExecucaoPasso
+from app.models.testing import Defeito, ExecucaoTeste, CasoTeste, ExecucaoPasso, StatusDefeitoEnum
 from app.models.projeto import Projeto
 from app.models.usuario import Usuario
 from app.schemas.defeito import DefeitoCreate, DefeitoUpdate
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.sincronizacao_repository import SincronizacaoRepository, REMOCAO_DEFEITO
+from app.core.cache import invalidar_alteracoes
+from app.core.auditoria import enfileirar_auditoria
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.errors import ConflitoVersao
+from app.core.outbox import registrar_evento, EVENTO_DEFEITO_STATUS
+from app.repositories.execucao_teste_repository import TENTATIVAS_VERSAO
 
 class DefeitoRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = RollupRepository(db)
+        self.sincronizacao = SincronizacaoRepository(db)
 
     def _get_load_options(self):
         return [
@@ -59,7 +69,11 @@ class DefeitoRepository:
             return defeito_existente
         novo_defeito = Defeito(**dados_dict)
         self.db.add(novo_defeito)
+        await self.db.flush()
+        await self.rollup.registrar_defeitos([novo_defeito.id])
+        await enfileirar_auditoria(self.db, novo_defeito)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         query_novo = (
             select(Defeito)
             .options(*self._get_load_options()) 
@@ -69,25 +83,56 @@ class DefeitoRepository:
         return result.scalars().first()
 
     async def update(self, id: int, dados: DefeitoUpdate) -> Optional[Defeito]:
-        defeito = await self.get_by_id(id)
-        if not defeito:
-            return None
-            
-        update_data = dados.model_dump(exclude_unset=True)
+        update_data = dados.model_dump(exclude_unset=True, exclude={'versao'})
         if 'evidencias' in update_data and isinstance(update_data['evidencias'], list):
              update_data['evidencias'] = json.dumps(update_data['evidencias'])
 
-        for key, value in update_data.items():
-            setattr(defeito, key, value)
-            
-        await self.db.commit()
-        return await self.get_by_id(id)
+        for _ in range(TENTATIVAS_VERSAO):
+            defeito = await self.get_by_id(id)
+            if not defeito:
+                return None
+            if dados.versao is not None and defeito.versao != dados.versao:
+                raise ConflitoVersao("Defeito", id)
+
+            antigo = (defeito.status, defeito.severidade)
+            for key, value in update_data.items():
+                setattr(defeito, key, value)
+
+            # UPDATE ... WHERE versao = lida; o rollup só anda se a troca de status valeu
+            try:
+                await self.db.flush()
+            except StaleDataError:
+                await self.db.rollback()
+                if dados.versao is not None:
+                    raise ConflitoVersao("Defeito", id)
+                continue
+
+            await self.rollup.mover_defeito(id, antigo, (defeito.status, defeito.severidade))
+            if defeito.status != antigo[0]:
+                registrar_evento(
+                    self.db, EVENTO_DEFEITO_STATUS,
+                    defeito_id=id, execucao_teste_id=defeito.execucao_teste_id,
+                    status_antigo=antigo[0], status_novo=defeito.status
+                )
+            await enfileirar_auditoria(self.db, defeito)
+            await self.db.commit()
+            await invalidar_alteracoes(self.db)
+            return await self.get_by_id(id)
+
+        raise ConflitoVersao("Defeito", id)
 
     async def delete(self, id: int) -> bool:
         defeito = await self.db.get(Defeito, id)
         if defeito:
+            await self.rollup.registrar_defeitos([id], -1)
+            responsavel_id = (await self.db.execute(
+                select(ExecucaoTeste.responsavel_id).where(ExecucaoTeste.id == defeito.execucao_teste_id)
+            )).scalar()
+            self.sincronizacao.registrar_remocoes(REMOCAO_DEFEITO, [(id, responsavel_id)])
             await self.db.delete(defeito)
+            await enfileirar_auditoria(self.db)
             await self.db.commit()
+            await invalidar_alteracoes(self.db)
             return True
         return False
 
@@ -96,10 +141,14 @@ class DefeitoRepository:
             select(Defeito)
             .options(*self._get_load_options())
             .where(Defeito.id == id)
+            .execution_options(populate_existing=True)
         )
         result = await self.db.execute(query)
         return result.scalars().first()
 
+    async def get_status(self, id: int) -> Optional[StatusDefeitoEnum]:
+        return (await self.db.execute(select(Defeito.status).where(Defeito.id == id))).scalar()
+
     async def get_by_execucao(self, execucao_id: int) -> Sequence[Defeito]:
         query = (
             select(Defeito)
@@ -109,7 +158,31 @@ class DefeitoRepository:
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_all_with_details(self, responsavel_id: Optional[int] = None):
+    async def listar_alteracoes(self, responsavel_id: int, desde: Optional[int] = None):
+        """Defeitos das execuções do usuário gravados por transações com xid >= `desde`."""
+        query = (
+            select(
+                Defeito.id,
+                Defeito.execucao_teste_id,
+                Defeito.titulo,
+                Defeito.descricao,
+                Defeito.evidencias,
+                Defeito.severidade,
+                Defeito.status,
+                Defeito.versao,
+                Defeito.created_at,
+                Defeito.updated_at
+            )
+            .join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id)
+            .where(ExecucaoTeste.responsavel_id == responsavel_id)
+            .order_by(Defeito.id)
+        )
+        if desde is not None:
+            query = query.where(Defeito.alteracao >= desde)
+        result = await self.db.execute(query)
+        return result.mappings().all()
+
+    async def get_all_with_details(self, responsavel_id: Optional[int] = None, pagina: Optional[Pagina] = None):
         Runner = aliased(Usuario)  
         Manager = aliased(Usuario) 
 
@@ -134,11 +207,10 @@ class DefeitoRepository:
             .join(Projeto, CasoTeste.projeto_id == Projeto.id)
             .outerjoin(Runner, ExecucaoTeste.responsavel_id == Runner.id)
             .outerjoin(Manager, Projeto.responsavel_id == Manager.id)
-            .order_by(desc(Defeito.id))
         )
 
         if responsavel_id:
             query = query.where(ExecucaoTeste.responsavel_id == responsavel_id)
 
-        result = await self.db.execute(query)
-        return result.mappings().all()
\ No newline at end of file
+        result = await self.db.execute(paginar(query, pagina, Defeito.id))
+        return fechar_pagina(result.mappings().all(), pagina, Defeito.id)
\ No newline at end of file
@@ -0,0 +1,245 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+from datetime import datetime
+from sqlalchemy import delete, func, update
+from sqlalchemy.future import select
+from typing import Collection, Dict, List, Optional, Tuple, Type, Union
+from app.models.evidencia import ObjetoEvidencia, UploadEvidencia
+from app.models.testing import CasoTeste, Defeito, ExecucaoPasso, ExecucaoTeste, PassoCasoTeste
+from app.core.outbox import registrar_evento, EVENTO_EVIDENCIA_ARMAZENADA
+from app.core.auditoria import enfileirar_auditoria
+from app.core.evidencias import extrair_hashes
+
+class EvidenciaRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, sha256: str) -> Optional[ObjetoEvidencia]:
+        result = await self.db.execute(select(ObjetoEvidencia).where(ObjetoEvidencia.sha256 == sha256))
+        return result.scalars().first()
+
+    async def registrar(self, dados: dict) -> ObjetoEvidencia:
+        """Cria o objeto sem referências; se outro upload do mesmo conteúdo chegou antes, mantém o dele.
+
+        Só o upload que cria o objeto agenda as variantes (miniatura/prévia) pelo outbox.
+        """
+        stmt = pg_insert(ObjetoEvidencia).values(
+            sha256=dados["sha256"],
+            extensao=dados["extensao"],
+            mime_type=dados["mime_type"],
+            tamanho=dados["tamanho"]
+        ).on_conflict_do_nothing(index_elements=["sha256"]).returning(ObjetoEvidencia.sha256)
+        if (await self.db.execute(stmt)).scalar() is not None:
+            registrar_evento(
+                self.db, EVENTO_EVIDENCIA_ARMAZENADA,
+                sha256=dados["sha256"], extensao=dados["extensao"], mime_type=dados["mime_type"]
+            )
+        await enfileirar_auditoria(self.db)
+        await self.db.commit()
+        return await self.get(dados["sha256"])
+
+    async def bloquear_conteudo(self, sha256: str):
+        """Bloqueio do conteúdo até o fim da transação (pg_advisory_xact_lock).
+
+        Uploads do mesmo conteúdo e a coleta de órfãos se revezam: a coleta não apaga um arquivo
+        regravado entre a remoção do registro e a dos arquivos.
+        """
+        chave = int.from_bytes(bytes.fromhex(sha256)[:8], "big", signed=True)
+        await self.db.execute(select(func.pg_advisory_xact_lock(chave)))
+
+    async def liberar_conteudo(self):
+        """Confirma a transação aberta por bloquear_conteudo, soltando o bloqueio."""
+        await self.db.commit()
+
+    async def encerrar_leitura(self):
+        """Fecha a transação das leituras feitas até aqui: E/S longa no armazenamento não prende conexão do pool."""
+        await self.db.commit()
+
+    async def renovar_carencia(self, sha256: str, confirmar: bool = True) -> bool:
+        """Reinicia a carência de um objeto sem referências que está sendo reaproveitado.
+
+        False se o objeto não existe mais (a coleta de órfãos pode tê-lo removido) ou voltou a ter referências.
+        Com `confirmar=False` a renovação fica na transação corrente (e no bloqueio do conteúdo).
+        """
+        result = await self.db.execute(
+            update(ObjetoEvidencia)
+            .where(ObjetoEvidencia.sha256 == sha256, ObjetoEvidencia.referencias <= 0)
+            .values(sem_referencia_desde=func.now())
+            .returning(ObjetoEvidencia.sha256)
+        )
+        renovado = result.scalar() is not None
+        if confirmar:
+            await self.db.commit()
+        return renovado
+
+    # --- Coleta de órfãos ---
+    async def listar_evidencias(
+        self, modelo: Type[Union[ExecucaoPasso, Defeito]], apos_id: int, limite: int
+    ) -> List[Tuple[int, str]]:
+        """Próximo lote (paginado por id) de listas de evidências não vazias de passos ou defeitos."""
+        result = await self.db.execute(
+            select(modelo.id, modelo.evidencias)
+            .where(modelo.id > apos_id, modelo.evidencias.isnot(None), modelo.evidencias.notin_(["", "[]"]))
+            .order_by(modelo.id)
+            .limit(limite)
+        )
+        rows = result.all()
+        # Cada lote em sua própria transação curta: a varredura não segura um snapshot por horas
+        await self.db.commit()
+        return rows
+
+    async def get_varios(self, hashes: Collection[str]) -> Dict[str, ObjetoEvidencia]:
+        if not hashes:
+            return {}
+        result = await self.db.execute(select(ObjetoEvidencia).where(ObjetoEvidencia.sha256.in_(sorted(hashes))))
+        return {objeto.sha256: objeto for objeto in result.scalars()}
+
+    async def recontar_referencias(self, sha256: str) -> Optional[int]:
+        """Quantas listas de passos e defeitos citam o objeto agora; None se o registro não existe.
+
+        O registro fica bloqueado (FOR UPDATE) até o commit: uma escrita concorrente aplica sua
+        variação no contador depois da correção, nunca é sobrescrita por ela.
+        """
+        bloqueado = await self.db.execute(
+            select(ObjetoEvidencia.sha256).where(ObjetoEvidencia.sha256 == sha256).with_for_update()
+        )
+        if bloqueado.scalar() is None:
+            return None
+        total = 0
+        for modelo in (ExecucaoPasso, Defeito):
+            listas = await self.db.execute(select(modelo.evidencias).where(modelo.evidencias.contains(sha256)))
+            total += sum(1 for evidencias in listas.scalars() if sha256 in extrair_hashes(evidencias))
+        return total
+
+    async def corrigir_referencias(self, sha256: str, total: int) -> bool:
+        """Ajusta o contador ao total recontado; zerado agora, a carência começa agora. False se já estava certo."""
+        result = await self.db.execute(
+            update(ObjetoEvidencia)
+            .where(ObjetoEvidencia.sha256 == sha256, ObjetoEvidencia.referencias != total)
+            .values(
+                referencias=total,
+                sem_referencia_desde=func.coalesce(ObjetoEvidencia.sem_referencia_desde, func.now()) if total <= 0 else None
+            )
+            .returning(ObjetoEvidencia.sha256)
+            .execution_options(synchronize_session=False)
+        )
+        corrigido = result.scalar() is not None
+        await self.db.commit()
+        return corrigido
+
+    async def remover_se_orfao(self, sha256: str, sem_referencia_ate: datetime, confirmar: bool = True) -> bool:
+        """Apaga o registro só se continua sem referências desde antes de `sem_referencia_ate`."""
+        result = await self.db.execute(
+            delete(ObjetoEvidencia)
+            .where(
+                ObjetoEvidencia.sha256 == sha256,
+                ObjetoEvidencia.referencias <= 0,
+                ObjetoEvidencia.sem_referencia_desde <= sem_referencia_ate
+            )
+            .returning(ObjetoEvidencia.sha256)
+        )
+        removido = result.scalar() is not None
+        if confirmar:
+            await self.db.commit()
+        return removido
+
+    async def listar_uploads(self) -> Dict[str, datetime]:
+        result = await self.db.execute(select(UploadEvidencia.id, UploadEvidencia.expira_em))
+        return dict(result.all())
+
+    async def remover_uploads_expirados(self, agora: datetime) -> int:
+        result = await self.db.execute(delete(UploadEvidencia).where(UploadEvidencia.expira_em <= agora))
+        await self.db.commit()
+        return result.rowcount
+
+    # --- Exportação ---
+    async def existe(self, modelo, id: int) -> bool:
+        return (await self.db.execute(select(modelo.id).where(modelo.id == id))).first() is not None
+
+    async def listar_para_exportacao(
+        self, *, ciclo_id: Optional[int] = None, execucao_id: Optional[int] = None, defeito_id: Optional[int] = None
+    ) -> list:
+        """Listas de evidências de passos e defeitos do escopo, com o contexto usado nas pastas e no manifesto."""
+        linhas = []
+        if defeito_id is None:
+            query = (
+                select(
+                    ExecucaoPasso.execucao_teste_id.label("execucao_id"),
+                    CasoTeste.nome.label("caso"),
+                    PassoCasoTeste.ordem.label("referencia"),
+                    ExecucaoPasso.status,
+                    ExecucaoPasso.evidencias
+                )
+                .join(ExecucaoTeste, ExecucaoTeste.id == ExecucaoPasso.execucao_teste_id)
+                .join(CasoTeste, CasoTeste.id == ExecucaoTeste.caso_teste_id)
+                .join(PassoCasoTeste, PassoCasoTeste.id == ExecucaoPasso.passo_caso_teste_id)
+                .where(ExecucaoPasso.evidencias.isnot(None), ExecucaoPasso.evidencias.notin_(["", "[]"]))
+                .order_by(ExecucaoPasso.execucao_teste_id, PassoCasoTeste.ordem, ExecucaoPasso.id)
+            )
+            if ciclo_id is not None:
+                query = query.where(ExecucaoTeste.ciclo_teste_id == ciclo_id)
+            if execucao_id is not None:
+                query = query.where(ExecucaoTeste.id == execucao_id)
+            linhas += [{"origem": "passo", **row._mapping} for row in await self.db.execute(query)]
+
+        query = (
+            select(
+                Defeito.execucao_teste_id.label("execucao_id"),
+                CasoTeste.nome.label("caso"),
+                Defeito.id.label("referencia"),
+                Defeito.status,
+                Defeito.evidencias
+            )
+            .join(ExecucaoTeste, ExecucaoTeste.id == Defeito.execucao_teste_id)
+            .join(CasoTeste, CasoTeste.id == ExecucaoTeste.caso_teste_id)
+            .where(Defeito.evidencias.isnot(None), Defeito.evidencias.notin_(["", "[]"]))
+            .order_by(Defeito.execucao_teste_id, Defeito.id)
+        )
+        if ciclo_id is not None:
+            query = query.where(ExecucaoTeste.ciclo_teste_id == ciclo_id)
+        if execucao_id is not None:
+            query = query.where(ExecucaoTeste.id == execucao_id)
+        if defeito_id is not None:
+            query = query.where(Defeito.id == defeito_id)
+        linhas += [{"origem": "defeito", **row._mapping} for row in await self.db.execute(query)]
+        return linhas
+
+    # --- Sessões de upload retomável ---
+    async def criar_upload(self, dados: dict) -> UploadEvidencia:
+        upload = UploadEvidencia(**dados)
+        self.db.add(upload)
+        await self.db.commit()
+        await self.db.refresh(upload)
+        return upload
+
+    async def get_upload(self, upload_id: str, usuario_id: int) -> Optional[UploadEvidencia]:
+        result = await self.db.execute(
+            select(UploadEvidencia)
+            .where(UploadEvidencia.id == upload_id, UploadEvidencia.usuario_id == usuario_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+
+    async def marcar_bloco(self, upload_id: str, indice: int) -> Optional[UploadEvidencia]:
+        """Acrescenta o bloco à lista de recebidos; a linha fica travada para blocos enviados em paralelo."""
+        result = await self.db.execute(
+            select(UploadEvidencia)
+            .where(UploadEvidencia.id == upload_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        upload = result.scalars().first()
+        if not upload:
+            return None
+        recebidos = set(json.loads(upload.blocos_recebidos or "[]"))
+        if indice not in recebidos:
+            upload.blocos_recebidos = json.dumps(sorted(recebidos | {indice}))
+        await self.db.commit()
+        await self.db.refresh(upload)
+        return upload
+
+    async def remover_upload(self, upload: UploadEvidencia):
+        await self.db.delete(upload)
+        await enfileirar_auditoria(self.db)
+        await self.db.commit()
@@ -1,20 +1,57 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, insert, func, literal, exists, any_, Integer, case, and_, or_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from typing import Sequence, Optional
 import json # <--- Importar json
 
 from app.models.testing import (
-    ExecucaoTeste, ExecucaoPasso, PassoCasoTeste, 
-    CasoTeste, StatusExecucaoEnum, StatusPassoEnum
+    ExecucaoTeste, ExecucaoPasso, PassoCasoTeste, Defeito,
+    CasoTeste, CicloTeste, StatusExecucaoEnum, StatusPassoEnum, StatusDefeitoEnum
 )
 from app.models.usuario import Usuario
+from app.models.projeto import Projeto
 from app.schemas.execucao_teste import ExecucaoPassoUpdate
+from app.repositories.rollup_repository import RollupRepository, STATUS_CONCLUSAO, entrou_em_conclusao
+from app.core.cache import invalidar_alteracoes
+from app.core.auditoria import enfileirar_auditoria
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.errors import ConflitoVersao
+from app.core.evidencias import acumular_referencias
+
+# Novas tentativas quando uma escrita interna (sem versão do cliente) perde a corrida
+TENTATIVAS_VERSAO = 3
+
+# Status do passo -> contador correspondente em execucoes_teste
+COLUNA_CONTADOR = {
+    StatusPassoEnum.pendente: "passos_pendentes",
+    StatusPassoEnum.aprovado: "passos_aprovados",
+    StatusPassoEnum.reprovado: "passos_reprovados",
+    StatusPassoEnum.bloqueado: "passos_bloqueados",
+}
+
+def _coluna_contador(status) -> Optional[str]:
+    try:
+        return COLUNA_CONTADOR[StatusPassoEnum(status)]
+    except ValueError:
+        return None
+
+def _acumular_troca(deltas: dict, execucao_id: int, status_antigo, status_novo):
+    antiga, nova = _coluna_contador(status_antigo), _coluna_contador(status_novo)
+    if antiga == nova:
+        return
+    variacao = deltas.setdefault(execucao_id, {})
+    if antiga:
+        variacao[antiga] = variacao.get(antiga, 0) - 1
+    if nova:
+        variacao[nova] = variacao.get(nova, 0) + 1
 
 class ExecucaoTesteRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = RollupRepository(db)
 
     async def verificar_pendencias_ciclo(self, ciclo_id: int) -> bool:
         query = select(ExecucaoTeste).where(
@@ -36,6 +73,7 @@ class ExecucaoTesteRepository:
 
         query_passos = select(PassoCasoTeste.id).where(PassoCasoTeste.caso_teste_id == caso_id)
         passos_ids = (await self.db.execute(query_passos)).scalars().all()
+        nova_exec.passos_pendentes = len(passos_ids)
         
         if passos_ids:
             novos_passos_execucao = [
@@ -48,10 +86,135 @@ class ExecucaoTesteRepository:
                 for pid in passos_ids
             ]
             self.db.add_all(novos_passos_execucao)
-        
+
+        await self.rollup.registrar_execucoes([nova_exec.id])
+        await enfileirar_auditoria(self.db, nova_exec)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         return await self.get_by_id(nova_exec.id)
 
+    async def responsaveis_inexistentes(self, ids: Sequence[int]) -> list[int]:
+        existentes = set((await self.db.execute(select(Usuario.id).where(Usuario.id.in_(set(ids))))).scalars())
+        return sorted(set(ids) - existentes)
+
+    async def alocar_em_lote(
+        self, ciclo_id: int, pares: Sequence[tuple[int, int]], ignorar_existentes: bool = True
+    ) -> dict:
+        """Cria execuções e passos de vários casos com INSERT ... SELECT, numa única transação.
+
+        `pares` são tuplas (caso_teste_id, responsavel_id). Só entram casos do projeto do ciclo;
+        com `ignorar_existentes`, casos que já têm execução no ciclo ficam de fora.
+        """
+        if ignorar_existentes:
+            unicos = {}
+            for caso, responsavel in pares:
+                unicos.setdefault(caso, responsavel)
+            pares = list(unicos.items())
+        if not pares:
+            return {"execucoes_criadas": 0, "passos_criados": 0}
+
+        casos, responsaveis = zip(*pares)
+        entrada = (
+            func.unnest(literal(list(casos), ARRAY(Integer)), literal(list(responsaveis), ARRAY(Integer)))
+            .table_valued("caso_teste_id", "responsavel_id")
+            .render_derived("entrada")
+        )
+
+        consulta = (
+            select(
+                literal(ciclo_id),
+                entrada.c.caso_teste_id,
+                entrada.c.responsavel_id,
+                literal(StatusExecucaoEnum.pendente, ExecucaoTeste.status_geral.type),
+                self._total_passos(CasoTeste.id)
+            )
+            .select_from(entrada)
+            .join(CasoTeste, CasoTeste.id == entrada.c.caso_teste_id)
+            .join(CicloTeste, CicloTeste.projeto_id == CasoTeste.projeto_id)
+            .where(CicloTeste.id == ciclo_id)
+        )
+        if ignorar_existentes:
+            consulta = consulta.where(~exists().where(
+                ExecucaoTeste.ciclo_teste_id == ciclo_id,
+                ExecucaoTeste.caso_teste_id == entrada.c.caso_teste_id
+            ))
+
+        resultado = await self._inserir_execucoes(consulta)
+        if resultado["execucoes_criadas"]:
+            await enfileirar_auditoria(self.db, resultado)
+            await self.db.commit()
+            await invalidar_alteracoes(self.db)
+        return resultado
+
+    async def copiar_para_reteste(self, ciclo_origem_id: int, ciclo_destino_id: int, apenas_corrigidos: bool = False) -> dict:
+        """Copia para outro ciclo as execuções não aprovadas (status diferente de fechado).
+
+        Mantém caso e responsável, com passos novos e pendentes. Com `apenas_corrigidos`, só
+        entram execuções com algum defeito em corrigido. Se o caso tem mais de uma execução
+        no ciclo de origem, vale a mais recente. Não faz commit: o chamador fecha a transação
+        junto com a criação do ciclo.
+        """
+        consulta = (
+            select(
+                literal(ciclo_destino_id),
+                ExecucaoTeste.caso_teste_id,
+                ExecucaoTeste.responsavel_id,
+                literal(StatusExecucaoEnum.pendente, ExecucaoTeste.status_geral.type),
+                self._total_passos(ExecucaoTeste.caso_teste_id)
+            )
+            .where(
+                ExecucaoTeste.ciclo_teste_id == ciclo_origem_id,
+                ExecucaoTeste.status_geral != StatusExecucaoEnum.fechado
+            )
+            .distinct(ExecucaoTeste.caso_teste_id)
+            .order_by(ExecucaoTeste.caso_teste_id, ExecucaoTeste.id.desc())
+        )
+        if apenas_corrigidos:
+            consulta = consulta.where(exists().where(
+                Defeito.execucao_teste_id == ExecucaoTeste.id,
+                Defeito.status == StatusDefeitoEnum.corrigido
+            ))
+        return await self._inserir_execucoes(consulta)
+
+    def _total_passos(self, caso_teste_id):
+        return (
+            select(func.count(PassoCasoTeste.id))
+            .where(PassoCasoTeste.caso_teste_id == caso_teste_id)
+            .scalar_subquery()
+        )
+
+    async def _inserir_execucoes(self, consulta) -> dict:
+        """INSERT ... SELECT das execuções e, em seguida, dos passos de cada uma (sem commit).
+
+        `consulta` devolve (ciclo, caso, responsável, status inicial, total de passos).
+        """
+        result = await self.db.execute(
+            insert(ExecucaoTeste)
+            .from_select(["ciclo_teste_id", "caso_teste_id", "responsavel_id", "status_geral", "passos_pendentes"], consulta)
+            .returning(ExecucaoTeste.id)
+        )
+        novos_ids = result.scalars().all()
+        if not novos_ids:
+            return {"execucoes_criadas": 0, "passos_criados": 0}
+
+        passos = (
+            select(
+                ExecucaoTeste.id,
+                PassoCasoTeste.id,
+                literal(StatusPassoEnum.pendente, ExecucaoPasso.status.type),
+                literal("")
+            )
+            .join(PassoCasoTeste, PassoCasoTeste.caso_teste_id == ExecucaoTeste.caso_teste_id)
+            .where(ExecucaoTeste.id == any_(literal(list(novos_ids), ARRAY(Integer))))
+        )
+        result_passos = await self.db.execute(
+            insert(ExecucaoPasso)
+            .from_select(["execucao_teste_id", "passo_caso_teste_id", "status", "resultado_obtido"], passos)
+        )
+
+        await self.rollup.registrar_execucoes(novos_ids)
+        return {"execucoes_criadas": len(novos_ids), "passos_criados": result_passos.rowcount}
+
     async def get_by_id(self, id: int) -> Optional[ExecucaoTeste]:
         query = (
             select(ExecucaoTeste)
@@ -66,6 +229,7 @@ class ExecucaoTesteRepository:
                 selectinload(ExecucaoTeste.ciclo)
             )
             .where(ExecucaoTeste.id == id)
+            .execution_options(populate_existing=True)
         )
         result = await self.db.execute(query)
         return result.scalars().first()
@@ -74,8 +238,8 @@ class ExecucaoTesteRepository:
         self, 
         usuario_id: int, 
         status: Optional[StatusExecucaoEnum] = None,
-        skip: int = 0,
-        limit: int = 20
+        pagina: Optional[Pagina] = None,
+        skip: int = 0
     ) -> Sequence[ExecucaoTeste]:
         
         query = (
@@ -96,60 +260,431 @@ class ExecucaoTesteRepository:
         if status:
             query = query.where(ExecucaoTeste.status_geral == status)
 
-        query = query.order_by(ExecucaoTeste.updated_at.desc()).offset(skip).limit(limit)
-            
+        # Chave imutável: com updated_at, uma tarefa alterada durante a paginação pularia para
+        # antes do cursor e sumiria da lista
+        ordem = (ExecucaoTeste.id,)
+        query = paginar(query, pagina, *ordem)
+        if skip and not (pagina and pagina.cursor):
+            # Paginação antiga por deslocamento, mantida para clientes que ainda enviam ?skip=
+            query = query.offset(skip)
+        result = await self.db.execute(query)
+        return fechar_pagina(result.scalars().all(), pagina, *ordem)
+
+    async def get_minhas_execucoes_resumo(
+        self,
+        usuario_id: int,
+        status: Optional[StatusExecucaoEnum] = None,
+        pagina: Optional[Pagina] = None
+    ):
+        """Lista de tarefas só com colunas (sem carregar passos nem relacionamentos)."""
+        query = self._consulta_resumo(usuario_id)
+
+        if status:
+            query = query.where(ExecucaoTeste.status_geral == status)
+
+        ordem = (ExecucaoTeste.id,)
+        result = await self.db.execute(paginar(query, pagina, *ordem))
+        return fechar_pagina(result.mappings().all(), pagina, *ordem)
+
+    def _consulta_resumo(self, usuario_id: int):
+        return (
+            select(
+                ExecucaoTeste.id,
+                ExecucaoTeste.status_geral,
+                ExecucaoTeste.caso_teste_id,
+                CasoTeste.nome.label("caso_teste_nome"),
+                CasoTeste.prioridade,
+                CasoTeste.projeto_id,
+                Projeto.nome.label("projeto_nome"),
+                ExecucaoTeste.ciclo_teste_id,
+                CicloTeste.nome.label("ciclo_nome"),
+                ExecucaoTeste.passos_pendentes,
+                ExecucaoTeste.passos_aprovados,
+                ExecucaoTeste.passos_reprovados,
+                ExecucaoTeste.passos_bloqueados,
+                ExecucaoTeste.versao,
+                ExecucaoTeste.updated_at
+            )
+            .join(CasoTeste, CasoTeste.id == ExecucaoTeste.caso_teste_id)
+            .outerjoin(Projeto, Projeto.id == CasoTeste.projeto_id)
+            .outerjoin(CicloTeste, CicloTeste.id == ExecucaoTeste.ciclo_teste_id)
+            .where(ExecucaoTeste.responsavel_id == usuario_id)
+        )
+
+    async def listar_execucoes_alteradas(self, usuario_id: int, desde: Optional[int] = None):
+        """Resumo das execuções do usuário gravadas por transações com xid >= `desde` (todas, sem `desde`)."""
+        query = self._consulta_resumo(usuario_id).order_by(ExecucaoTeste.id)
+        if desde is not None:
+            query = query.where(ExecucaoTeste.alteracao >= desde)
+        result = await self.db.execute(query)
+        return result.mappings().all()
+
+    async def listar_passos_alterados(self, usuario_id: int, desde: Optional[int] = None) -> Sequence[ExecucaoPasso]:
+        query = (
+            select(ExecucaoPasso)
+            .options(selectinload(ExecucaoPasso.passo_template))
+            .join(ExecucaoTeste, ExecucaoTeste.id == ExecucaoPasso.execucao_teste_id)
+            .where(ExecucaoTeste.responsavel_id == usuario_id)
+            .order_by(ExecucaoPasso.id)
+        )
+        if desde is not None:
+            query = query.where(ExecucaoPasso.alteracao >= desde)
         result = await self.db.execute(query)
         return result.scalars().all()
 
     async def get_execucao_passo(self, passo_id: int) -> Optional[ExecucaoPasso]:
-        return await self.db.get(ExecucaoPasso, passo_id)
+        query = (
+            select(ExecucaoPasso)
+            .options(selectinload(ExecucaoPasso.passo_template))
+            .where(ExecucaoPasso.id == passo_id)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.db.execute(query)
+        return result.scalars().first()
 
-    # --- CORREÇÃO AQUI ---
     async def update_passo(self, passo_id: int, data: ExecucaoPassoUpdate) -> Optional[ExecucaoPasso]:
-        passo = await self.db.get(ExecucaoPasso, passo_id)
-        
-        if passo:
-            update_data = data.model_dump(exclude_unset=True)
-            
-            # TRATAMENTO DE EVIDÊNCIAS: Se vier como lista, converte para JSON String
-            if 'evidencias' in update_data:
-                ev = update_data['evidencias']
-                if isinstance(ev, list):
-                    update_data['evidencias'] = json.dumps(ev)
+        """Registra o resultado de um passo sem travar a linha.
+
+        O flush do passo é condicionado à versão lida (version_id_col), o que também garante
+        que o status antigo usado nos contadores é o vigente. Com `data.versao` o cliente
+        exige a versão que viu e qualquer divergência vira ConflitoVersao; sem ela, uma
+        escrita concorrente só provoca nova tentativa.
+        """
+        for _ in range(TENTATIVAS_VERSAO):
+            passo = await self.get_execucao_passo(passo_id)
+            if not passo:
+                return None
+            if data.versao is not None and passo.versao != data.versao:
+                raise ConflitoVersao("ExecucaoPasso", passo_id)
+
+            status_antigo = passo.status
+            update_data = self._preparar_dados_passo(data)
             
             for k, v in update_data.items():
                 setattr(passo, k, v)
-            
+
+            try:
+                await self.db.flush()
+            except StaleDataError:
+                await self.db.rollback()
+                if data.versao is not None:
+                    raise ConflitoVersao("ExecucaoPasso", passo_id)
+                continue
+
+            if 'status' in update_data:
+                deltas = {}
+                _acumular_troca(deltas, passo.execucao_teste_id, status_antigo, update_data['status'])
+                await self._ajustar_contadores(deltas)
+
+            if update_data.get('status') not in (None, StatusPassoEnum.pendente):
+                await self._marcar_tempos_passo(passo.execucao_teste_id, passo_id)
+
+            await self._recalcular_status([passo.execucao_teste_id])
             await self.db.commit()
-            
-            query = (
-                select(ExecucaoPasso)
-                .options(selectinload(ExecucaoPasso.passo_template))
-                .where(ExecucaoPasso.id == passo_id)
+            await invalidar_alteracoes(self.db)
+            return await self.get_execucao_passo(passo_id)
+
+        raise ConflitoVersao("ExecucaoPasso", passo_id)
+
+    def _preparar_dados_passo(self, data: ExecucaoPassoUpdate) -> dict:
+        update_data = data.model_dump(exclude_unset=True, exclude={'id', 'versao'})
+
+        # TRATAMENTO DE EVIDÊNCIAS: Se vier como lista, converte para JSON String
+        if 'evidencias' in update_data:
+            ev = update_data['evidencias']
+            if isinstance(ev, list):
+                update_data['evidencias'] = json.dumps(ev)
+        return update_data
+
+    # --- RESULTADOS EM LOTE ---
+    async def get_passos(self, passo_ids: Sequence[int], responsavel_id: Optional[int] = None) -> Sequence[ExecucaoPasso]:
+        query = (
+            select(ExecucaoPasso)
+            .options(selectinload(ExecucaoPasso.passo_template))
+            .where(ExecucaoPasso.id.in_(passo_ids))
+            .order_by(ExecucaoPasso.id)
+            .execution_options(populate_existing=True)
+        )
+        if responsavel_id is not None:
+            query = query.join(ExecucaoTeste, ExecucaoTeste.id == ExecucaoPasso.execucao_teste_id).where(
+                ExecucaoTeste.responsavel_id == responsavel_id
             )
-            result = await self.db.execute(query)
-            return result.scalars().first()
-            
-        return None
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
+    async def aplicar_resultados_passos(
+        self, passos: Sequence[ExecucaoPasso], resultados: dict[int, ExecucaoPassoUpdate]
+    ) -> list[int]:
+        """Aplica os resultados na sessão (sem commit) e devolve as execuções afetadas.
+
+        O flush é condicionado à versão de cada passo; se algum mudou desde a leitura (ou
+        difere da versão enviada pelo cliente), desfaz tudo e levanta ConflitoVersao.
+        O commit acontece em concluir_resultados_passos, junto com o novo status das execuções.
+        """
+        com_resultado = []
+        deltas = {}
+        for passo in passos:
+            versao_cliente = resultados[passo.id].versao
+            if versao_cliente is not None and passo.versao != versao_cliente:
+                raise ConflitoVersao("ExecucaoPasso", passo.id)
+
+            status_antigo = passo.status
+            update_data = self._preparar_dados_passo(resultados[passo.id])
+            for k, v in update_data.items():
+                setattr(passo, k, v)
+            if 'status' in update_data:
+                _acumular_troca(deltas, passo.execucao_teste_id, status_antigo, update_data['status'])
+            if update_data.get('status') not in (None, StatusPassoEnum.pendente):
+                com_resultado.append(passo.id)
+        try:
+            await self.db.flush()
+        except StaleDataError:
+            await self.db.rollback()
+            raise ConflitoVersao("ExecucaoPasso", passos[0].id)
+        await self._ajustar_contadores(deltas)
+
+        execucao_ids = sorted({p.execucao_teste_id for p in passos})
+        if com_resultado:
+            await self.db.execute(
+                update(ExecucaoTeste)
+                .where(ExecucaoTeste.id.in_(execucao_ids), ExecucaoTeste.iniciado_em.is_(None))
+                .values(iniciado_em=func.now())
+            )
+            # Num lote não há o instante de cada passo: todos terminam agora
+            inicio_execucao = (
+                select(ExecucaoTeste.iniciado_em)
+                .where(ExecucaoTeste.id == ExecucaoPasso.execucao_teste_id)
+                .scalar_subquery()
+            )
+            await self.db.execute(
+                update(ExecucaoPasso)
+                .where(ExecucaoPasso.id.in_(com_resultado))
+                .values(
+                    iniciado_em=func.coalesce(ExecucaoPasso.iniciado_em, inicio_execucao),
+                    finalizado_em=func.now()
+                )
+                .execution_options(synchronize_session=False)
+            )
+        return execucao_ids
 
-    async def update_status_geral(self, exec_id: int, status: StatusExecucaoEnum) -> Optional[ExecucaoTeste]:
-        return await self.update_status(exec_id, status)
+    async def concluir_resultados_passos(
+        self, execucao_ids: Sequence[int], passo_ids: Sequence[int]
+    ) -> tuple[Sequence[ExecucaoPasso], dict[int, tuple[StatusExecucaoEnum, int]]]:
+        """Recalcula o status das execuções, faz o commit e devolve (passos, {execucao_id: (status, versao)})."""
+        status_finais = await self._recalcular_status(execucao_ids)
+        await self.db.commit()
+        await invalidar_alteracoes(self.db)
+        return await self.get_passos(passo_ids), status_finais
+
+    # --- CONTADORES DE PASSOS ---
+    async def _ajustar_contadores(self, deltas: dict[int, dict[str, int]]):
+        """Soma as variações {execucao_id: {coluna: +/-n}} no próprio UPDATE (sem ler antes)."""
+        for execucao_id, variacao in sorted(deltas.items()):
+            valores = {col: getattr(ExecucaoTeste, col) + n for col, n in variacao.items() if n}
+            if not valores:
+                continue
+            await self.db.execute(
+                update(ExecucaoTeste)
+                .where(ExecucaoTeste.id == execucao_id)
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _recalcular_status(self, execucao_ids: Sequence[int]) -> dict[int, tuple[StatusExecucaoEnum, int]]:
+        """Decide o status geral pelos contadores num único UPDATE ... RETURNING.
+
+        Todos os passos aprovados fecham a execução; um passo reprovado (ou a execução
+        ainda pendente) a coloca em progresso; nos demais casos o status é mantido.
+        O UPDATE só vale para a versão lida de cada execução; as que mudaram no meio
+        são lidas de novo e recalculadas (até TENTATIVAS_VERSAO vezes).
+        Devolve {execucao_id: (status_geral, versao)}; as transições já saem refletidas nos rollups.
+        """
+        tipo = ExecucaoTeste.status_geral.type
+        novo = case(
+            (
+                and_(
+                    ExecucaoTeste.passos_pendentes == 0,
+                    ExecucaoTeste.passos_reprovados == 0,
+                    ExecucaoTeste.passos_bloqueados == 0
+                ),
+                literal(StatusExecucaoEnum.fechado, tipo)
+            ),
+            (ExecucaoTeste.passos_reprovados > 0, literal(StatusExecucaoEnum.em_progresso, tipo)),
+            (ExecucaoTeste.status_geral == StatusExecucaoEnum.pendente, literal(StatusExecucaoEnum.em_progresso, tipo)),
+            else_=ExecucaoTeste.status_geral
+        )
+        # No SET as colunas ainda têm o valor antigo da linha
+        conclui = and_(novo.in_(STATUS_CONCLUSAO), ExecucaoTeste.status_geral.not_in(STATUS_CONCLUSAO))
+
+        status_finais = {}
+        pendentes = list(execucao_ids)
+        for _ in range(TENTATIVAS_VERSAO):
+            if not pendentes:
+                break
+            antigo = (
+                select(ExecucaoTeste.id, ExecucaoTeste.status_geral, ExecucaoTeste.versao)
+                .where(ExecucaoTeste.id.in_(pendentes))
+                .subquery("antigo")
+            )
+            result = await self.db.execute(
+                update(ExecucaoTeste)
+                .where(ExecucaoTeste.id == antigo.c.id, ExecucaoTeste.versao == antigo.c.versao)
+                .values(
+                    status_geral=novo,
+                    finalizado_em=case((conclui, func.now()), else_=ExecucaoTeste.finalizado_em),
+                    versao=ExecucaoTeste.versao + 1
+                )
+                .returning(ExecucaoTeste.id, antigo.c.status_geral, ExecucaoTeste.status_geral, ExecucaoTeste.versao)
+                .execution_options(synchronize_session=False)
+            )
+            for execucao_id, status_antigo, status_novo, versao in result.all():
+                if status_antigo != status_novo:
+                    await self._efeitos_transicao(execucao_id, status_antigo, status_novo)
+                status_finais[execucao_id] = (status_novo, versao)
+            pendentes = [i for i in pendentes if i not in status_finais]
+
+        if pendentes:
+            await self.db.rollback()
+            raise ConflitoVersao("ExecucaoTeste", pendentes[0])
+        return status_finais
+
+    async def recalcular_contadores(self, *condicoes) -> int:
+        """Recalcula os contadores a partir de execucoes_passos e devolve quantas execuções corrigiu.
+
+        É o reparo dos contadores (sem condições, varre todas as execuções) e também o
+        caminho das alterações estruturais na lista de passos de um caso.
+        """
+        def contagem(status):
+            return (
+                select(func.count(ExecucaoPasso.id))
+                .where(ExecucaoPasso.execucao_teste_id == ExecucaoTeste.id, ExecucaoPasso.status == status)
+                .scalar_subquery()
+            )
+
+        contagens = {col: contagem(status) for status, col in COLUNA_CONTADOR.items()}
+        result = await self.db.execute(
+            update(ExecucaoTeste)
+            .where(*condicoes)
+            .where(or_(*(getattr(ExecucaoTeste, col) != valor for col, valor in contagens.items())))
+            # Reparo não é atividade: preserva updated_at
+            .values(updated_at=ExecucaoTeste.updated_at, **contagens)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def contadores_vazios(self) -> bool:
+        """True se há execução com passos e contadores zerados (ex.: dados anteriores aos contadores)."""
+        query = select(exists().where(
+            ExecucaoPasso.execucao_teste_id == ExecucaoTeste.id,
+            ExecucaoTeste.passos_pendentes + ExecucaoTeste.passos_aprovados
+            + ExecucaoTeste.passos_reprovados + ExecucaoTeste.passos_bloqueados == 0
+        ))
+        return bool((await self.db.execute(query)).scalar())
+
+    async def _marcar_tempos_passo(self, execucao_id: int, passo_id: int):
+        """Registra os tempos de um passo com resultado.
+
+        A execução começa no primeiro resultado registrado. O passo começa quando o
+        passo anterior terminou (ou no início da execução) e termina agora.
+        """
+        await self.db.execute(
+            update(ExecucaoTeste)
+            .where(ExecucaoTeste.id == execucao_id, ExecucaoTeste.iniciado_em.is_(None))
+            .values(iniciado_em=func.now())
+        )
+
+        fim_passo_anterior = (
+            select(func.max(ExecucaoPasso.finalizado_em))
+            .where(ExecucaoPasso.execucao_teste_id == execucao_id, ExecucaoPasso.id != passo_id)
+            .scalar_subquery()
+        )
+        inicio_execucao = select(ExecucaoTeste.iniciado_em).where(ExecucaoTeste.id == execucao_id).scalar_subquery()
+
+        await self.db.execute(
+            update(ExecucaoPasso)
+            .where(ExecucaoPasso.id == passo_id)
+            .values(
+                iniciado_em=func.coalesce(ExecucaoPasso.iniciado_em, func.greatest(fim_passo_anterior, inicio_execucao)),
+                finalizado_em=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def update_status_geral(
+        self, exec_id: int, status: StatusExecucaoEnum, versao: Optional[int] = None
+    ) -> Optional[ExecucaoTeste]:
+        return await self.update_status(exec_id, status, versao)
 
     async def listar_passos(self, execucao_id: int):
         query = select(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id == execucao_id)
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def update_status(self, id: int, status: StatusExecucaoEnum):
-        stmt = (
-            update(ExecucaoTeste)
-            .where(ExecucaoTeste.id == id)
-            .values(status_geral=status)
-            .execution_options(synchronize_session="fetch")
-        )
-        await self.db.execute(stmt)
+    async def update_status(self, id: int, status: StatusExecucaoEnum, versao: Optional[int] = None):
+        if not await self._aplicar_status(id, status, versao):
+            return None
+        execucao = await self.get_by_id(id)
+        await enfileirar_auditoria(self.db, execucao)
+        await self.db.commit()
+        await invalidar_alteracoes(self.db)
+        
+        return execucao
+
+    async def marcar_status(self, id: int, status: StatusExecucaoEnum) -> bool:
+        """Como update_status, mas sem commit: a alteração fica na transação de quem chamou."""
+        return await self._aplicar_status(id, status)
+
+    async def _aplicar_status(self, id: int, status: StatusExecucaoEnum, versao_esperada: Optional[int] = None) -> bool:
+        """UPDATE condicionado à versão lida; False se a execução não existe.
+
+        Com `versao_esperada` (vinda do cliente) qualquer divergência é ConflitoVersao;
+        nas chamadas internas a corrida perdida só provoca nova leitura.
+        """
+        for _ in range(TENTATIVAS_VERSAO):
+            atual = (await self.db.execute(
+                select(ExecucaoTeste.status_geral, ExecucaoTeste.versao).where(ExecucaoTeste.id == id)
+            )).first()
+            if atual is None:
+                return False
+            status_antigo, versao = atual
+            if versao_esperada is not None and versao != versao_esperada:
+                raise ConflitoVersao("ExecucaoTeste", id)
+
+            valores = {"status_geral": status, "versao": versao + 1}
+            if entrou_em_conclusao(status_antigo, status):
+                valores["finalizado_em"] = func.now()
+            elif status == StatusExecucaoEnum.reteste:
+                # O reteste é uma nova rodada: a duração volta a ser medida do zero
+                valores["iniciado_em"] = None
+                valores["finalizado_em"] = None
+                # Os passos reprovados voltam a pendente logo abaixo
+                valores["passos_pendentes"] = ExecucaoTeste.passos_pendentes + ExecucaoTeste.passos_reprovados
+                valores["passos_reprovados"] = 0
+
+            result = await self.db.execute(
+                update(ExecucaoTeste)
+                .where(ExecucaoTeste.id == id, ExecucaoTeste.versao == versao)
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                break
+            if versao_esperada is not None:
+                raise ConflitoVersao("ExecucaoTeste", id)
+        else:
+            raise ConflitoVersao("ExecucaoTeste", id)
 
         if status == StatusExecucaoEnum.reteste:
+            evidencias_limpas = (await self.db.execute(
+                select(ExecucaoPasso.evidencias)
+                .where(
+                    ExecucaoPasso.execucao_teste_id == id,
+                    ExecucaoPasso.status == StatusPassoEnum.reprovado
+                )
+                .with_for_update()
+            )).scalars().all()
+            for evidencias in evidencias_limpas:
+                acumular_referencias(self.db, evidencias, None)
             stmt_passos = (
                 update(ExecucaoPasso)
                 .where(
@@ -159,14 +694,22 @@ class ExecucaoTesteRepository:
                 .values(
                     status=StatusPassoEnum.pendente,
                     resultado_obtido="",
-                    evidencias="[]"
+                    evidencias="[]",
+                    iniciado_em=None,
+                    finalizado_em=None,
+                    versao=ExecucaoPasso.versao + 1
                 )
+                .execution_options(synchronize_session=False)
             )
             await self.db.execute(stmt_passos)
 
-        await self.db.commit()
-        
-        return await self.get_by_id(id)
+        await self._efeitos_transicao(id, status_antigo, status)
+        return True
+
+    async def _efeitos_transicao(self, id: int, status_antigo, status_novo: StatusExecucaoEnum):
+        await self.rollup.mover_status_execucao(id, status_antigo, status_novo)
+        await self.rollup.registrar_conclusao(id, status_antigo, status_novo)
+        await self.rollup.registrar_duracao(id, status_antigo, status_novo)
 
     async def atualizar_status_geral(self, execucao_id: int, novo_status: StatusExecucaoEnum):
         return await self.update_status(execucao_id, novo_status)
\ No newline at end of file
@@ -1,8 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from typing import Sequence
+from typing import Sequence, Optional
 from app.models.log import LogSistema
+from app.models.projeto import Projeto
+from app.models.modulo import Modulo
+from app.models.testing import CicloTeste
+from app.models.outbox import EventoOutbox
+from app.core.paginacao import Pagina, paginar, fechar_pagina
 from app.schemas.log import LogCreate
 
 class LogRepository:
@@ -16,18 +21,47 @@ class LogRepository:
         await self.db.refresh(novo_log)
         return novo_log
 
-    async def get_all(self, limit: int = 100) -> Sequence[LogSistema]:
+    def adicionar(self, dados: LogCreate, evento_id: Optional[int] = None) -> LogSistema:
+        """Inclui o log na transação corrente, sem commit (usado pelo despachante do outbox).
+
+        Com `evento_id`, a data do log é a da ação (criação do evento), não a da entrega.
+        """
+        novo_log = LogSistema(**dados.model_dump())
+        if evento_id is not None:
+            novo_log.created_at = select(EventoOutbox.criado_em).where(EventoOutbox.id == evento_id).scalar_subquery()
+        self.db.add(novo_log)
+        return novo_log
+
+    async def resolver_sistema_id(self, projeto_id: Optional[int] = None, ciclo_id: Optional[int] = None) -> Optional[int]:
+        """Sistema do projeto (direto ou pelo módulo); com `ciclo_id`, o projeto vem do ciclo."""
+        if projeto_id is None and ciclo_id is not None:
+            projeto_id = (await self.db.execute(
+                select(CicloTeste.projeto_id).where(CicloTeste.id == ciclo_id)
+            )).scalar()
+        if projeto_id is None:
+            return None
+
+        query = (
+            select(Projeto.sistema_id, Modulo.sistema_id.label("sistema_modulo_id"))
+            .outerjoin(Modulo, Modulo.id == Projeto.modulo_id)
+            .where(Projeto.id == projeto_id)
+        )
+        projeto = (await self.db.execute(query)).first()
+        if not projeto:
+            return None
+        return projeto.sistema_id or projeto.sistema_modulo_id
+
+    async def get_all(self, pagina: Optional[Pagina] = None) -> Sequence[LogSistema]:
         query = (
             select(LogSistema)
             .options(
                 selectinload(LogSistema.usuario),
                 selectinload(LogSistema.sistema)
             )
-            .order_by(LogSistema.created_at.desc())
-            .limit(limit)
         )
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        ordem = (LogSistema.created_at, LogSistema.id)
+        result = await self.db.execute(paginar(query, pagina, *ordem))
+        return fechar_pagina(result.scalars().all(), pagina, *ordem)
     
     async def delete(self, id: int):
         log = await self.db.get(LogSistema, id)
@@ -5,6 +5,8 @@ from typing import Sequence, Optional
 
 from app.models.modulo import Modulo
 from app.schemas.modulo import ModuloCreate
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.auditoria import enfileirar_auditoria
 
 class ModuloRepository:
     def __init__(self, db: AsyncSession):
@@ -13,13 +15,14 @@ class ModuloRepository:
     async def create(self, modulo_data: ModuloCreate) -> Modulo:
         db_modulo = Modulo(**modulo_data.model_dump())
         self.db.add(db_modulo)
+        await enfileirar_auditoria(self.db, db_modulo)
         await self.db.commit()
         await self.db.refresh(db_modulo)
         return db_modulo
 
-    async def get_all(self) -> Sequence[Modulo]:
-        result = await self.db.execute(select(Modulo))
-        return result.scalars().all()
+    async def get_all(self, pagina: Optional[Pagina] = None) -> Sequence[Modulo]:
+        result = await self.db.execute(paginar(select(Modulo), pagina, Modulo.id, decrescente=False))
+        return fechar_pagina(result.scalars().all(), pagina, Modulo.id)
 
     async def get_by_id(self, modulo_id: int) -> Optional[Modulo]:
         result = await self.db.execute(select(Modulo).where(Modulo.id == modulo_id))
@@ -44,11 +47,16 @@ class ModuloRepository:
             .returning(Modulo)
         )
         result = await self.db.execute(query)
+        modulo = result.scalars().first()
+        if modulo:
+            await enfileirar_auditoria(self.db, modulo)
         await self.db.commit()
-        return result.scalars().first()
+        return modulo
 
     async def delete(self, modulo_id: int) -> bool:
         query = sqlalchemy_delete(Modulo).where(Modulo.id == modulo_id)
         result = await self.db.execute(query)
+        if result.rowcount > 0:
+            await enfileirar_auditoria(self.db)
         await self.db.commit()
         return result.rowcount > 0
\ No newline at end of file
@@ -8,23 +8,35 @@ from app.models.testing import (
     ExecucaoTeste, ExecucaoPasso, 
     Defeito
 )
+from app.repositories.rollup_repository import RollupRepository
+from app.repositories.sincronizacao_repository import SincronizacaoRepository, REMOCAO_EXECUCAO
+from app.core.cache import invalidar_alteracoes
+from app.core.auditoria import enfileirar_auditoria
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.evidencias import liberar_referencias
 
 class ProjetoRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollup = RollupRepository(db)
+        self.sincronizacao = SincronizacaoRepository(db)
 
     async def create(self, projeto_data: Projeto) -> Projeto:
         db_projeto = Projeto(**projeto_data.model_dump())
         
         self.db.add(db_projeto)
+        await self.db.flush()
+        await self.rollup.ajustar_projeto(db_projeto.sistema_id, db_projeto.status, 1)
+        await enfileirar_auditoria(self.db, db_projeto)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         await self.db.refresh(db_projeto)
         return db_projeto
     
-    async def get_all(self) -> Sequence[Projeto]:
+    async def get_all(self, pagina: Optional[Pagina] = None) -> Sequence[Projeto]:
         query = select(Projeto)
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        result = await self.db.execute(paginar(query, pagina, Projeto.id, decrescente=False))
+        return fechar_pagina(result.scalars().all(), pagina, Projeto.id)
     
     async def get_by_id(self, id: int) -> Optional[Projeto]:
         query = select(Projeto).where(Projeto.id == id)
@@ -37,6 +49,10 @@ class ProjetoRepository:
         return result.scalars().first()
     
     async def update(self, id: int, update_data: dict) -> Optional[Projeto]:
+        anterior = (await self.db.execute(
+            select(Projeto.sistema_id, Projeto.modulo_id, Projeto.status).where(Projeto.id == id)
+        )).first()
+
         query = (
             update(Projeto)
             .where(Projeto.id == id)
@@ -44,11 +60,26 @@ class ProjetoRepository:
             .returning(Projeto)
         )
         result = await self.db.execute(query)
+        projeto = result.scalars().first()
+
+        if projeto and anterior:
+            if (anterior.sistema_id, anterior.status) != (projeto.sistema_id, projeto.status):
+                await self.rollup.ajustar_projeto(anterior.sistema_id, anterior.status, -1)
+                await self.rollup.ajustar_projeto(projeto.sistema_id, projeto.status, 1)
+            if (anterior.sistema_id, anterior.modulo_id) != (projeto.sistema_id, projeto.modulo_id):
+                await self.rollup.recalcular_projeto(id)
+
+        if projeto:
+            await enfileirar_auditoria(self.db, projeto)
         await self.db.commit()
-        return result.scalars().first()
+        await invalidar_alteracoes(self.db)
+        return projeto
 
     async def delete(self, id: int) -> bool:
-        
+        anterior = (await self.db.execute(
+            select(Projeto.sistema_id, Projeto.status).where(Projeto.id == id)
+        )).first()
+
         query_casos = select(CasoTeste.id).where(CasoTeste.projeto_id == id)
         result_casos = await self.db.execute(query_casos)
         casos_ids = result_casos.scalars().all()
@@ -67,9 +98,16 @@ class ProjetoRepository:
         execs_ids = result_execs.scalars().all()
         
         if execs_ids:
-            await self.db.execute(delete(ExecucaoPasso).where(ExecucaoPasso.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(Defeito).where(Defeito.execucao_teste_id.in_(execs_ids)))
-            await self.db.execute(delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)))
+            await self.rollup.registrar_execucoes(execs_ids, -1)
+            for modelo in (ExecucaoPasso, Defeito):
+                removidos = await self.db.execute(
+                    delete(modelo).where(modelo.execucao_teste_id.in_(execs_ids)).returning(modelo.evidencias)
+                )
+                liberar_referencias(self.db, removidos.scalars())
+            excluidas = await self.db.execute(
+                delete(ExecucaoTeste).where(ExecucaoTeste.id.in_(execs_ids)).returning(ExecucaoTeste.id, ExecucaoTeste.responsavel_id)
+            )
+            self.sincronizacao.registrar_remocoes(REMOCAO_EXECUCAO, excluidas.all())
 
         if casos_ids:
             await self.db.execute(delete(PassoCasoTeste).where(PassoCasoTeste.caso_teste_id.in_(casos_ids)))
@@ -80,6 +118,11 @@ class ProjetoRepository:
             
         query = delete(Projeto).where(Projeto.id == id)
         result = await self.db.execute(query)
+        if result.rowcount > 0 and anterior:
+            await self.rollup.ajustar_projeto(anterior.sistema_id, anterior.status, -1)
+        if result.rowcount > 0:
+            await enfileirar_auditoria(self.db)
         await self.db.commit()
+        await invalidar_alteracoes(self.db)
         
         return result.rowcount > 0
\ No newline at end of file
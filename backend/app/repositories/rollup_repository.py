@@ -0,0 +1,279 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import delete, insert, func, literal, true, union_all, cast, Date
+from typing import Sequence, Optional
+
+from app.models.projeto import Projeto, StatusProjetoEnum
+from app.models.testing import (
+    CasoTeste, ExecucaoTeste, Defeito,
+    StatusExecucaoEnum, StatusDefeitoEnum, SeveridadeDefeitoEnum
+)
+from app.models.rollup import RollupExecucao, RollupDefeito, RollupProjeto, ConclusaoDiaria, DuracaoExecucao
+from app.core.cache import marcar_alteracao
+
+CHAVES_EXECUCAO = ["sistema_id", "projeto_id", "modulo_id", "responsavel_id", "status_geral"]
+CHAVES_DEFEITO = ["sistema_id", "projeto_id", "modulo_id", "responsavel_id", "status", "severidade"]
+CHAVES_PROJETO = ["sistema_id", "status"]
+CHAVES_CONCLUSAO = ["dia", "responsavel_id", "status_geral"]
+
+# Status em que uma execução é considerada concluída (velocidade)
+STATUS_CONCLUSAO = (StatusExecucaoEnum.fechado, StatusExecucaoEnum.falha, StatusExecucaoEnum.bloqueado)
+
+def entrou_em_conclusao(status_antigo: Optional[StatusExecucaoEnum], status_novo: StatusExecucaoEnum) -> bool:
+    return status_novo in STATUS_CONCLUSAO and status_antigo not in STATUS_CONCLUSAO
+
+class RollupRepository:
+    """Manutenção incremental das tabelas de rollup do dashboard.
+
+    Os métodos apenas aplicam deltas na sessão recebida; quem chama é responsável
+    pelo commit, de modo que o rollup e a escrita principal ficam na mesma transação.
+    Cada chave tocada é marcada na sessão para invalidar o cache de respostas após o commit.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _colunas_chave(self):
+        return [
+            Projeto.sistema_id,
+            Projeto.id.label("projeto_id"),
+            Projeto.modulo_id,
+            func.coalesce(ExecucaoTeste.responsavel_id, 0).label("responsavel_id"),
+        ]
+
+    async def _aplicar(self, modelo, chaves: list, consulta, marcar: bool = True):
+        stmt = pg_insert(modelo).from_select(chaves + ["total"], consulta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=chaves,
+            set_={"total": modelo.total + stmt.excluded.total, "updated_at": func.now()}
+        )
+        if not marcar:
+            await self.db.execute(stmt)
+            return
+        result = await self.db.execute(stmt.returning(modelo.sistema_id, modelo.responsavel_id))
+        for sistema_id, responsavel_id in result:
+            marcar_alteracao(self.db, sistema_id, responsavel_id)
+
+    def _consulta_execucoes(self, filtro, sinal: int):
+        chave = self._colunas_chave()
+        return (
+            select(*chave, ExecucaoTeste.status_geral, (func.count() * sinal).label("total"))
+            .select_from(ExecucaoTeste)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .where(filtro)
+            .group_by(*chave, ExecucaoTeste.status_geral)
+        )
+
+    def _consulta_defeitos(self, filtro, sinal: int):
+        chave = self._colunas_chave()
+        return (
+            select(*chave, Defeito.status, Defeito.severidade, (func.count() * sinal).label("total"))
+            .select_from(Defeito)
+            .join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id)
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+            .where(filtro)
+            .group_by(*chave, Defeito.status, Defeito.severidade)
+        )
+
+    # --- EXECUÇÕES ---
+    async def registrar_execucoes(self, execucao_ids: Sequence[int], sinal: int = 1):
+        """Soma (sinal=1) ou subtrai (sinal=-1) as execuções e seus defeitos dos rollups.
+
+        Para exclusões, deve ser chamado antes do DELETE, enquanto as linhas ainda existem.
+        """
+        if not execucao_ids:
+            return
+        await self._aplicar(
+            RollupExecucao, CHAVES_EXECUCAO,
+            self._consulta_execucoes(ExecucaoTeste.id.in_(execucao_ids), sinal)
+        )
+        await self._aplicar(
+            RollupDefeito, CHAVES_DEFEITO,
+            self._consulta_defeitos(Defeito.execucao_teste_id.in_(execucao_ids), sinal)
+        )
+
+    async def mover_status_execucao(
+        self, execucao_id: int, status_antigo: Optional[StatusExecucaoEnum], status_novo: StatusExecucaoEnum
+    ):
+        if status_antigo == status_novo:
+            return
+        chave = self._colunas_chave()
+        tipo_status = ExecucaoTeste.status_geral.type
+
+        def _parcela(status, delta):
+            return (
+                select(*chave, literal(status, tipo_status).label("status_geral"), literal(delta).label("total"))
+                .select_from(ExecucaoTeste)
+                .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+                .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+                .where(ExecucaoTeste.id == execucao_id)
+            )
+
+        partes = [_parcela(status_novo, 1)]
+        if status_antigo is not None:
+            partes.append(_parcela(status_antigo, -1))
+        await self._aplicar(RollupExecucao, CHAVES_EXECUCAO, union_all(*partes))
+
+    async def registrar_conclusao(
+        self, execucao_id: int, status_antigo: Optional[StatusExecucaoEnum], status_novo: StatusExecucaoEnum
+    ):
+        """Soma a conclusão do dia na série temporal, só na entrada em um status final."""
+        if not entrou_em_conclusao(status_antigo, status_novo):
+            return
+        consulta = (
+            select(
+                func.current_date().label("dia"),
+                func.coalesce(ExecucaoTeste.responsavel_id, 0).label("responsavel_id"),
+                literal(status_novo, ExecucaoTeste.status_geral.type).label("status_geral"),
+                literal(1).label("total")
+            )
+            .where(ExecucaoTeste.id == execucao_id)
+        )
+        await self._aplicar(ConclusaoDiaria, CHAVES_CONCLUSAO, consulta, marcar=False)
+
+    async def registrar_duracao(
+        self, execucao_id: int, status_antigo: Optional[StatusExecucaoEnum], status_novo: StatusExecucaoEnum
+    ):
+        """Grava o fato de duração da execução. Espera finalizado_em já preenchido na mesma transação."""
+        if not entrou_em_conclusao(status_antigo, status_novo):
+            return
+        consulta = (
+            select(
+                ExecucaoTeste.id,
+                func.coalesce(ExecucaoTeste.responsavel_id, 0),
+                ExecucaoTeste.caso_teste_id,
+                CasoTeste.projeto_id,
+                ExecucaoTeste.ciclo_teste_id,
+                ExecucaoTeste.status_geral,
+                ExecucaoTeste.iniciado_em,
+                ExecucaoTeste.finalizado_em,
+                func.extract("epoch", ExecucaoTeste.finalizado_em - ExecucaoTeste.iniciado_em)
+            )
+            .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+            .where(
+                ExecucaoTeste.id == execucao_id,
+                ExecucaoTeste.iniciado_em.is_not(None),
+                ExecucaoTeste.finalizado_em.is_not(None)
+            )
+        )
+        await self.db.execute(
+            insert(DuracaoExecucao).from_select(
+                ["execucao_teste_id", "responsavel_id", "caso_teste_id", "projeto_id", "ciclo_teste_id",
+                 "status_geral", "iniciado_em", "finalizado_em", "duracao_segundos"],
+                consulta
+            )
+        )
+
+    # --- DEFEITOS ---
+    async def registrar_defeitos(self, defeito_ids: Sequence[int], sinal: int = 1):
+        if not defeito_ids:
+            return
+        await self._aplicar(
+            RollupDefeito, CHAVES_DEFEITO,
+            self._consulta_defeitos(Defeito.id.in_(defeito_ids), sinal)
+        )
+
+    async def mover_defeito(
+        self,
+        defeito_id: int,
+        antigo: tuple[StatusDefeitoEnum, SeveridadeDefeitoEnum],
+        novo: tuple[StatusDefeitoEnum, SeveridadeDefeitoEnum]
+    ):
+        """Move um defeito entre chaves de status/severidade. Recebe tuplas (status, severidade)."""
+        if antigo == novo:
+            return
+        chave = self._colunas_chave()
+
+        def _parcela(status, severidade, delta):
+            return (
+                select(
+                    *chave,
+                    literal(status, Defeito.status.type).label("status"),
+                    literal(severidade, Defeito.severidade.type).label("severidade"),
+                    literal(delta).label("total")
+                )
+                .select_from(Defeito)
+                .join(ExecucaoTeste, Defeito.execucao_teste_id == ExecucaoTeste.id)
+                .join(CasoTeste, ExecucaoTeste.caso_teste_id == CasoTeste.id)
+                .join(Projeto, CasoTeste.projeto_id == Projeto.id)
+                .where(Defeito.id == defeito_id)
+            )
+
+        await self._aplicar(
+            RollupDefeito, CHAVES_DEFEITO,
+            union_all(_parcela(*novo, 1), _parcela(*antigo, -1))
+        )
+
+    # --- PROJETOS ---
+    async def ajustar_projeto(self, sistema_id: int, status: Optional[StatusProjetoEnum], delta: int):
+        stmt = pg_insert(RollupProjeto).values(
+            sistema_id=sistema_id,
+            status=status or StatusProjetoEnum.ativo,
+            total=delta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=CHAVES_PROJETO,
+            set_={"total": RollupProjeto.total + stmt.excluded.total, "updated_at": func.now()}
+        )
+        await self.db.execute(stmt)
+        marcar_alteracao(self.db, sistema_id)
+
+    async def marcar_projeto(self, projeto_id: int):
+        """Marca o sistema do projeto para escritas que alteram contagens lidas das tabelas base (ciclos, casos)."""
+        sistema_id = (await self.db.execute(
+            select(Projeto.sistema_id).where(Projeto.id == projeto_id)
+        )).scalar()
+        marcar_alteracao(self.db, sistema_id)
+
+    async def recalcular_projeto(self, projeto_id: int):
+        """Recalcula as linhas de um projeto (ex.: mudou de sistema ou de módulo)."""
+        await self.db.execute(delete(RollupExecucao).where(RollupExecucao.projeto_id == projeto_id))
+        await self.db.execute(delete(RollupDefeito).where(RollupDefeito.projeto_id == projeto_id))
+        await self._aplicar(RollupExecucao, CHAVES_EXECUCAO, self._consulta_execucoes(Projeto.id == projeto_id, 1))
+        await self._aplicar(RollupDefeito, CHAVES_DEFEITO, self._consulta_defeitos(Projeto.id == projeto_id, 1))
+
+    # --- RECONSTRUÇÃO COMPLETA ---
+    async def esta_vazio(self) -> bool:
+        result = await self.db.execute(select(RollupProjeto.sistema_id).limit(1))
+        return result.first() is None
+
+    async def conclusoes_vazias(self) -> bool:
+        result = await self.db.execute(select(ConclusaoDiaria.dia).limit(1))
+        return result.first() is None
+
+    async def semear_conclusoes(self):
+        """Carga inicial da série temporal a partir das execuções já concluídas.
+
+        Aproximada: usa updated_at como data de conclusão. Depois disso a série só cresce
+        por registrar_conclusao, então não faz parte de reconstruir().
+        """
+        dia = cast(ExecucaoTeste.updated_at, Date)
+        responsavel = func.coalesce(ExecucaoTeste.responsavel_id, 0)
+        await self._aplicar(
+            ConclusaoDiaria, CHAVES_CONCLUSAO,
+            select(dia.label("dia"), responsavel.label("responsavel_id"), ExecucaoTeste.status_geral, func.count().label("total"))
+            .where(ExecucaoTeste.status_geral.in_(STATUS_CONCLUSAO))
+            .group_by(dia, responsavel, ExecucaoTeste.status_geral),
+            marcar=False
+        )
+
+    async def reconstruir(self):
+        await self.db.execute(delete(RollupExecucao))
+        await self.db.execute(delete(RollupDefeito))
+        await self.db.execute(delete(RollupProjeto))
+
+        await self._aplicar(RollupExecucao, CHAVES_EXECUCAO, self._consulta_execucoes(true(), 1), marcar=False)
+        await self._aplicar(RollupDefeito, CHAVES_DEFEITO, self._consulta_defeitos(true(), 1), marcar=False)
+        await self._aplicar(
+            RollupProjeto, CHAVES_PROJETO,
+            select(
+                Projeto.sistema_id,
+                func.coalesce(Projeto.status, StatusProjetoEnum.ativo).label("status"),
+                func.count().label("total")
+            )
+            .group_by(Projeto.sistema_id, func.coalesce(Projeto.status, StatusProjetoEnum.ativo)),
+            marcar=False
+        )
@@ -0,0 +1,59 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.testing import ExecucaoTeste, ExecucaoPasso, Defeito
+from app.models.sincronizacao import RemocaoSincronizacao
+from app.core.sincronizacao import transacao_atual
+
+REMOCAO_EXECUCAO = "execucao"
+REMOCAO_PASSO = "passo"
+REMOCAO_DEFEITO = "defeito"
+
+
+class SincronizacaoRepository:
+    """Remoções do delta-sync dos executores, gravadas na transação de quem exclui ou reatribui."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def registrar_remocoes(self, entidade: str, linhas: Iterable[Tuple[int, Optional[int]]]):
+        """`linhas` são (id, responsavel_id); itens sem responsável não estão na lista de ninguém."""
+        self.db.add_all([
+            RemocaoSincronizacao(entidade=entidade, entidade_id=id, responsavel_id=responsavel_id)
+            for id, responsavel_id in linhas
+            if responsavel_id is not None
+        ])
+
+    async def registrar_passos_removidos(self, linhas: Iterable[Tuple[int, int]]):
+        """`linhas` são (passo_id, execucao_teste_id) de passos excluídos de execuções que continuam existindo."""
+        linhas = list(linhas)
+        if not linhas:
+            return
+        responsaveis = dict((await self.db.execute(
+            select(ExecucaoTeste.id, ExecucaoTeste.responsavel_id)
+            .where(ExecucaoTeste.id.in_({execucao_id for _, execucao_id in linhas}))
+        )).all())
+        self.registrar_remocoes(REMOCAO_PASSO, [(id, responsaveis.get(execucao_id)) for id, execucao_id in linhas])
+
+    async def reenviar_execucao(self, execucao_id: int):
+        """Marca passos e defeitos da execução como alterados, para irem no próximo delta do novo responsável."""
+        for modelo in (ExecucaoPasso, Defeito):
+            await self.db.execute(
+                update(modelo)
+                .where(modelo.execucao_teste_id == execucao_id)
+                .values(alteracao=transacao_atual(), updated_at=modelo.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def listar_remocoes(self, responsavel_id: int, desde: int) -> Dict[str, List[int]]:
+        query = (
+            select(RemocaoSincronizacao.entidade, RemocaoSincronizacao.entidade_id)
+            .where(RemocaoSincronizacao.responsavel_id == responsavel_id, RemocaoSincronizacao.alteracao >= desde)
+            .order_by(RemocaoSincronizacao.id)
+        )
+        remocoes = {REMOCAO_EXECUCAO: [], REMOCAO_PASSO: [], REMOCAO_DEFEITO: []}
+        for entidade, entidade_id in await self.db.execute(query):
+            remocoes.setdefault(entidade, []).append(entidade_id)
+        return remocoes
@@ -5,6 +5,8 @@ from typing import Sequence, Optional
 
 from app.models import Sistema
 from app.schemas import SistemaCreate, SistemaUpdate
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.auditoria import enfileirar_auditoria
 
 class SistemaRepository:
     def __init__(self, db: AsyncSession):
@@ -13,13 +15,14 @@ class SistemaRepository:
     async def create_sistema(self, sistema_data: SistemaCreate) -> Sistema:
         db_sistema = Sistema(**sistema_data.model_dump())
         self.db.add(db_sistema)
+        await enfileirar_auditoria(self.db, db_sistema)
         await self.db.commit()
         await self.db.refresh(db_sistema)
         return db_sistema
 
-    async def get_all_sistemas(self) -> Sequence[Sistema]:
-        result = await self.db.execute(select(Sistema))
-        return result.scalars().all()
+    async def get_all_sistemas(self, pagina: Optional[Pagina] = None) -> Sequence[Sistema]:
+        result = await self.db.execute(paginar(select(Sistema), pagina, Sistema.id, decrescente=False))
+        return fechar_pagina(result.scalars().all(), pagina, Sistema.id)
 
     async def get_sistema_by_id(self, sistema_id: int) -> Sistema | None:
         result = await self.db.execute(
@@ -45,11 +48,16 @@ class SistemaRepository:
             .returning(Sistema)
         )
         result = await self.db.execute(query)
+        sistema = result.scalars().first()
+        if sistema:
+            await enfileirar_auditoria(self.db, sistema)
         await self.db.commit()
-        return result.scalars().first()
+        return sistema
 
     async def delete_sistema(self, sistema_id: int) -> bool:
         query = sqlalchemy_delete(Sistema).where(Sistema.id == sistema_id)
         result = await self.db.execute(query)
+        if result.rowcount > 0:
+            await enfileirar_auditoria(self.db)
         await self.db.commit()
         return result.rowcount > 0
\ No newline at end of file
@@ -3,6 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app.models.usuario import Usuario
+from app.core.paginacao import Pagina, paginar, fechar_pagina
+from app.core.auditoria import enfileirar_auditoria
 
 class UsuarioRepository:
     def __init__(self, db: AsyncSession):
@@ -23,16 +25,17 @@ class UsuarioRepository:
         result = await self.db.execute(query)
         return result.scalars().first()
 
-    async def get_all_usuarios(self, ativo: Optional[bool] = None) -> List[Usuario]:
-        query = select(Usuario).options(selectinload(Usuario.nivel_acesso)).order_by(Usuario.id)
+    async def get_all_usuarios(self, ativo: Optional[bool] = None, pagina: Optional[Pagina] = None) -> List[Usuario]:
+        query = select(Usuario).options(selectinload(Usuario.nivel_acesso))
         if ativo is not None:
             query = query.where(Usuario.ativo == ativo)
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        result = await self.db.execute(paginar(query, pagina, Usuario.id, decrescente=False))
+        return fechar_pagina(result.scalars().all(), pagina, Usuario.id)
 
     async def create(self, usuario: Usuario) -> Usuario:
         self.db.add(usuario)
-        await self.db.commit()        
+        await enfileirar_auditoria(self.db, usuario)
+        await self.db.commit()
         query = select(Usuario).options(selectinload(Usuario.nivel_acesso)).where(Usuario.id == usuario.id)
         result = await self.db.execute(query)
         return result.scalars().first()
@@ -47,6 +50,7 @@ class UsuarioRepository:
                 setattr(db_obj, field, value)
             
         self.db.add(db_obj)
+        await enfileirar_auditoria(self.db, db_obj)
         await self.db.commit()
         
         return await self.get_by_id(user_id)
@@ -55,6 +59,7 @@ class UsuarioRepository:
         usuario = await self.get_by_id(user_id)
         if usuario:
             await self.db.delete(usuario)
+            await enfileirar_auditoria(self.db)
             await self.db.commit()
             return True
         return False
\ No newline at end of file
@@ -28,4 +28,19 @@ class CicloTesteResponse(CicloTesteBase):
     total_testes: int = 0
     testes_concluidos: int = 0
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class CicloRetesteCreate(BaseModel):
+    # Sem nome, usa "<ciclo de origem> - Reteste"
+    nome: Optional[str] = None
+    descricao: Optional[str] = None
+    data_inicio: Optional[datetime] = None
+    data_fim: Optional[datetime] = None
+    # Só execuções com defeito em "corrigido"
+    apenas_defeitos_corrigidos: bool = False
+
+class CicloRetesteResponse(BaseModel):
+    ciclo: CicloTesteResponse
+    ciclo_origem_id: int
+    execucoes_criadas: int
+    passos_criados: int
@@ -87,4 +87,14 @@ class PerformanceResponse(BaseModel):
     
     grafico_velocidade: List[ChartDataPoint] = []
     grafico_top_modulos: List[ChartDataPoint] = []
-    grafico_severidade: List[ChartDataPoint] = []
\ No newline at end of file
+    grafico_severidade: List[ChartDataPoint] = []
+
+# --- DURAÇÃO DAS EXECUÇÕES ---
+
+class DuracaoEstatistica(BaseModel):
+    id: int
+    label: str
+    execucoes: int
+    media_minutos: float
+    p50_minutos: float
+    p95_minutos: float
@@ -59,6 +59,8 @@ class DefeitoUpdate(BaseModel):
     evidencias: Optional[Union[List[str], str]] = None
     severidade: Optional[SeveridadeDefeitoEnum] = None
     status: Optional[StatusDefeitoEnum] = None
+    # Versão lida pelo cliente; se informada e o defeito tiver mudado, a resposta é 409
+    versao: Optional[int] = None
     
     @field_validator('evidencias', mode='before')
     @classmethod
@@ -72,6 +74,7 @@ class DefeitoUpdate(BaseModel):
 
 class DefeitoResponse(DefeitoBase):
     id: int
+    versao: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
     execucao: Optional[ExecucaoTesteResponse] = None    
@@ -80,4 +83,14 @@ class DefeitoResponse(DefeitoBase):
     responsavel_teste_nome: Optional[str] = None
     responsavel_projeto_nome: Optional[str] = None
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class DefeitoSincronizado(DefeitoBase):
+    """Defeito sem o grafo da execução, para o delta-sync do executor."""
+    id: int
+    execucao_teste_id: int
+    versao: int = 1
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,93 @@
+import re
+from datetime import datetime
+from pydantic import BaseModel, field_validator
+from typing import Dict, List, Optional
+
+
+def _validar_sha256(v: Optional[str]) -> Optional[str]:
+    if v is None:
+        return v
+    v = v.lower()
+    if not re.fullmatch(r"[0-9a-f]{64}", v):
+        raise ValueError("sha256 deve ter 64 caracteres hexadecimais")
+    return v
+
+def _validar_positivo(v: int) -> int:
+    if v <= 0:
+        raise ValueError("tamanho deve ser positivo")
+    return v
+
+
+class EvidenciaResponse(BaseModel):
+    url: str
+    nome: str
+    tamanho: int
+    mime_type: str
+    sha256: str
+    duplicado: bool = False
+    miniatura_url: Optional[str] = None
+    previa_url: Optional[str] = None
+
+class EvidenciaUploadDireto(BaseModel):
+    """Arquivo que o cliente quer enviar direto ao armazenamento (hash calculado por ele)."""
+    sha256: str
+    tamanho: int
+    mime_type: str
+    nome: Optional[str] = None
+
+    @field_validator('sha256')
+    @classmethod
+    def validar_sha256(cls, v: str) -> str:
+        return _validar_sha256(v)
+
+    @field_validator('tamanho')
+    @classmethod
+    def validar_tamanho(cls, v: int) -> int:
+        return _validar_positivo(v)
+
+class EvidenciaUploadDiretoResponse(BaseModel):
+    """`evidencia` preenchida: o conteúdo já existe e nada precisa ser enviado.
+
+    Senão, com `direto`, o cliente faz `metodo` em `url` com `headers` e depois confirma;
+    sem `direto` (armazenamento local), usa o upload multipart do passo.
+    """
+    direto: bool
+    evidencia: Optional[EvidenciaResponse] = None
+    metodo: Optional[str] = None
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+
+
+# --- Upload retomável em blocos ---
+
+class UploadEvidenciaCreate(BaseModel):
+    nome: str
+    tamanho: int
+    mime_type: Optional[str] = None
+
+    @field_validator('tamanho')
+    @classmethod
+    def validar_tamanho(cls, v: int) -> int:
+        return _validar_positivo(v)
+
+class UploadEvidenciaResponse(BaseModel):
+    """Progresso do upload: o bloco `i` começa no offset `i * tamanho_bloco`."""
+    id: str
+    passo_id: int
+    nome: str
+    mime_type: str
+    tamanho: int
+    tamanho_bloco: int
+    total_blocos: int
+    blocos_recebidos: List[int]
+    bytes_recebidos: int
+    expira_em: datetime
+
+class UploadEvidenciaConcluir(BaseModel):
+    """`sha256`, se informado, é conferido com o do arquivo montado."""
+    sha256: Optional[str] = None
+
+    @field_validator('sha256')
+    @classmethod
+    def validar_sha256(cls, v: Optional[str]) -> Optional[str]:
+        return _validar_sha256(v)
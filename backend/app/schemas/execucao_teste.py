@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
 from datetime import datetime
 from typing import List, Optional, Union
 
@@ -25,12 +25,23 @@ class ExecucaoPassoUpdate(BaseModel):
     status: Optional[str] = None
     resultado_obtido: Optional[str] = None
     evidencias: Optional[Union[List[str], str]] = None 
+    # Versão do passo vista pelo cliente; divergência devolve 409 com o estado atual
+    versao: Optional[int] = None
+
+class ExecucaoPassoLoteItem(ExecucaoPassoUpdate):
+    id: int
+
+class ExecucaoPassoLote(BaseModel):
+    passos: List[ExecucaoPassoLoteItem]
 
 class ExecucaoPassoResponse(ExecucaoPassoBase):
     id: int
     execucao_teste_id: int
     passo_caso_teste_id: int
+    versao: int = 1
     
+    iniciado_em: Optional[datetime] = None
+    finalizado_em: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -40,6 +51,9 @@ class ExecucaoPassoResponse(ExecucaoPassoBase):
 
 class ExecucaoTesteResponse(ExecucaoTesteBase):
     id: int
+    versao: int = 1
+    iniciado_em: Optional[datetime] = None
+    finalizado_em: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -47,4 +61,62 @@ class ExecucaoTesteResponse(ExecucaoTesteBase):
     responsavel: Optional[UsuarioSimple] = None
     passos_executados: List[ExecucaoPassoResponse] = []
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ExecucaoTarefaResumo(BaseModel):
+    """Linha da lista de tarefas do executor; o grafo completo vem de /execucoes/{id}."""
+    id: int
+    status_geral: StatusExecucaoEnum
+    caso_teste_id: int
+    caso_teste_nome: str
+    prioridade: Optional[str] = None
+    projeto_id: int
+    projeto_nome: Optional[str] = None
+    ciclo_teste_id: int
+    ciclo_nome: Optional[str] = None
+    passos_pendentes: int = 0
+    passos_aprovados: int = 0
+    passos_reprovados: int = 0
+    passos_bloqueados: int = 0
+    versao: int = 1
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# --- ALOCAÇÃO EM LOTE ---
+
+class AlocacaoItem(BaseModel):
+    caso_teste_id: int
+    responsavel_id: int
+
+class AlocacaoLoteCreate(BaseModel):
+    ciclo_teste_id: int
+    # Modo 1: pares caso/responsável explícitos
+    alocacoes: Optional[List[AlocacaoItem]] = None
+    # Modo 2: todos os casos ativos do projeto do ciclo, em rodízio entre os testadores
+    responsaveis_ids: Optional[List[int]] = None
+    # Não duplica casos que já têm execução no ciclo
+    ignorar_existentes: bool = True
+
+    @model_validator(mode='after')
+    def validar_modo(self):
+        if bool(self.alocacoes) == bool(self.responsaveis_ids):
+            raise ValueError("Informe 'alocacoes' ou 'responsaveis_ids' (apenas um dos dois).")
+        return self
+
+class AlocacaoLoteResponse(BaseModel):
+    ciclo_teste_id: int
+    solicitadas: int
+    execucoes_criadas: int
+    passos_criados: int
+    ignoradas: int
+
+class ExecucaoStatusResumo(BaseModel):
+    id: int
+    status_geral: StatusExecucaoEnum
+    versao: int
+
+class ExecucaoPassoLoteResponse(BaseModel):
+    passos: List[ExecucaoPassoResponse]
+    execucoes: List[ExecucaoStatusResumo]
+
@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+from .execucao_teste import ExecucaoTarefaResumo, ExecucaoPassoResponse, ExecucaoPassoLoteItem, ExecucaoStatusResumo
+from .defeito import DefeitoSincronizado
+
+class SincronizacaoResponse(BaseModel):
+    # Enviar como `desde` na próxima chamada
+    token: str
+    # True quando não veio `desde`: o cliente deve substituir o estado local em vez de mesclar
+    completa: bool
+    execucoes: List[ExecucaoTarefaResumo]
+    passos: List[ExecucaoPassoResponse]
+    defeitos: List[DefeitoSincronizado]
+    # Ids que saíram da lista do executor desde o token (excluídos ou reatribuídos): descartar
+    # localmente antes de mesclar. Passos e defeitos de uma execução removida saem junto com ela.
+    execucoes_removidas: List[int] = []
+    passos_removidos: List[int] = []
+    defeitos_removidos: List[int] = []
+
+class PassoOfflineItem(ExecucaoPassoLoteItem):
+    # Versão do passo quando o resultado foi registrado offline
+    versao: int
+
+class PassosOfflineLote(BaseModel):
+    passos: List[PassoOfflineItem]
+
+class ConflitoPassoOffline(BaseModel):
+    id: int
+    # "nao_encontrado" (inexistente ou de outro executor) ou "versao" (alterado no servidor)
+    motivo: str
+    atual: Optional[ExecucaoPassoResponse] = None
+
+class PassosOfflineResponse(BaseModel):
+    aplicados: List[ExecucaoPassoResponse]
+    execucoes: List[ExecucaoStatusResumo]
+    conflitos: List[ConflitoPassoOffline]
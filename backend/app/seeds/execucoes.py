@@ -29,7 +29,8 @@ async def seed_execucoes(session: AsyncSession):
                 ciclo_teste_id=case.ciclo_id,
                 caso_teste_id=case.id,
                 responsavel_id=case.responsavel_id,
-                status_geral=StatusExecucaoEnum.pendente
+                status_geral=StatusExecucaoEnum.pendente,
+                passos_pendentes=len(case.passos)
             )
             session.add(new_exec)
             await session.flush()
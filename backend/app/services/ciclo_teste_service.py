@@ -5,16 +5,19 @@ from fastapi import HTTPException, status
 from datetime import datetime
 
 from app.repositories.ciclo_teste_repository import CicloTesteRepository
-from app.schemas.ciclo_teste import CicloTesteCreate, CicloTesteUpdate, CicloTesteResponse
+from app.schemas.ciclo_teste import (
+    CicloTesteCreate, CicloTesteUpdate, CicloTesteResponse, CicloRetesteCreate, CicloRetesteResponse
+)
 from app.models.testing import CicloTeste 
 from app.core.errors import tratar_erro_integridade
+from app.core.paginacao import Pagina
 
 class CicloTesteService:
     def __init__(self, db: AsyncSession):
         self.repo = CicloTesteRepository(db)
 
-    async def get_all_ciclos(self) -> Sequence[CicloTesteResponse]:
-        ciclos = await self.repo.get_all()
+    async def get_all_ciclos(self, pagina: Optional[Pagina] = None) -> Sequence[CicloTesteResponse]:
+        ciclos = await self.repo.get_all(pagina)
         return [CicloTesteResponse.model_validate(c) for c in ciclos]
     
     async def obter_ciclo(self, ciclo_id: int) -> Optional[CicloTeste]:
@@ -41,6 +44,26 @@ class CicloTesteService:
             await self.repo.db.rollback()
             tratar_erro_integridade(e)
 
+    async def gerar_reteste(self, ciclo_id: int, dados: CicloRetesteCreate) -> CicloRetesteResponse:
+        origem = await self.repo.get_by_id(ciclo_id)
+        if not origem:
+            raise HTTPException(status_code=404, detail="Ciclo não encontrado")
+
+        nome = dados.nome or f"{origem.nome} - Reteste"[:100]
+        if await self.repo.get_by_nome_projeto(nome, origem.projeto_id):
+            raise HTTPException(status_code=400, detail="Já existe um Ciclo com este nome neste projeto.")
+
+        try:
+            ciclo, resumo = await self.repo.create_reteste(origem, nome, dados)
+        except IntegrityError as e:
+            await self.repo.db.rollback()
+            tratar_erro_integridade(e)
+        return CicloRetesteResponse(
+            ciclo=CicloTesteResponse.model_validate(ciclo),
+            ciclo_origem_id=ciclo_id,
+            **resumo
+        )
+
     async def atualizar_ciclo(self, ciclo_id: int, dados: CicloTesteUpdate):
         update_data = dados.model_dump(exclude_unset=True)
         try:
@@ -52,8 +75,8 @@ class CicloTesteService:
             await self.repo.db.rollback()
             tratar_erro_integridade(e)
 
-    async def listar_por_projeto(self, projeto_id: int):
-        items = await self.repo.list_by_projeto(projeto_id)
+    async def listar_por_projeto(self, projeto_id: int, pagina: Optional[Pagina] = None):
+        items = await self.repo.list_by_projeto(projeto_id, pagina)
         return [CicloTesteResponse.model_validate(i) for i in items]
 
     async def remover_ciclo(self, ciclo_id: int):
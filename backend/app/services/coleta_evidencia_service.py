@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.models.testing import Defeito, ExecucaoPasso
+from app.core.armazenamento import ObjetoArmazenado, obter_armazenamento
+from app.core.config import settings
+from app.core.evidencias import DIRETORIO_UPLOADS, extrair_chaves_legadas, extrair_hashes, hash_da_chave
+
+
+class ColetaEvidenciaService:
+    """Remove do armazenamento as evidências que nenhum passo ou defeito cita mais.
+
+    Varre as listas de evidências (a fonte da verdade), percorre a listagem do armazenamento
+    e apaga o que ficou sem referência por mais que a carência. Sem `executar`, só relata.
+    Contadores de `objetos_evidencia` divergentes da varredura são recontados sob bloqueio e corrigidos.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        *,
+        executar: bool = False,
+        carencia_horas: Optional[float] = None,
+        remocoes_por_segundo: Optional[float] = None,
+        ao_remover: Optional[Callable[[ObjetoArmazenado, str], None]] = None
+    ):
+        self.repo = EvidenciaRepository(db)
+        self.armazenamento = obter_armazenamento()
+        self.executar = executar
+        self.limite = datetime.now(timezone.utc) - timedelta(
+            hours=settings.EVIDENCE_GC_GRACE_HOURS if carencia_horas is None else carencia_horas
+        )
+        self.remocoes_por_segundo = settings.EVIDENCE_GC_DELETES_PER_SECOND if remocoes_por_segundo is None else remocoes_por_segundo
+        self.ao_remover = ao_remover
+        self.relatorio = Counter()
+        self._proxima_remocao = 0.0
+
+    async def coletar(self) -> Dict[str, int]:
+        # Sessões lidas antes da listagem: blocos de sessões criadas depois são recentes e ficam na carência
+        uploads = await self.repo.listar_uploads()
+        contagem, legados = await self._varrer_referencias()
+
+        lote: List[ObjetoArmazenado] = []
+        async for item in self.armazenamento.listar():
+            self.relatorio["arquivos"] += 1
+            self.relatorio["bytes"] += item.tamanho
+            lote.append(item)
+            if len(lote) >= settings.EVIDENCE_GC_BATCH_SIZE:
+                await self._processar_lote(lote, contagem, legados, uploads)
+                lote = []
+        if lote:
+            await self._processar_lote(lote, contagem, legados, uploads)
+
+        if self.executar:
+            self.relatorio["sessoes_upload_expiradas"] = await self.repo.remover_uploads_expirados(datetime.now(timezone.utc))
+        return dict(self.relatorio)
+
+    async def _varrer_referencias(self):
+        """Quantas listas citam cada objeto (hash em bytes, para caber em memória) e as chaves antigas citadas."""
+        contagem: Dict[bytes, int] = {}
+        legados = set()
+        for modelo in (ExecucaoPasso, Defeito):
+            ultimo_id = 0
+            while lote := await self.repo.listar_evidencias(modelo, ultimo_id, settings.EVIDENCE_GC_BATCH_SIZE):
+                for ultimo_id, evidencias in lote:
+                    self.relatorio["listas_lidas"] += 1
+                    for sha256 in extrair_hashes(evidencias):
+                        chave = bytes.fromhex(sha256)
+                        contagem[chave] = contagem.get(chave, 0) + 1
+                    legados |= extrair_chaves_legadas(evidencias)
+                await asyncio.sleep(settings.EVIDENCE_GC_PAUSE_SECONDS)
+        return contagem, legados
+
+    async def _processar_lote(self, lote: List[ObjetoArmazenado], contagem, legados, uploads):
+        candidatos: Dict[str, List[ObjetoArmazenado]] = {}
+        hashes = set()
+        for item in lote:
+            if item.chave.startswith(DIRETORIO_UPLOADS + "/"):
+                await self._avaliar_bloco_upload(item, uploads)
+                continue
+            sha256 = hash_da_chave(item.chave)
+            if sha256 is None:
+                await self._avaliar_legado(item, legados)
+                continue
+            hashes.add(sha256)
+            if bytes.fromhex(sha256) in contagem:
+                self.relatorio["referenciados"] += 1
+            elif item.modificado_em > self.limite:
+                self.relatorio["em_carencia"] += 1
+            else:
+                candidatos.setdefault(sha256, []).append(item)
+
+        objetos = await self.repo.get_varios(hashes)
+        for sha256, objeto in objetos.items():
+            # A varredura é de horas atrás: a divergência só aponta quem recontar
+            if objeto.referencias != contagem.get(bytes.fromhex(sha256), 0):
+                self.relatorio["contadores_divergentes"] += 1
+                if self.executar:
+                    await self._corrigir_contador(sha256)
+
+        for sha256, itens in candidatos.items():
+            objeto = objetos.get(sha256)
+            if objeto is not None:
+                # O registro manda: a carência conta de quando o objeto perdeu a última referência
+                desde = objeto.sem_referencia_desde
+                if objeto.referencias > 0 or desde is None or desde > self.limite:
+                    self.relatorio["em_carencia"] += len(itens)
+                    continue
+            if not self.executar:
+                for item in itens:
+                    await self._remover(item, "objeto sem referência")
+                continue
+            await self._remover_orfao(sha256, itens)
+
+        await asyncio.sleep(settings.EVIDENCE_GC_PAUSE_SECONDS)
+
+    async def _corrigir_contador(self, sha256: str):
+        """Reconta as referências do objeto agora, sob o bloqueio do conteúdo, e corrige o contador."""
+        await self.repo.bloquear_conteudo(sha256)
+        try:
+            total = await self.repo.recontar_referencias(sha256)
+            if total is not None and await self.repo.corrigir_referencias(sha256, total):
+                self.relatorio["contadores_corrigidos"] += 1
+        finally:
+            await self.repo.liberar_conteudo()
+
+    async def _remover_orfao(self, sha256: str, itens: List[ObjetoArmazenado]):
+        """Apaga registro e arquivos sob o bloqueio do conteúdo, conferindo de novo o que a listagem viu.
+
+        Um upload do mesmo conteúdo espera o bloqueio; o que chegou antes dele (registro novo, carência
+        renovada ou arquivo regravado depois da listagem) mantém o objeto.
+        """
+        await self.repo.bloquear_conteudo(sha256)
+        try:
+            objeto = await self.repo.get(sha256)
+            if objeto is not None and not await self.repo.remover_se_orfao(sha256, self.limite, confirmar=False):
+                # Voltou a ser usado depois da varredura
+                self.relatorio["em_carencia"] += len(itens)
+                return
+            for item in itens:
+                # Upload direto ao armazenamento não passa pelo bloqueio: confere se o arquivo mudou
+                atual = await self.armazenamento.info(item.chave)
+                if atual is None:
+                    continue
+                if atual.modificado_em > self.limite:
+                    self.relatorio["em_carencia"] += 1
+                    continue
+                await self._remover(item, "objeto sem referência")
+        finally:
+            await self.repo.liberar_conteudo()
+
+    async def _avaliar_bloco_upload(self, item: ObjetoArmazenado, uploads):
+        upload_id = item.chave.split("/")[1]
+        expira_em = uploads.get(upload_id)
+        if expira_em is not None and expira_em > datetime.now(timezone.utc):
+            self.relatorio["uploads_em_andamento"] += 1
+        elif expira_em is not None or item.modificado_em <= self.limite:
+            await self._remover(item, "upload abandonado")
+        else:
+            self.relatorio["em_carencia"] += 1
+
+    async def _avaliar_legado(self, item: ObjetoArmazenado, legados):
+        if item.chave in legados:
+            self.relatorio["referenciados"] += 1
+        elif item.modificado_em > self.limite:
+            self.relatorio["em_carencia"] += 1
+        else:
+            await self._remover(item, "arquivo antigo sem referência")
+
+    async def _remover(self, item: ObjetoArmazenado, motivo: str):
+        self.relatorio["removidos"] += 1
+        self.relatorio["bytes_removidos"] += item.tamanho
+        if self.ao_remover:
+            self.ao_remover(item, motivo)
+        if not self.executar:
+            return
+        if self.remocoes_por_segundo > 0:
+            espera = self._proxima_remocao - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            self._proxima_remocao = max(time.monotonic(), self._proxima_remocao) + 1 / self.remocoes_por_segundo
+        await self.armazenamento.remover(item.chave)
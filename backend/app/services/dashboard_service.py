@@ -1,12 +1,14 @@
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.dashboard_repository import DashboardRepository
+from app.core.cache import response_cache, tags_sistema, tags_usuario
+from app.core.fanout import executar_em_paralelo
 from app.models.testing import StatusExecucaoEnum, SeveridadeDefeitoEnum
 from app.schemas.dashboard import (
     DashboardResponse, DashboardKPI, DashboardCharts, ChartDataPoint,
     RunnerDashboardResponse, RunnerKPI, RunnerRankingData, 
     StatusDistributionData, TimelineItem, RunnerDashboardCharts,
-    PerformanceResponse, TeamStats, TesterStats
+    PerformanceResponse, TeamStats, TesterStats, DuracaoEstatistica
 )
 
 class DashboardService:
@@ -30,13 +32,63 @@ class DashboardService:
     }
 
     def __init__(self, db: AsyncSession):
+        # As consultas do dashboard abrem sessões próprias via executar_em_paralelo;
+        # a sessão da requisição fica disponível para chamadas pontuais.
         self.repo = DashboardRepository(db)
 
     async def get_dashboard_data(self, sistema_id: int = None) -> DashboardResponse:
-        kpis_data = await self.repo.get_kpis_gerais(sistema_id)
-        exec_status_data = await self.repo.get_status_execucao_geral(sistema_id)
-        severity_data = await self.repo.get_defeitos_por_severidade(sistema_id)
-        modules_data = await self.repo.get_modulos_com_mais_defeitos(limit=5, sistema_id=sistema_id)
+        return await response_cache.get_or_set(
+            "dashboard", DashboardResponse,
+            lambda: self._calcular_dashboard(sistema_id),
+            tags=tags_sistema(sistema_id),
+            sistema_id=sistema_id
+        )
+
+    async def get_runner_dashboard_data(self, runner_id: Optional[int] = None) -> RunnerDashboardResponse:
+        return await response_cache.get_or_set(
+            "runner", RunnerDashboardResponse,
+            lambda: self._calcular_runner_dashboard(runner_id),
+            tags=tags_usuario(runner_id),
+            usuario_id=runner_id
+        )
+
+    async def get_performance_analytics(
+        self, user_id: Optional[int] = None, dias: int = 30, agrupamento: str = "dia"
+    ) -> PerformanceResponse:
+        return await response_cache.get_or_set(
+            "performance", PerformanceResponse,
+            lambda: self._calcular_performance(user_id, dias, agrupamento),
+            tags=tags_usuario(user_id),
+            usuario_id=user_id, dias=dias, agrupamento=agrupamento
+        )
+
+    async def get_duracoes(
+        self, agrupar_por: str, dias: int = 90, filtro_id: Optional[int] = None
+    ) -> List[DuracaoEstatistica]:
+        linhas = await self.repo.get_duracoes(agrupar_por, days=dias, filtro_id=filtro_id)
+        return [
+            DuracaoEstatistica(
+                id=chave,
+                label=label,
+                execucoes=total,
+                media_minutos=round(media / 60, 1),
+                p50_minutos=round(p50 / 60, 1),
+                p95_minutos=round(p95 / 60, 1)
+            )
+            for chave, label, total, media, p50, p95 in linhas
+        ]
+
+    async def _calcular_dashboard(self, sistema_id: Optional[int]) -> DashboardResponse:
+        # KPIs e distribuições de status/severidade vêm de uma única instrução;
+        # o ranking de módulos roda em paralelo, em outra sessão
+        dados = await executar_em_paralelo({
+            "kpis": lambda db: DashboardRepository(db).get_kpis_gerais(sistema_id),
+            "modulos": lambda db: DashboardRepository(db).get_modulos_com_mais_defeitos(limit=5, sistema_id=sistema_id),
+        })
+        kpis_data = dados["kpis"]
+        exec_status_data = kpis_data["status_execucao"]
+        severity_data = kpis_data["defeitos_por_severidade"]
+        modules_data = dados["modulos"]
 
         # --- LÓGICA NOVA: Calcular Total de Testes Finalizados ---
         # Consideramos finalizados: 'passou', 'falhou', 'bloqueado', 'fechado', 'concluido'
@@ -75,10 +127,19 @@ class DashboardService:
 
         return DashboardResponse(kpis=kpis, charts=charts)
 
-    async def get_runner_dashboard_data(self, runner_id: Optional[int] = None) -> RunnerDashboardResponse:
-        raw_kpis = await self.repo.get_runner_kpis(runner_id)
-        status_dist = await self.repo.get_status_distribution(runner_id)
-        raw_timeline = await self.repo.get_runner_timeline(runner_id)
+    async def _calcular_runner_dashboard(self, runner_id: Optional[int]) -> RunnerDashboardResponse:
+        consultas = {
+            "kpis": lambda db: DashboardRepository(db).get_runner_kpis(runner_id),
+            "distribuicao": lambda db: DashboardRepository(db).get_status_distribution(runner_id),
+            "timeline": lambda db: DashboardRepository(db).get_runner_timeline(runner_id),
+        }
+        if not runner_id:
+            consultas["ranking"] = lambda db: DashboardRepository(db).get_ranking_runners()
+        dados = await executar_em_paralelo(consultas)
+
+        raw_kpis = dados["kpis"]
+        status_dist = dados["distribuicao"]
+        raw_timeline = dados["timeline"]
 
         kpis = RunnerKPI(
             total_execucoes_concluidas=raw_kpis.get("total_concluidos", 0),
@@ -90,7 +151,7 @@ class DashboardService:
 
         ranking_data = []
         if not runner_id:
-            ranking_raw = await self.repo.get_ranking_runners()
+            ranking_raw = dados["ranking"]
             ranking_data = [RunnerRankingData(label=name, value=total, color="#3b82f6") for name, total in ranking_raw]
 
         dist_data = [
@@ -122,17 +183,28 @@ class DashboardService:
         return RunnerDashboardResponse(kpis=kpis, charts=charts)
 
     
-    async def get_performance_analytics(self, user_id: Optional[int] = None) -> PerformanceResponse:
+    async def _calcular_performance(self, user_id: Optional[int], dias: int, agrupamento: str) -> PerformanceResponse:
         # Métricas e gráficos focados no desempenho do TESTADOR (não do teste)
-        velocity_data = await self.repo.get_performance_velocity(user_id)
-        modules_data = await self.repo.get_top_modules_by_defects_perf(user_id)
-        severity_data = await self.repo.get_defects_by_severity_perf(user_id)
+        consultas = {
+            "velocidade": lambda db: DashboardRepository(db).get_performance_velocity(user_id, days=dias, agrupamento=agrupamento),
+            "modulos": lambda db: DashboardRepository(db).get_top_modules_by_defects_perf(user_id, days=dias),
+            "severidade": lambda db: DashboardRepository(db).get_defects_by_severity_perf(user_id, days=dias),
+        }
+        if user_id:
+            consultas["stats"] = lambda db: DashboardRepository(db).get_tester_performance_stats(user_id, days=dias)
+        else:
+            consultas["stats"] = lambda db: DashboardRepository(db).get_team_performance_stats(days=dias)
+        dados = await executar_em_paralelo(consultas)
+
+        velocity_data = dados["velocidade"]
+        modules_data = dados["modulos"]
+        severity_data = dados["severidade"]
+        stats = dados["stats"]
 
         team_stats: Optional[TeamStats] = None
         tester_stats: Optional[TesterStats] = None
 
         if user_id:
-            stats = await self.repo.get_tester_performance_stats(user_id)
             tester_stats = TesterStats(
                 impacto_relevante=stats["impacto_relevante"],
                 execucoes_30d=stats["execucoes_30d"],
@@ -140,7 +212,6 @@ class DashboardService:
                 tempo_medio_registro_horas=stats["tempo_medio_registro_horas"],
             )
         else:
-            stats = await self.repo.get_team_performance_stats()
             team_stats = TeamStats(
                 efetividade=stats["efetividade"],
                 risco_ativo=stats["risco_ativo"],
@@ -150,9 +221,10 @@ class DashboardService:
 
         # CORREÇÃO AQUI: item já é um objeto date, removemos o .date se necessário, 
         # mas aqui assumimos que é date. Adicionado check para evitar erro em None.
+        formato_data = "%m/%Y" if agrupamento == "mes" else "%d/%m"
         velocity_chart = [
             ChartDataPoint(
-                label=item.strftime("%d/%m") if item else "Data Inválida", 
+                label=item.strftime(formato_data) if item else "Data Inválida", 
                 value=count,
                 color="#3b82f6"
             ) for item, count in velocity_data
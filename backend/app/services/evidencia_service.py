@@ -0,0 +1,357 @@
+import csv
+import io
+import json
+import math
+import mimetypes
+import posixpath
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, UploadFile
+
+from app.repositories.evidencia_repository import EvidenciaRepository
+from app.models.evidencia import ObjetoEvidencia, UploadEvidencia
+from app.models.testing import CicloTeste, Defeito, ExecucaoTeste
+from app.schemas.evidencia import (
+    EvidenciaResponse, EvidenciaUploadDireto, EvidenciaUploadDiretoResponse,
+    UploadEvidenciaCreate, UploadEvidenciaResponse
+)
+from app.core.armazenamento import obter_armazenamento
+from app.core.compactacao import EntradaZip, zip_em_fluxo
+from app.core.config import settings
+from app.core.evidencias import (
+    GENERICO, analisar_upload, calcular_hash, chave_bloco_upload, chave_legada_da_url, chave_objeto,
+    conferir_tamanho, definir_extensao, extrair_hashes, gravar_objeto, hash_da_url, objeto_existe,
+    tipo_declarado, tipo_permitido, tipo_por_assinatura, url_objeto, url_variante, urls_evidencias, validar_tamanho, validar_tipo
+)
+from app.core.miniaturas import VARIANTES, chave_variante, gerar_variantes, suporta_variantes
+
+COLUNAS_MANIFESTO = ["arquivo", "origem", "execucao_id", "caso_teste", "passo_ou_defeito", "status", "sha256", "tamanho", "url", "situacao"]
+
+
+class EvidenciaService:
+    def __init__(self, db: AsyncSession):
+        self.repo = EvidenciaRepository(db)
+
+    def _resposta(self, objeto: ObjetoEvidencia, duplicado: bool) -> EvidenciaResponse:
+        chave = chave_objeto(objeto.sha256, objeto.extensao)
+        com_variantes = suporta_variantes(objeto.mime_type)
+        return EvidenciaResponse(
+            url=url_objeto(chave),
+            nome=chave,
+            tamanho=objeto.tamanho,
+            mime_type=objeto.mime_type,
+            sha256=objeto.sha256,
+            duplicado=duplicado,
+            miniatura_url=url_variante(objeto.sha256, "miniatura") if com_variantes else None,
+            previa_url=url_variante(objeto.sha256, "previa") if com_variantes else None
+        )
+
+    async def tipo_para_servir(self, chave: str, sha256: Optional[str]) -> str:
+        """Tipo MIME com que a evidência é servida: o registrado no upload, não o deduzido da chave."""
+        if sha256:
+            objeto = await self.repo.get(sha256)
+            return objeto.mime_type if objeto else GENERICO
+        # Arquivos antigos e variantes não têm registro: a extensão só vale para tipos permitidos
+        mime_type = mimetypes.guess_type(chave)[0] or GENERICO
+        return mime_type if tipo_permitido(mime_type) else GENERICO
+
+    async def _guardar(self, analise: dict, gravar: Callable[[str], Awaitable[None]]) -> EvidenciaResponse:
+        """Grava (com `gravar(chave)`) e registra o conteúdo já analisado, salvo se ele já existir.
+
+        A gravação acontece fora de qualquer transação: a chave vem do conteúdo, então regravar é
+        inofensivo, e o arquivo gravado ou tocado agora tem mtime recente, que a coleta de órfãos
+        confere antes de remover. O bloqueio do conteúdo cobre só a consulta e o registro.
+        """
+        sha256 = analise["sha256"]
+        objeto = await self.repo.get(sha256)
+        extensao = objeto.extensao if objeto else analise["extensao"]
+        await self.repo.encerrar_leitura()
+
+        duplicado = objeto is not None and await obter_armazenamento().tocar(chave_objeto(sha256, extensao), objeto.mime_type)
+        if not duplicado:
+            await gravar(chave_objeto(sha256, extensao))
+
+        await self.repo.bloquear_conteudo(sha256)
+        try:
+            objeto = await self.repo.get(sha256)
+            if objeto is None:
+                objeto = await self.repo.registrar({**analise, "extensao": extensao})
+            elif objeto.referencias <= 0:
+                # Reaproveitar um objeto sem referências reinicia a carência da coleta de órfãos
+                await self.repo.renovar_carencia(sha256, confirmar=False)
+        except Exception:
+            await self.repo.db.rollback()
+            raise
+        # registrar já confirmou; sem ele, solta o bloqueio (e a carência renovada)
+        await self.repo.liberar_conteudo()
+
+        # Um upload direto confirmado ao mesmo tempo pode ter registrado outra extensão
+        if objeto.extensao != extensao:
+            chave = chave_objeto(sha256, objeto.extensao)
+            if not await obter_armazenamento().tocar(chave, objeto.mime_type):
+                await gravar(chave)
+
+        return self._resposta(objeto, duplicado)
+
+    async def armazenar(self, file: UploadFile) -> EvidenciaResponse:
+        """Guarda o upload pelo hash do conteúdo; conteúdo repetido devolve o objeto existente sem regravar."""
+        analise = await analisar_upload(file)
+        return await self._guardar(
+            analise, lambda chave: gravar_objeto(file, chave, analise["tamanho"], analise["mime_type"])
+        )
+
+    # --- Upload direto ao armazenamento (URL pré-assinada) ---
+    async def solicitar_upload_direto(self, dados: EvidenciaUploadDireto) -> EvidenciaUploadDiretoResponse:
+        validar_tipo(dados.mime_type)
+        validar_tamanho(dados.tamanho)
+
+        await self.repo.bloquear_conteudo(dados.sha256)
+        objeto = await self.repo.get(dados.sha256)
+        if objeto is not None and objeto.referencias <= 0 and not await self.repo.renovar_carencia(objeto.sha256, confirmar=False):
+            objeto = None
+        existe = objeto is not None and await objeto_existe(chave_objeto(objeto.sha256, objeto.extensao))
+        await self.repo.liberar_conteudo()
+        if existe:
+            return EvidenciaUploadDiretoResponse(direto=True, evidencia=self._resposta(objeto, duplicado=True))
+
+        extensao = objeto.extensao if objeto else definir_extensao(dados.nome, dados.mime_type)
+        instrucoes = obter_armazenamento().url_upload(chave_objeto(dados.sha256, extensao), dados.mime_type, dados.sha256)
+        if instrucoes is None:
+            return EvidenciaUploadDiretoResponse(direto=False)
+        return EvidenciaUploadDiretoResponse(direto=True, **instrucoes)
+
+    async def confirmar_upload_direto(self, dados: EvidenciaUploadDireto) -> EvidenciaResponse:
+        """Registra o objeto enviado direto ao armazenamento (o checksum já foi conferido por ele)."""
+        objeto = await self.repo.get(dados.sha256)
+        extensao = objeto.extensao if objeto else definir_extensao(dados.nome, dados.mime_type)
+        await self.repo.encerrar_leitura()
+
+        info = await obter_armazenamento().info(chave_objeto(dados.sha256, extensao))
+        if info is None:
+            raise HTTPException(status_code=404, detail="Upload não encontrado no armazenamento")
+        if info.tamanho != dados.tamanho:
+            raise HTTPException(status_code=422, detail="Tamanho do arquivo enviado difere do informado")
+
+        # Conferências feitas antes do bloqueio: um erro não deixa transação nem bloqueio abertos
+        await self.repo.bloquear_conteudo(dados.sha256)
+        objeto = await self.repo.get(dados.sha256)
+        if objeto is None:
+            objeto = await self.repo.registrar({
+                "sha256": dados.sha256, "extensao": extensao, "mime_type": dados.mime_type, "tamanho": dados.tamanho
+            })
+        else:
+            await self.repo.liberar_conteudo()
+        return self._resposta(objeto, duplicado=False)
+
+    async def obter_variante(self, sha256: str, variante: str) -> str:
+        """Chave da miniatura/prévia; se o pipeline ainda não a gerou, gera agora (no pool de processos)."""
+        if variante not in VARIANTES:
+            raise HTTPException(status_code=404, detail="Variante desconhecida")
+        objeto = await self.repo.get(sha256)
+        if not objeto:
+            raise HTTPException(status_code=404, detail="Evidência não encontrada")
+        if not suporta_variantes(objeto.mime_type):
+            raise HTTPException(status_code=404, detail="Evidência sem miniatura")
+
+        chave = chave_objeto(objeto.sha256, objeto.extensao)
+        if not await objeto_existe(chave):
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        await gerar_variantes(chave, objeto.mime_type, variantes=(variante,))
+        return chave_variante(chave, variante)
+
+    # --- Upload retomável em blocos ---
+    def _progresso(self, upload: UploadEvidencia) -> UploadEvidenciaResponse:
+        recebidos = json.loads(upload.blocos_recebidos or "[]")
+        total = math.ceil(upload.tamanho / upload.tamanho_bloco)
+        return UploadEvidenciaResponse(
+            id=upload.id,
+            passo_id=upload.passo_id,
+            nome=upload.nome,
+            mime_type=upload.mime_type,
+            tamanho=upload.tamanho,
+            tamanho_bloco=upload.tamanho_bloco,
+            total_blocos=total,
+            blocos_recebidos=recebidos,
+            bytes_recebidos=sum(self._tamanho_bloco(upload, i) for i in recebidos),
+            expira_em=upload.expira_em
+        )
+
+    @staticmethod
+    def _tamanho_bloco(upload: UploadEvidencia, indice: int) -> int:
+        return min(upload.tamanho_bloco, upload.tamanho - indice * upload.tamanho_bloco)
+
+    async def _obter_upload(self, upload_id: str, usuario_id: int) -> UploadEvidencia:
+        upload = await self.repo.get_upload(upload_id, usuario_id)
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+        if upload.expira_em <= datetime.now(timezone.utc):
+            raise HTTPException(status_code=410, detail="Upload expirado; inicie um novo")
+        return upload
+
+    async def _blocos_montados(self, upload: UploadEvidencia) -> AsyncIterator[bytes]:
+        """O arquivo inteiro, lido bloco a bloco da área de uploads."""
+        armazenamento = obter_armazenamento()
+        for indice in range(math.ceil(upload.tamanho / upload.tamanho_bloco)):
+            async for bloco in armazenamento.ler(chave_bloco_upload(upload.id, indice)):
+                yield bloco
+
+    async def iniciar_upload(self, passo_id: int, dados: UploadEvidenciaCreate, usuario_id: int) -> UploadEvidenciaResponse:
+        # Tipo genérico fica para a conclusão, quando o início do arquivo permite identificá-lo
+        mime_type = tipo_declarado(dados.mime_type, dados.nome)
+        if mime_type != GENERICO:
+            validar_tipo(mime_type)
+        validar_tamanho(dados.tamanho, settings.EVIDENCE_RESUMABLE_MAX_BYTES)
+
+        upload = await self.repo.criar_upload({
+            "id": uuid.uuid4().hex,
+            "passo_id": passo_id,
+            "usuario_id": usuario_id,
+            "nome": dados.nome[:255],
+            "mime_type": mime_type,
+            "tamanho": dados.tamanho,
+            "tamanho_bloco": settings.EVIDENCE_UPLOAD_BLOCK_BYTES,
+            "expira_em": datetime.now(timezone.utc) + timedelta(hours=settings.EVIDENCE_UPLOAD_EXPIRES_HOURS),
+        })
+        return self._progresso(upload)
+
+    async def progresso_upload(self, upload_id: str, usuario_id: int) -> UploadEvidenciaResponse:
+        return self._progresso(await self._obter_upload(upload_id, usuario_id))
+
+    async def receber_bloco(
+        self, upload_id: str, usuario_id: int, indice: int, offset: int, blocos: AsyncIterator[bytes]
+    ) -> UploadEvidenciaResponse:
+        """Grava um bloco na área de uploads; reenviar um bloco já recebido apenas o substitui."""
+        upload = await self._obter_upload(upload_id, usuario_id)
+        if not 0 <= indice < math.ceil(upload.tamanho / upload.tamanho_bloco):
+            raise HTTPException(status_code=400, detail="Bloco fora do arquivo")
+        if offset != indice * upload.tamanho_bloco:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Offset {offset} não corresponde ao bloco {indice} (esperado {indice * upload.tamanho_bloco})"
+            )
+
+        esperado = self._tamanho_bloco(upload, indice)
+        await self.repo.encerrar_leitura()
+        await obter_armazenamento().gravar(
+            chave_bloco_upload(upload.id, indice), conferir_tamanho(blocos, esperado), esperado, GENERICO
+        )
+        upload = await self.repo.marcar_bloco(upload.id, indice)
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+        return self._progresso(upload)
+
+    async def concluir_upload(self, upload_id: str, usuario_id: int, sha256: str | None = None) -> EvidenciaResponse:
+        """Confere os blocos, calcula o hash do arquivo montado e o guarda como qualquer outra evidência.
+
+        O arquivo é lido duas vezes em fluxo (hash e gravação): a chave final depende do hash,
+        e nada é gravado no armazenamento por conteúdo antes de conferido.
+        """
+        upload = await self._obter_upload(upload_id, usuario_id)
+        progresso = self._progresso(upload)
+        faltando = progresso.total_blocos - len(progresso.blocos_recebidos)
+        if faltando:
+            raise HTTPException(status_code=409, detail=f"Faltam {faltando} bloco(s) para concluir o upload")
+
+        await self.repo.encerrar_leitura()
+        mime_type = upload.mime_type
+        if mime_type == GENERICO:
+            inicio = b"".join([b async for b in obter_armazenamento().ler(chave_bloco_upload(upload.id, 0), 0, 63)])
+            mime_type = tipo_por_assinatura(inicio)
+            validar_tipo(mime_type)
+
+        calculado, tamanho = await calcular_hash(self._blocos_montados(upload))
+        if tamanho != upload.tamanho:
+            raise HTTPException(status_code=422, detail="Tamanho do arquivo montado difere do informado")
+        if sha256 and calculado != sha256:
+            raise HTTPException(status_code=422, detail="Hash do arquivo montado difere do informado")
+
+        analise = {
+            "sha256": calculado, "tamanho": tamanho, "mime_type": mime_type,
+            "extensao": definir_extensao(upload.nome, mime_type)
+        }
+        resposta = await self._guardar(
+            analise, lambda chave: obter_armazenamento().gravar(chave, self._blocos_montados(upload), tamanho, mime_type)
+        )
+        await self._descartar_upload(upload)
+        return resposta
+
+    async def cancelar_upload(self, upload_id: str, usuario_id: int):
+        upload = await self.repo.get_upload(upload_id, usuario_id)
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload não encontrado")
+        await self._descartar_upload(upload)
+
+    async def _descartar_upload(self, upload: UploadEvidencia):
+        armazenamento = obter_armazenamento()
+        for indice in json.loads(upload.blocos_recebidos or "[]"):
+            await armazenamento.remover(chave_bloco_upload(upload.id, indice))
+        await self.repo.remover_upload(upload)
+
+    # --- Exportação em ZIP ---
+    async def exportar_zip(
+        self, *, ciclo_id: Optional[int] = None, execucao_id: Optional[int] = None, defeito_id: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """ZIP com as evidências do ciclo, execução ou defeito e um manifesto.csv, gerado enquanto é enviado.
+
+        As consultas acontecem aqui; o gerador devolvido só lê o armazenamento, então não
+        depende da sessão do banco, que termina antes de a resposta ser transmitida.
+        """
+        escopos = (
+            (CicloTeste, ciclo_id, "Ciclo não encontrado"),
+            (ExecucaoTeste, execucao_id, "Execução não encontrada"),
+            (Defeito, defeito_id, "Defeito não encontrado"),
+        )
+        for modelo, valor, erro in escopos:
+            if valor is not None and not await self.repo.existe(modelo, valor):
+                raise HTTPException(status_code=404, detail=erro)
+
+        linhas = await self.repo.listar_para_exportacao(ciclo_id=ciclo_id, execucao_id=execucao_id, defeito_id=defeito_id)
+        objetos = await self.repo.get_varios(set().union(*(extrair_hashes(l["evidencias"]) for l in linhas)))
+        return zip_em_fluxo(self._entradas_zip(linhas, objetos))
+
+    async def _entradas_zip(self, linhas: list, objetos: dict) -> AsyncIterator[EntradaZip]:
+        """Cada arquivo entra uma vez (na pasta da primeira citação); o manifesto registra todas as citações."""
+        armazenamento = obter_armazenamento()
+        incluidos = {}
+        manifesto = io.StringIO()
+        escritor = csv.writer(manifesto)
+        escritor.writerow(COLUNAS_MANIFESTO)
+
+        for linha in linhas:
+            pasta = f"execucao-{linha['execucao_id']}/{linha['origem']}-{linha['referencia']}"
+            contexto = [
+                linha["origem"], linha["execucao_id"], linha["caso"], linha["referencia"],
+                getattr(linha["status"], "value", linha["status"])
+            ]
+            for url in urls_evidencias(linha["evidencias"]):
+                sha256 = hash_da_url(url)
+                if sha256:
+                    objeto = objetos.get(sha256)
+                    chave = chave_objeto(sha256, objeto.extensao) if objeto else None
+                else:
+                    chave = chave_legada_da_url(url)
+
+                if chave is None:
+                    escritor.writerow(["", *contexto, sha256 or "", "", url, "fora do armazenamento"])
+                    continue
+                if chave in incluidos:
+                    caminho, tamanho = incluidos[chave]
+                    escritor.writerow([caminho, *contexto, sha256 or "", tamanho, url, "repetido"])
+                    continue
+
+                info = await armazenamento.info(chave)
+                if info is None:
+                    escritor.writerow(["", *contexto, sha256 or "", "", url, "arquivo ausente"])
+                    continue
+                caminho = f"{pasta}/{posixpath.basename(chave)}"
+                incluidos[chave] = (caminho, info.tamanho)
+                escritor.writerow([caminho, *contexto, sha256 or "", info.tamanho, url, "incluído"])
+                yield caminho, info.modificado_em, armazenamento.ler(chave), False
+
+        async def conteudo_manifesto():
+            # utf-8 com BOM: o Excel abre os acentos corretamente
+            yield manifesto.getvalue().encode("utf-8-sig")
+        yield "manifesto.csv", datetime.now(timezone.utc), conteudo_manifesto(), True
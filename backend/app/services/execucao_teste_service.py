@@ -1,104 +1,249 @@
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, UploadFile
 
-from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository, TENTATIVAS_VERSAO
 from app.repositories.caso_teste_repository import CasoTesteRepository
 from app.repositories.defeito_repository import DefeitoRepository
-from app.schemas.execucao_teste import ExecucaoTesteResponse, ExecucaoPassoUpdate, ExecucaoPassoResponse
-from app.schemas.defeito import DefeitoCreate
-from app.models.testing import StatusExecucaoEnum, StatusPassoEnum
+from app.repositories.ciclo_teste_repository import CicloTesteRepository
+from app.repositories.sincronizacao_repository import (
+    SincronizacaoRepository, REMOCAO_EXECUCAO, REMOCAO_PASSO, REMOCAO_DEFEITO
+)
+from app.schemas.execucao_teste import (
+    ExecucaoTesteResponse, ExecucaoPassoUpdate, ExecucaoPassoResponse, ExecucaoTarefaResumo,
+    AlocacaoLoteCreate, AlocacaoLoteResponse,
+    ExecucaoPassoLote, ExecucaoPassoLoteResponse, ExecucaoStatusResumo
+)
+from app.schemas.defeito import DefeitoCreate, DefeitoSincronizado
+from app.schemas.evidencia import EvidenciaResponse, UploadEvidenciaCreate, UploadEvidenciaResponse
+from app.services.evidencia_service import EvidenciaService
+from app.schemas.sincronizacao import (
+    SincronizacaoResponse, PassosOfflineLote, PassosOfflineResponse, ConflitoPassoOffline
+)
+from app.models.testing import StatusExecucaoEnum
+from app.core.paginacao import Pagina
+from app.core.errors import ConflitoVersao, erro_conflito_versao, tratar_erro_integridade
+from app.core.sincronizacao import obter_token, decodificar_token
 
 class ExecucaoTesteService:
     def __init__(self, db: AsyncSession):
         self.repo = ExecucaoTesteRepository(db)
         self.caso_repo = CasoTesteRepository(db)
         self.defeito_repo = DefeitoRepository(db)
+        self.ciclo_repo = CicloTesteRepository(db)
+        self.sincronizacao_repo = SincronizacaoRepository(db)
+        self.evidencia_service = EvidenciaService(db)
 
     async def alocar_teste(self, ciclo_id: int, caso_id: int, responsavel_id: int) -> ExecucaoTesteResponse:
-        nova_exec = await self.repo.create(ciclo_id, caso_id, responsavel_id)
+        nova_exec = await self.repo.criar_planejamento(ciclo_id, caso_id, responsavel_id)
         return ExecucaoTesteResponse.model_validate(nova_exec)
 
-    async def listar_tarefas_usuario(self, usuario_id: int, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[ExecucaoTesteResponse]:
+    async def alocar_em_lote(self, dados: AlocacaoLoteCreate) -> AlocacaoLoteResponse:
+        projeto_id = await self.ciclo_repo.get_projeto_id(dados.ciclo_teste_id)
+        if not projeto_id:
+            raise HTTPException(status_code=404, detail="Ciclo não encontrado")
+
+        if dados.alocacoes:
+            pares = [(a.caso_teste_id, a.responsavel_id) for a in dados.alocacoes]
+        else:
+            # Todos os casos ativos do projeto, distribuídos em rodízio entre os testadores
+            casos_ids = await self.caso_repo.listar_ids_ativos(projeto_id)
+            responsaveis = dados.responsaveis_ids
+            pares = [(caso_id, responsaveis[i % len(responsaveis)]) for i, caso_id in enumerate(casos_ids)]
+
+        inexistentes = await self.repo.responsaveis_inexistentes([responsavel for _, responsavel in pares])
+        if inexistentes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Responsável não encontrado: {', '.join(map(str, inexistentes))}"
+            )
+
+        try:
+            resultado = await self.repo.alocar_em_lote(dados.ciclo_teste_id, pares, dados.ignorar_existentes)
+        except IntegrityError as e:
+            # Responsável removido entre a conferência e o INSERT
+            await self.repo.db.rollback()
+            tratar_erro_integridade(e, {"responsavel_id": "Responsável não encontrado"})
+        return AlocacaoLoteResponse(
+            ciclo_teste_id=dados.ciclo_teste_id,
+            solicitadas=len(pares),
+            execucoes_criadas=resultado["execucoes_criadas"],
+            passos_criados=resultado["passos_criados"],
+            ignoradas=len(pares) - resultado["execucoes_criadas"]
+        )
+
+    async def listar_tarefas_usuario(
+        self, usuario_id: int, status: Optional[str] = None, pagina: Optional[Pagina] = None, skip: int = 0
+    ) -> List[ExecucaoTesteResponse]:
         status_enum = None
         if status:
             try:
                 status_enum = StatusExecucaoEnum(status)
             except ValueError:
                 pass 
-        execucoes = await self.repo.get_minhas_execucoes(usuario_id, status_enum, skip, limit)
+        execucoes = await self.repo.get_minhas_execucoes(usuario_id, status_enum, pagina, skip)
         
         return [ExecucaoTesteResponse.model_validate(e) for e in execucoes]
 
+    async def listar_tarefas_resumo(self, usuario_id: int, status: Optional[StatusExecucaoEnum] = None, pagina: Optional[Pagina] = None) -> List[ExecucaoTarefaResumo]:
+        linhas = await self.repo.get_minhas_execucoes_resumo(usuario_id, status, pagina)
+        return [ExecucaoTarefaResumo.model_validate(linha) for linha in linhas]
+
     async def obter_execucao(self, execucao_id: int) -> Optional[ExecucaoTesteResponse]:
         execucao = await self.repo.get_by_id(execucao_id)
         if execucao:
             return ExecucaoTesteResponse.model_validate(execucao)
         return None
 
+    STATUS_PASSO_MAP = {
+        "passou": "aprovado",
+        "sucesso": "aprovado",
+        "passed": "aprovado",
+        
+        "falhou": "reprovado",
+        "falha": "reprovado",
+        "failed": "reprovado"
+    }
+
+    def _normalizar_status_passo(self, dados: ExecucaoPassoUpdate) -> ExecucaoPassoUpdate:
+        if dados.status is not None:
+            dados.status = self.STATUS_PASSO_MAP.get(dados.status, dados.status)
+        return dados
+
     async def registrar_resultado_passo(self, passo_id: int, dados: ExecucaoPassoUpdate) -> ExecucaoPassoResponse:        
-        status_map = {
-            "passou": "aprovado",
-            "sucesso": "aprovado",
-            "passed": "aprovado",
-            
-            "falhou": "reprovado",
-            "falha": "reprovado",
-            "failed": "reprovado"
-        }
-        status_convertido = status_map.get(dados.status, dados.status)
-        dados.status = status_convertido
-        try:
-            StatusPassoEnum(dados.status)
-        except ValueError:
-            pass
+        dados = self._normalizar_status_passo(dados)
         
-        passo_atual = await self.repo.get_execucao_passo(passo_id)
-        if not passo_atual:
+        # O status geral da execução é recalculado pelos contadores na mesma transação
+        try:
+            atualizado = await self.repo.update_passo(passo_id, dados)
+        except ConflitoVersao:
+            atual = await self.repo.get_execucao_passo(passo_id)
+            if atual is None:
+                raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
+            raise erro_conflito_versao(ExecucaoPassoResponse.model_validate(atual))
+        if not atualizado:
             raise HTTPException(status_code=404, detail="Passo de execução não encontrado")
-
-        atualizado = await self.repo.update_passo(passo_id, dados)
-        await self._atualizar_status_execucao(passo_atual.execucao_teste_id)
         
         return ExecucaoPassoResponse.model_validate(atualizado)
 
-    async def _atualizar_status_execucao(self, execucao_id: int):
-        execucao = await self.repo.get_by_id(execucao_id)
-        if not execucao:
-            return
-
-        passos = execucao.passos_executados
-        todos_status = [p.status for p in passos]
-        if all(s == StatusPassoEnum.aprovado for s in todos_status):
-             await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.fechado) 
-        elif any(s == StatusPassoEnum.reprovado for s in todos_status): 
-             await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.em_progresso)
+    async def registrar_resultados_lote(self, dados: ExecucaoPassoLote) -> ExecucaoPassoLoteResponse:
+        """Aplica resultados de vários passos (de uma ou mais execuções) numa única transação."""
+        resultados = {item.id: self._normalizar_status_passo(item) for item in dados.passos}
+
+        # Sem versões informadas o lote é reaplicado sobre a leitura nova; com elas, conflito é 409
+        tentativas = 1 if any(item.versao is not None for item in dados.passos) else TENTATIVAS_VERSAO
+        for tentativa in range(tentativas):
+            passos = await self.repo.get_passos(list(resultados))
+            faltando = set(resultados) - {p.id for p in passos}
+            if faltando:
+                raise HTTPException(status_code=404, detail=f"Passos de execução não encontrados: {sorted(faltando)}")
+
+            try:
+                execucao_ids = await self.repo.aplicar_resultados_passos(passos, resultados)
+                atualizados, status_finais = await self.repo.concluir_resultados_passos(execucao_ids, list(resultados))
+                break
+            except ConflitoVersao:
+                if tentativa + 1 == tentativas:
+                    atuais = await self.repo.get_passos(list(resultados))
+                    raise erro_conflito_versao([ExecucaoPassoResponse.model_validate(p) for p in atuais])
+
+        return ExecucaoPassoLoteResponse(
+            passos=[ExecucaoPassoResponse.model_validate(p) for p in atualizados],
+            execucoes=[
+                ExecucaoStatusResumo(id=i, status_geral=s, versao=v)
+                for i, (s, v) in sorted(status_finais.items())
+            ]
+        )
+
+    async def sincronizar(self, usuario_id: int, desde: Optional[str] = None) -> SincronizacaoResponse:
+        """Execuções, passos e defeitos do usuário alterados desde o token (tudo, sem token)."""
+        marca = decodificar_token(desde)
+        # Lido antes dos dados: o que confirmar durante a leitura volta na próxima chamada
+        token = await obter_token(self.repo.db)
+
+        execucoes = await self.repo.listar_execucoes_alteradas(usuario_id, marca)
+        passos = await self.repo.listar_passos_alterados(usuario_id, marca)
+        defeitos = await self.defeito_repo.listar_alteracoes(usuario_id, marca)
+        # Sincronização completa substitui o estado local: não há o que remover
+        remocoes = await self.sincronizacao_repo.listar_remocoes(usuario_id, marca) if marca is not None else {}
+        return SincronizacaoResponse(
+            token=str(token),
+            completa=marca is None,
+            execucoes=[ExecucaoTarefaResumo.model_validate(e) for e in execucoes],
+            passos=[ExecucaoPassoResponse.model_validate(p) for p in passos],
+            defeitos=[DefeitoSincronizado.model_validate(d) for d in defeitos],
+            execucoes_removidas=remocoes.get(REMOCAO_EXECUCAO, []),
+            passos_removidos=remocoes.get(REMOCAO_PASSO, []),
+            defeitos_removidos=remocoes.get(REMOCAO_DEFEITO, [])
+        )
+
+    async def aplicar_passos_offline(self, usuario_id: int, dados: PassosOfflineLote) -> PassosOfflineResponse:
+        """Aplica a fila offline do executor; itens em conflito são relatados e os demais gravados juntos.
+
+        Se o mesmo passo aparece mais de uma vez na fila, vale o último registro.
+        """
+        resultados = {item.id: self._normalizar_status_passo(item) for item in dados.passos}
+
+        for _ in range(TENTATIVAS_VERSAO):
+            passos = await self.repo.get_passos(list(resultados), responsavel_id=usuario_id)
+            encontrados = {p.id for p in passos}
+            conflitos = [
+                ConflitoPassoOffline(id=i, motivo="nao_encontrado")
+                for i in resultados if i not in encontrados
+            ]
+            aplicaveis = []
+            for passo in passos:
+                if passo.versao == resultados[passo.id].versao:
+                    aplicaveis.append(passo)
+                else:
+                    conflitos.append(ConflitoPassoOffline(
+                        id=passo.id, motivo="versao", atual=ExecucaoPassoResponse.model_validate(passo)
+                    ))
+
+            if not aplicaveis:
+                atualizados, status_finais = [], {}
+                break
+            try:
+                execucao_ids = await self.repo.aplicar_resultados_passos(aplicaveis, resultados)
+                atualizados, status_finais = await self.repo.concluir_resultados_passos(
+                    execucao_ids, [p.id for p in aplicaveis]
+                )
+                break
+            except ConflitoVersao:
+                # Algum passo mudou entre a leitura e a gravação: reclassifica com a leitura nova
+                continue
         else:
-             if execucao.status_geral == StatusExecucaoEnum.pendente:
-                 await self.repo.update_status_geral(execucao_id, StatusExecucaoEnum.em_progresso)
+            atuais = await self.repo.get_passos(list(resultados), responsavel_id=usuario_id)
+            raise erro_conflito_versao([ExecucaoPassoResponse.model_validate(p) for p in atuais])
+
+        return PassosOfflineResponse(
+            aplicados=[ExecucaoPassoResponse.model_validate(p) for p in atualizados],
+            execucoes=[
+                ExecucaoStatusResumo(id=i, status_geral=s, versao=v)
+                for i, (s, v) in sorted(status_finais.items())
+            ],
+            conflitos=sorted(conflitos, key=lambda c: c.id)
+        )
 
-    async def finalizar_execucao(self, execucao_id: int, status_final: StatusExecucaoEnum) -> Optional[ExecucaoTesteResponse]:
-        execucao = await self.repo.update_status_geral(execucao_id, status_final)
+    async def finalizar_execucao(
+        self, execucao_id: int, status_final: StatusExecucaoEnum, versao: Optional[int] = None
+    ) -> Optional[ExecucaoTesteResponse]:
+        try:
+            execucao = await self.repo.update_status_geral(execucao_id, status_final, versao)
+        except ConflitoVersao:
+            atual = await self.repo.get_by_id(execucao_id)
+            if atual is None:
+                return None
+            raise erro_conflito_versao(ExecucaoTesteResponse.model_validate(atual))
         if execucao:
             return ExecucaoTesteResponse.model_validate(execucao)
         return None
 
-    async def upload_evidencia(self, passo_id: int, file: UploadFile) -> dict:
-        import shutil
-        import os
-        import uuid
-        
-        os.makedirs("evidencias", exist_ok=True)
-        extension = os.path.splitext(file.filename)[1]
-        if not extension:
-            extension = ".jpg"
-            
-        safe_filename = f"{passo_id}_{uuid.uuid4()}{extension}"
-        file_path = f"evidencias/{safe_filename}"
-        await file.seek(0)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        full_url = f"http://localhost:8000/evidencias/{safe_filename}"
-        
-        return {"url": full_url}
\ No newline at end of file
+    async def upload_evidencia(self, passo_id: int, file: UploadFile) -> EvidenciaResponse:
+        return await self.evidencia_service.armazenar(file)
+
+    async def iniciar_upload_evidencia(self, passo_id: int, dados: UploadEvidenciaCreate, usuario_id: int) -> UploadEvidenciaResponse:
+        if not await self.repo.get_execucao_passo(passo_id):
+            raise HTTPException(status_code=404, detail="Passo não encontrado")
+        return await self.evidencia_service.iniciar_upload(passo_id, dados, usuario_id)
\ No newline at end of file
@@ -1,34 +1,58 @@
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.log_repository import LogRepository
-from app.schemas.log import LogCreate, LogResponse
+from app.schemas.log import LogResponse
+from app.core.paginacao import Pagina
+from app.core.auditoria import Montagem, enfileirar_auditoria, preparar_auditoria
 
 class LogService:
     def __init__(self, db: AsyncSession):
+        self.db = db
         self.repo = LogRepository(db)
 
-    async def registrar_acao(
-        self, 
-        usuario_id: int, 
-        acao: str, 
-        entidade: str, 
-        entidade_id: int = None, 
-        sistema_id: int = None, 
+    def preparar_acao(
+        self,
+        usuario_id: int,
+        acao: str,
+        entidade: str,
+        entidade_id: int = None,
+        sistema_id: int = None,
         detalhes: str = "",
-        entidade_nome: str = None
+        entidade_nome: str = None,
+        projeto_id: int = None,
+        ciclo_id: int = None,
+        montar: Optional[Montagem] = None
     ):
-        dados = LogCreate(
-            usuario_id=usuario_id,
-            sistema_id=sistema_id,
-            acao=acao,
-            entidade=entidade,
-            entidade_id=entidade_id,
-            detalhes=detalhes,
-            entidade_nome=entidade_nome
-        )
-        await self.repo.create(dados)
+        """Prepara o log da ação para entrar no outbox na mesma transação da escrita.
 
-    async def listar_todos(self):
-        logs = await self.repo.get_all(limit=200)
+        Chamar antes do serviço: o repositório da escrita auditada enfileira o evento logo
+        antes do próprio commit. `montar(registro)` devolve os campos que dependem do que
+        foi gravado (id de um registro novo, nome atualizado...). Sem `sistema_id`, ele é
+        obtido do `projeto_id` ou do `ciclo_id` na entrega, fora da requisição.
+        """
+        preparar_auditoria(self.db, {
+            "usuario_id": usuario_id,
+            "sistema_id": sistema_id,
+            "acao": acao,
+            "entidade": entidade,
+            "entidade_id": entidade_id,
+            "detalhes": detalhes,
+            "entidade_nome": entidade_nome,
+            "projeto_id": projeto_id,
+            "ciclo_id": ciclo_id
+        }, montar)
+
+    async def confirmar_acao(self, registro=None):
+        """Grava, em transação própria, o log preparado que a escrita não levou.
+
+        Acontece quando o serviço não gravou nada (ex.: evidência repetida, lote sem
+        execuções novas); nos demais casos o log já foi confirmado com a escrita.
+        """
+        if await enfileirar_auditoria(self.db, registro):
+            await self.db.commit()
+
+    async def listar_todos(self, pagina: Pagina):
+        logs = await self.repo.get_all(pagina)
         return [
             LogResponse(
                 id=l.id,
@@ -5,6 +5,7 @@ from typing import Sequence, Optional
 from app.repositories.modulo_repository import ModuloRepository
 from app.schemas.modulo import ModuloCreate, ModuloUpdate, ModuloResponse
 from app.core.errors import tratar_erro_integridade
+from app.core.paginacao import Pagina
 
 class ModuloService:
     def __init__(self, db: AsyncSession):
@@ -20,8 +21,8 @@ class ModuloService:
                 "sistema_id": "O sistema informado não existe."
             })
 
-    async def get_all_modulos(self) -> Sequence[ModuloResponse]:
-        items = await self.repo.get_all()
+    async def get_all_modulos(self, pagina: Optional[Pagina] = None) -> Sequence[ModuloResponse]:
+        items = await self.repo.get_all(pagina)
         return [ModuloResponse.model_validate(i) for i in items]
 
     async def get_modulo_by_id(self, id: int) -> Optional[ModuloResponse]:
@@ -5,6 +5,7 @@ from typing import Sequence, Optional
 from app.repositories.projeto_repository import ProjetoRepository
 from app.schemas.projeto import ProjetoCreate, ProjetoUpdate, ProjetoResponse
 from app.core.errors import tratar_erro_integridade
+from app.core.paginacao import Pagina
 
 class ProjetoService:
     def __init__(self, db: AsyncSession):
@@ -21,8 +22,8 @@ class ProjetoService:
                 "responsavel_id": "Responsável inválido."
             })
 
-    async def get_all_projetos(self) -> Sequence[ProjetoResponse]:
-        items = await self.repo.get_all()
+    async def get_all_projetos(self, pagina: Optional[Pagina] = None) -> Sequence[ProjetoResponse]:
+        items = await self.repo.get_all(pagina)
         return [ProjetoResponse.model_validate(i) for i in items]
 
     async def get_projeto_by_id(self, id: int) -> Optional[ProjetoResponse]:
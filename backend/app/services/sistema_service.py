@@ -9,6 +9,7 @@ from app.models.log import LogSistema
 from app.repositories.sistema_repository import SistemaRepository
 from app.schemas.sistema import SistemaCreate, SistemaUpdate
 from app.core.errors import tratar_erro_integridade
+from app.core.paginacao import Pagina
 
 class SistemaService:
     def __init__(self, db: AsyncSession):
@@ -25,8 +26,8 @@ class SistemaService:
             await self.repo.db.rollback()
             tratar_erro_integridade(e)
 
-    async def get_all_sistemas(self) -> Sequence[Sistema]:
-        return await self.repo.get_all_sistemas()
+    async def get_all_sistemas(self, pagina: Optional[Pagina] = None) -> Sequence[Sistema]:
+        return await self.repo.get_all_sistemas(pagina)
 
     async def get_sistema_by_id(self, sistema_id: int) -> Sistema | None:
         return await self.repo.get_sistema_by_id(sistema_id)
@@ -0,0 +1,68 @@
+"""Tratadores dos eventos do outbox (efeitos colaterais que antes rodavam dentro da requisição).
+
+A entrega é "pelo menos uma vez", então cada tratador confere o estado atual antes de agir.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.outbox import (
+    despachante, EVENTO_AUDITORIA, EVENTO_DEFEITO_STATUS, EVENTO_CASO_CICLO, EVENTO_EVIDENCIA_ARMAZENADA
+)
+from app.core.evidencias import chave_objeto
+from app.core.miniaturas import gerar_variantes
+from app.repositories.ciclo_teste_repository import CicloTesteRepository
+from app.repositories.defeito_repository import DefeitoRepository
+from app.repositories.execucao_teste_repository import ExecucaoTesteRepository
+from app.repositories.log_repository import LogRepository
+from app.models.testing import StatusCicloEnum, StatusDefeitoEnum, StatusExecucaoEnum
+from app.schemas.log import LogCreate
+
+
+@despachante.tratador(EVENTO_AUDITORIA)
+async def gravar_log(db: AsyncSession, evento):
+    dados = dict(evento.dados)
+    projeto_id = dados.pop("projeto_id", None)
+    ciclo_id = dados.pop("ciclo_id", None)
+
+    repo = LogRepository(db)
+    if dados.get("sistema_id") is None:
+        dados["sistema_id"] = await repo.resolver_sistema_id(projeto_id, ciclo_id)
+    # Sem commit: o log entra na mesma transação que marca o evento como processado
+    repo.adicionar(LogCreate(**dados), evento_id=evento.id)
+
+
+@despachante.tratador(EVENTO_DEFEITO_STATUS)
+async def reabrir_execucao_para_reteste(db: AsyncSession, evento):
+    """Defeito corrigido devolve a execução para reteste."""
+    if evento.dados["status_novo"] != StatusDefeitoEnum.corrigido.value:
+        return
+    # Numa reentrega, o defeito pode já ter saído de "corrigido"
+    if await DefeitoRepository(db).get_status(evento.dados["defeito_id"]) != StatusDefeitoEnum.corrigido:
+        return
+    # Sem commit: a volta para reteste e o evento processado confirmam juntos, senão uma
+    # reentrega zeraria de novo os passos já retestados
+    await ExecucaoTesteRepository(db).marcar_status(evento.dados["execucao_teste_id"], StatusExecucaoEnum.reteste)
+
+
+@despachante.tratador(EVENTO_CASO_CICLO)
+async def atualizar_status_ciclos(db: AsyncSession, evento):
+    """Ciclo que recebe um caso entra em execução; ciclo que fica sem casos é concluído."""
+    repo = CicloTesteRepository(db)
+
+    ciclo_novo_id = evento.dados.get("ciclo_novo_id")
+    if ciclo_novo_id:
+        ciclo = await repo.get_by_id(ciclo_novo_id)
+        if ciclo and ciclo.status in (StatusCicloEnum.planejado, StatusCicloEnum.concluido):
+            await repo.update(ciclo_novo_id, {"status": StatusCicloEnum.em_execucao})
+
+    ciclo_anterior_id = evento.dados.get("ciclo_anterior_id")
+    if ciclo_anterior_id and await repo.contar_casos(ciclo_anterior_id) == 0:
+        ciclo = await repo.get_by_id(ciclo_anterior_id)
+        if ciclo and ciclo.status != StatusCicloEnum.concluido:
+            await repo.update(ciclo_anterior_id, {"status": StatusCicloEnum.concluido})
+
+
+@despachante.tratador(EVENTO_EVIDENCIA_ARMAZENADA)
+async def gerar_miniaturas(db: AsyncSession, evento):
+    """Miniatura e prévia de imagens novas; variantes já existentes são mantidas."""
+    dados = evento.dados
+    await gerar_variantes(chave_objeto(dados["sha256"], dados["extensao"]), dados["mime_type"])
@@ -8,13 +8,14 @@ from app.repositories.usuario_repository import UsuarioRepository
 from app.schemas.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse
 from app.core.security import get_password_hash
 from app.core.errors import tratar_erro_integridade
+from app.core.paginacao import Pagina
 
 class UsuarioService:
     def __init__(self, db: AsyncSession):
         self.repo = UsuarioRepository(db)
 
-    async def get_all_usuarios(self, ativo: Optional[bool] = None) -> Sequence[UsuarioResponse]:
-        db_usuarios = await self.repo.get_all_usuarios(ativo) 
+    async def get_all_usuarios(self, ativo: Optional[bool] = None, pagina: Optional[Pagina] = None) -> Sequence[UsuarioResponse]:
+        db_usuarios = await self.repo.get_all_usuarios(ativo, pagina)
         return [UsuarioResponse.model_validate(u) for u in db_usuarios]
     
     async def get_usuario_by_id(self, usuario_id: int) -> Optional[UsuarioResponse]:
@@ -179,7 +179,7 @@ export function AdminCasosTeste() {
   useEffect(() => {
     const loadBasics = async () => {
       try {
-        const [projData, userData] = await Promise.all([api.get("/projetos"), api.get("/usuarios/")]);
+        const [projData, userData] = await Promise.all([api.getAll("/projetos"), api.getAll("/usuarios/")]);
         setProjetos(Array.isArray(projData) ? projData : []); 
         setUsuarios(Array.isArray(userData) ? userData : []);
         // REMOVIDO: setSelectedProjeto(ativos[0].id) -> Agora começa vazio para carregar tudo
@@ -202,7 +202,7 @@ export function AdminCasosTeste() {
         if (projId) {
             url = `/testes/projetos/${projId}/ciclos`;
         }
-        const response = await api.get(url);
+        const response = await api.getAll(url);
         setCiclos(Array.isArray(response) ? response : []);
     } catch (err) {
         console.error("Erro ao buscar ciclos", err);
@@ -218,7 +218,7 @@ export function AdminCasosTeste() {
           url = `/testes/projetos/${projId}/casos`;
       }
       
-      const casosData = await api.get(url);
+      const casosData = await api.getAll(url);
       
       // Carrega também os ciclos correspondentes (todos ou do projeto)
       await fetchCiclos(projId);
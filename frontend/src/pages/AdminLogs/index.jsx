@@ -164,7 +164,7 @@ export function AdminLogs() {
 
   useEffect(() => {
     loadData();
-    api.get('/sistemas/').then(res => {
+    api.getAll('/sistemas/').then(res => {
         // Garante que é um array para não quebrar o select
         const data = Array.isArray(res.data) ? res.data : (Array.isArray(res) ? res : []);
         setSistemas(data);
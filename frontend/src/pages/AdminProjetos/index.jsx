@@ -158,7 +158,7 @@ export function AdminProjetos() {
     setLoading(true);
     try {
       const [projData, sisData, modData, userData] = await Promise.all([
-        api.get("/projetos"), api.get("/sistemas/"), api.get("/modulos/"), api.get("/usuarios/") 
+        api.getAll("/projetos"), api.getAll("/sistemas/"), api.getAll("/modulos/"), api.getAll("/usuarios/") 
       ]);
       setProjetos(Array.isArray(projData) ? projData : []);
       setSistemas(Array.isArray(sisData) ? sisData : []);
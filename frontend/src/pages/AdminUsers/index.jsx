@@ -80,7 +80,7 @@ export function AdminUsers() {
   const loadData = async () => {
     setLoading(true);
     try {
-      const response = await api.get("/usuarios/");
+      const response = await api.getAll("/usuarios/");
       const data = response.data || response; 
       setUsers(Array.isArray(data) ? data : []);
     } catch (err) {
@@ -56,7 +56,7 @@ export function Dashboard() {
   }, []);
 
   useEffect(() => {
-    api.get('/sistemas/')
+    api.getAll('/sistemas/')
         .then(resp => setSistemas(Array.isArray(resp) ? resp : []))
         .catch(() => error("Erro ao carregar sistemas."));
   }, [error]);
@@ -85,7 +85,7 @@ export function Dashboard() {
       setLoadingDetails(true);
       try {
           const query = selectedSystem ? `?sistema_id=${selectedSystem.id}` : '';
-          const response = await api.get(`/projetos/${query}`);
+          const response = await api.getAll(`/projetos/${query}`);
           setDetailsData(Array.isArray(response) ? response : []); 
       } catch (err) { 
           error("Erro ao listar projetos."); 
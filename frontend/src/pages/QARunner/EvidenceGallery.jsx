@@ -1,6 +1,7 @@
 import React from 'react';
 import ReactDOM from 'react-dom'; 
 import './EvidenceGallery.css';
+import { previaEvidencia } from '../../services/evidencias';
 
 export function EvidenceGallery({ images, onClose }) {
   if (!images) return null;
@@ -15,7 +16,7 @@ export function EvidenceGallery({ images, onClose }) {
         <div className="gallery-track">
           {imageList.map((url, index) => (
             <div key={index} className="gallery-item">
-              <img src={url} alt={`Evidência ${index + 1}`} className="gallery-img" />
+              <img src={previaEvidencia(url)} alt={`Evidência ${index + 1}`} className="gallery-img" />
               <span className="gallery-counter">{index + 1} / {imageList.length}</span>
             </div>
           ))}
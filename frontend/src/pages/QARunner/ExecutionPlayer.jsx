@@ -1,6 +1,7 @@
 import React from 'react';
 import styles from './styles.module.css';
 import { AlertTriangle, Info, CheckCircle } from 'lucide-react';
+import { miniaturaEvidencia } from '../../services/evidencias';
 
 export function ExecutionPlayer({ 
   tasks, execution, onFinish, onStepAction, onViewGallery, readOnly 
@@ -98,7 +99,7 @@ export function ExecutionPlayer({
                   {evidencias.map((url, idx) => (
                     <div key={idx} className={styles.thumbWrapper}>
                       <img 
-                        src={url} className={styles.thumbImg} 
+                        src={miniaturaEvidencia(url)} className={styles.thumbImg} loading="lazy"
                         onClick={() => onViewGallery(evidencias)} 
                         alt="evidencia"
                       />
@@ -43,14 +43,14 @@ export function TaskSidebar({ tasks, loading, activeExecId, onSelect }) {
                   <span className={styles.taskId}>#{task.id}</span>
                   <span style={{
                       fontSize: '0.7rem', fontWeight: '600',
-                      color: task.caso_teste?.prioridade === 'Alta' ? '#ef4444' : '#64748b'
+                      color: task.prioridade === 'Alta' ? '#ef4444' : '#64748b'
                   }}>
-                    {task.caso_teste?.prioridade || 'Normal'}
+                    {task.prioridade || 'Normal'}
                   </span>
                 </div>
                 
                 <div className={styles.taskTitle}>
-                  {task.caso_teste?.nome}
+                  {task.caso_teste_nome}
                 </div>
                 
                 <div className={styles.taskFooter}>
@@ -1,5 +1,7 @@
 import { useState, useEffect } from 'react';
 import { api } from '../../services/api';
+import { sincronizarTarefas, enviarPassosOffline, tarefasOrdenadas } from '../../services/sincronizacao';
+import { enviarEvidencia } from '../../services/evidencias';
 import { useSnackbar } from '../../context/SnackbarContext';
 
 import { ConfirmationModal } from '../../components/ConfirmationModal';
@@ -33,6 +35,13 @@ export function QARunner() {
 
   useEffect(() => { loadMinhasTarefas(); }, []);
 
+  // Ao voltar a conexão, busca só o que mudou enquanto esteve offline
+  useEffect(() => {
+    const aoReconectar = () => loadMinhasTarefas();
+    window.addEventListener('online', aoReconectar);
+    return () => window.removeEventListener('online', aoReconectar);
+  }, []);
+
   // Recuperação de Estado
   useEffect(() => {
     if (activeExecucao) {
@@ -54,8 +63,9 @@ export function QARunner() {
   const loadMinhasTarefas = async () => {
     setLoading(true);
     try {
-        const data = await api.get("/testes/minhas-tarefas");
-        setTarefas(Array.isArray(data) ? data : []);
+        const data = await sincronizarTarefas();
+        setTarefas(tarefasOrdenadas(data));
+        if (data.offline) warning("Sem conexão: exibindo a última cópia das tarefas.");
     } catch { error("Erro ao carregar tarefas."); } 
     finally { setLoading(false); }
   };
@@ -82,6 +92,15 @@ export function QARunner() {
       } catch { error("Erro ao carregar execução."); }
   };
   
+  // Guarda a versão devolvida pelo servidor; o envio final do lote a confere
+  const atualizarVersaoPasso = (passo) => {
+      if (!passo?.id) return;
+      setActiveExecucao(prev => prev ? ({
+          ...prev,
+          passos_executados: prev.passos_executados.map(p => p.id === passo.id ? { ...p, versao: passo.versao } : p)
+      }) : prev);
+  };
+
   const handleStepAction = (passoId, acao) => {
       if (isReadOnly) return;
 
@@ -127,7 +146,8 @@ export function QARunner() {
           }));
           
           try {
-             await api.put(`/testes/execucoes/passos/${passoId}`, { status: 'aprovado', evidencias: '[]' });
+             const passo = await api.put(`/testes/execucoes/passos/${passoId}`, { status: 'aprovado', evidencias: '[]' });
+             atualizarVersaoPasso(passo);
           } catch (e) { console.log("Update silencioso falhou, será enviado no final"); }
 
       } else {
@@ -145,11 +165,7 @@ export function QARunner() {
       if (files && files.length > 0) {
           try {
               info(`Enviando ${files.length} imagem(ns)...`);
-              const uploadPromises = files.map(file => {
-                  const formData = new FormData();
-                  formData.append('file', file);
-                  return api.post(`/testes/passos/${currentStepId}/evidencia`, formData);
-              });
+              const uploadPromises = files.map(file => enviarEvidencia(currentStepId, file));
               const responses = await Promise.all(uploadPromises);
               novasEvidenciasUrls = responses.map(res => (res.data?.url || res.url)).filter(Boolean); 
           } catch { error("Erro ao enviar imagens."); }
@@ -186,10 +202,11 @@ export function QARunner() {
       setStepStatuses(prev => ({ ...prev, [currentStepId]: 'reprovado' }));
       
       try {
-          await api.put(`/testes/execucoes/passos/${currentStepId}`, { 
+          const passo = await api.put(`/testes/execucoes/passos/${currentStepId}`, { 
               status: 'reprovado',
               evidencias: evidenciasJSON 
           });
+          atualizarVersaoPasso(passo);
       } catch (e) { console.log("Update silencioso falhou"); }
 
       setIsDefectModalOpen(false);
@@ -223,7 +240,37 @@ export function QARunner() {
   const finishExecutionConfirm = async (statusFinal) => {
       setLoading(true);
       try {
-          // 1. Cria os defeitos da fila
+          // 1. Envia os resultados da fila local num único lote; conflitos voltam por passo
+          const passosPorId = new Map(activeExecucao.passos_executados.map(p => [String(p.id), p]));
+          const itens = Object.entries(stepStatuses)
+              .filter(([passoId]) => passosPorId.has(String(passoId)))
+              .map(([passoId, status]) => ({
+                  id: Number(passoId),
+                  status,
+                  versao: passosPorId.get(String(passoId)).versao
+              }));
+
+          const { conflitos = [] } = itens.length ? await enviarPassosOffline(itens) : {};
+          // Se o servidor já tem o mesmo status (ex.: envio silencioso anterior), não há divergência
+          const divergentes = conflitos.filter(c => c.atual?.status !== stepStatuses[c.id]);
+          if (divergentes.length > 0) {
+              setActiveExecucao(prev => ({
+                  ...prev,
+                  passos_executados: prev.passos_executados.map(p => {
+                      const conflito = divergentes.find(c => c.id === p.id);
+                      return conflito?.atual ? { ...p, ...conflito.atual } : p;
+                  })
+              }));
+              setStepStatuses(prev => {
+                  const restantes = { ...prev };
+                  divergentes.forEach(c => delete restantes[c.id]);
+                  return restantes;
+              });
+              warning(`${divergentes.length} passo(s) foram alterados em outra sessão. Revise antes de finalizar.`);
+              return;
+          }
+
+          // 2. Cria os defeitos da fila
           for (const defect of defectsQueue) {
               const { _passo_id_local, ...payload } = defect;
               
@@ -246,17 +293,6 @@ export function QARunner() {
               await api.post("/defeitos/", payloadFinal);
           }
 
-          // 2. Atualiza os Passos no Backend
-          const validStepIds = new Set(activeExecucao.passos_executados.map(p => String(p.id)));
-          
-          const stepPromises = Object.entries(stepStatuses)
-              .filter(([passoId]) => validStepIds.has(String(passoId)))
-              .map(([passoId, status]) => 
-                  api.put(`/testes/execucoes/passos/${passoId}`, { status })
-              );
-          
-          await Promise.all(stepPromises);
-
           // 3. Finaliza a Execução
           await api.put(`/testes/execucoes/${activeExecucao.id}/finalizar?status=${statusFinal}`);
           
@@ -20,7 +20,7 @@ export function RunnerDashboard() {
   const { error } = useSnackbar();
 
   useEffect(() => {
-    api.get('/usuarios/').then(resp => setUsers(resp || [])).catch(() => error("Erro ao carregar usuários."));
+    api.getAll('/usuarios/').then(resp => setUsers(resp || [])).catch(() => error("Erro ao carregar usuários."));
   }, [error]);
 
   useEffect(() => {
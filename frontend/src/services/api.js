@@ -1,4 +1,8 @@
-const BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000/api/v1";
+export const BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000/api/v1";
+
+// Listagens são paginadas por cursor; getAll pede páginas do tamanho máximo aceito pela API
+const PAGE_LIMIT = 500;
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
 
 export const getSession = () => ({
   token: sessionStorage.getItem("token"),
@@ -35,13 +39,13 @@ async function request(endpoint, options = {}) {
   if (token) headers.append("Authorization", `Bearer ${token}`);
 
   const isFormData =
-    options.body instanceof FormData || options.body instanceof URLSearchParams;
+    options.body instanceof FormData || options.body instanceof URLSearchParams || options.body instanceof Blob;
 
   if (!headers.has("Content-Type") && !isFormData) {
     headers.append("Content-Type", "application/json");
   }
 
-  const { params, ...restOptions } = options;
+  const { params, withHeaders, ...restOptions } = options;
 
   const config = {
     ...restOptions,
@@ -88,7 +92,7 @@ async function request(endpoint, options = {}) {
       throw apiError;
     }
 
-    return data;
+    return withHeaders ? { data, headers: response.headers } : data;
   } catch (error) {
     console.error("API Error:", error);
     throw error;
@@ -98,8 +102,25 @@ async function request(endpoint, options = {}) {
 export const api = {
   get: (endpoint, options = {}) => request(endpoint, { method: "GET", ...options }),
 
+  // Segue o cabeçalho X-Next-Cursor até a última página e devolve a lista completa
+  getAll: async (endpoint, options = {}) => {
+    const items = [];
+    let cursor;
+    do {
+      const { data, headers } = await request(endpoint, {
+        method: "GET",
+        ...options,
+        withHeaders: true,
+        params: { ...options.params, limit: PAGE_LIMIT, cursor },
+      });
+      if (Array.isArray(data)) items.push(...data);
+      cursor = headers.get(NEXT_CURSOR_HEADER);
+    } while (cursor);
+    return items;
+  },
+
   post: (endpoint, body, options = {}) => {
-    const isBinary = body instanceof FormData || body instanceof URLSearchParams;
+    const isBinary = body instanceof FormData || body instanceof URLSearchParams || body instanceof Blob;
     return request(endpoint, {
       method: "POST",
       body: isBinary ? body : JSON.stringify(body),
@@ -108,7 +129,7 @@ export const api = {
   },
 
   put: (endpoint, body, options = {}) => {
-    const isBinary = body instanceof FormData || body instanceof URLSearchParams;
+    const isBinary = body instanceof FormData || body instanceof URLSearchParams || body instanceof Blob;
     return request(endpoint, {
       method: "PUT",
       body: isBinary ? body : JSON.stringify(body),
@@ -117,7 +138,7 @@ export const api = {
   },
 
   delete: (endpoint, body, options = {}) => {
-    const isBinary = body instanceof FormData || body instanceof URLSearchParams;
+    const isBinary = body instanceof FormData || body instanceof URLSearchParams || body instanceof Blob;
     return request(endpoint, {
       method: "DELETE",
       body: body ? (isBinary ? body : JSON.stringify(body)) : null,
@@ -0,0 +1,98 @@
+import { api, BASE_URL } from "./api";
+
+// Evidências no armazenamento por conteúdo: .../evidencias/ab/cd/<sha256>.<ext>
+const PADRAO_IMAGEM = /\/evidencias\/[0-9a-f]{2}\/[0-9a-f]{2}\/([0-9a-f]{64})\.(png|jpe?g|gif|webp|bmp)$/i;
+
+const variante = (url, nome) => {
+  const encontrado = typeof url === "string" && url.match(PADRAO_IMAGEM);
+  return encontrado ? `${BASE_URL}/testes/evidencias/${encontrado[1]}/${nome}` : url;
+};
+
+/** Miniatura gerada pelo backend; URLs antigas ou não-imagens voltam como estão. */
+export const miniaturaEvidencia = (url) => variante(url, "miniatura");
+
+/** Prévia otimizada para web, usada na galeria no lugar do original. */
+export const previaEvidencia = (url) => variante(url, "previa");
+
+const hashArquivo = async (file) => {
+  if (!globalThis.crypto?.subtle) return null;
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+};
+
+const enviarPelaApi = (passoId, file) => {
+  const formData = new FormData();
+  formData.append("file", file);
+  return api.post(`/testes/passos/${passoId}/evidencia`, formData);
+};
+
+// Acima deste tamanho o arquivo vai em blocos, com retomada se a conexão cair
+const LIMITE_UPLOAD_SIMPLES = 16 * 1024 * 1024;
+const TENTATIVAS_BLOCO = 3;
+
+const sessaoSalva = (passoId, file) => `upload-evidencia:${passoId}:${file.name}:${file.size}:${file.lastModified}`;
+
+const abrirSessao = async (passoId, file) => {
+  const chave = sessaoSalva(passoId, file);
+  const salvo = localStorage.getItem(chave);
+  if (salvo) {
+    try {
+      return await api.get(`/testes/evidencias/uploads/${salvo}`);
+    } catch {
+      localStorage.removeItem(chave);
+    }
+  }
+  const upload = await api.post(`/testes/passos/${passoId}/evidencia/uploads`, {
+    nome: file.name, tamanho: file.size, mime_type: file.type || null,
+  });
+  localStorage.setItem(chave, upload.id);
+  return upload;
+};
+
+const enviarBloco = async (upload, file, indice) => {
+  const offset = indice * upload.tamanho_bloco;
+  const bloco = file.slice(offset, offset + upload.tamanho_bloco);
+  for (let tentativa = 1; ; tentativa++) {
+    try {
+      return await api.put(`/testes/evidencias/uploads/${upload.id}/blocos/${indice}`, bloco, { params: { offset } });
+    } catch (e) {
+      if (tentativa >= TENTATIVAS_BLOCO || (e.status && e.status < 500)) throw e;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * tentativa));
+    }
+  }
+};
+
+/** Upload retomável: só os blocos que o servidor ainda não tem são enviados. */
+const enviarEmBlocos = async (passoId, file) => {
+  const upload = await abrirSessao(passoId, file);
+  const recebidos = new Set(upload.blocos_recebidos);
+  for (let indice = 0; indice < upload.total_blocos; indice++) {
+    if (!recebidos.has(indice)) await enviarBloco(upload, file, indice);
+  }
+  const evidencia = await api.post(`/testes/evidencias/uploads/${upload.id}/concluir`, {});
+  localStorage.removeItem(sessaoSalva(passoId, file));
+  return evidencia;
+};
+
+/**
+ * Envia a evidência e devolve { url, ... }.
+ * Conteúdo já conhecido (pelo SHA-256) não é reenviado; com armazenamento S3 o arquivo
+ * vai direto para o bucket por URL pré-assinada. Arquivos grandes vão em blocos retomáveis;
+ * nos demais casos, upload pela API.
+ */
+export const enviarEvidencia = async (passoId, file) => {
+  if (file.size > LIMITE_UPLOAD_SIMPLES) return enviarEmBlocos(passoId, file);
+
+  // Sem tipo declarado, só a API consegue identificá-lo pelo conteúdo
+  const sha256 = file.type ? await hashArquivo(file).catch(() => null) : null;
+  if (!sha256) return enviarPelaApi(passoId, file);
+
+  const dados = { sha256, tamanho: file.size, mime_type: file.type, nome: file.name };
+  const instrucoes = await api.post("/testes/evidencias/upload-direto", dados);
+  if (instrucoes.evidencia) return instrucoes.evidencia;
+  if (!instrucoes.direto) return enviarPelaApi(passoId, file);
+
+  const resposta = await fetch(instrucoes.url, { method: instrucoes.metodo, headers: instrucoes.headers, body: file });
+  if (!resposta.ok) return enviarPelaApi(passoId, file);
+  return api.post("/testes/evidencias/upload-direto/confirmar", dados);
+};
@@ -0,0 +1,64 @@
+import { api, getSession } from "./api";
+
+// Cópia local das tarefas do executor, mantida por delta-sync (/testes/sincronizacao)
+const chaveCache = () => `sync_${getSession().username || "anon"}`;
+
+const lerCache = () => {
+  try {
+    return JSON.parse(localStorage.getItem(chaveCache())) || null;
+  } catch {
+    return null;
+  }
+};
+
+// Remoções primeiro: um item devolvido ao executor volta na lista de alterados do mesmo delta
+const mesclar = (atuais, novos, removidos = [], descartar = () => false) => {
+  const porId = { ...atuais };
+  removidos.forEach((id) => { delete porId[id]; });
+  Object.values(porId).forEach((item) => { if (descartar(item)) delete porId[item.id]; });
+  novos.forEach((item) => { porId[item.id] = item; });
+  return porId;
+};
+
+/**
+ * Busca só o que mudou desde a última sincronização e devolve o estado mesclado.
+ * Sem rede, devolve a última cópia local (offline: true).
+ */
+export async function sincronizarTarefas() {
+  const cache = lerCache();
+
+  let delta;
+  try {
+    delta = await api.get("/testes/sincronizacao", { params: { desde: cache?.token } });
+  } catch (e) {
+    if (cache && !e.status) return { ...cache, offline: true };
+    throw e;
+  }
+
+  const base = delta.completa || !cache ? { execucoes: {}, passos: {}, defeitos: {} } : cache;
+  // Passos e defeitos de execuções excluídas ou reatribuídas saem junto com elas
+  const execucoesRemovidas = new Set(delta.execucoes_removidas || []);
+  const daExecucaoRemovida = (item) => execucoesRemovidas.has(item.execucao_teste_id);
+  const estado = {
+    token: delta.token,
+    execucoes: mesclar(base.execucoes, delta.execucoes, delta.execucoes_removidas),
+    passos: mesclar(base.passos, delta.passos, delta.passos_removidos, daExecucaoRemovida),
+    defeitos: mesclar(base.defeitos, delta.defeitos, delta.defeitos_removidos, daExecucaoRemovida),
+  };
+  localStorage.setItem(chaveCache(), JSON.stringify(estado));
+  return { ...estado, offline: false };
+}
+
+/**
+ * Envia de uma vez os resultados registrados localmente.
+ * `itens`: [{ id, status, versao, resultado_obtido?, evidencias? }]; a resposta traz aplicados e conflitos por passo.
+ */
+export function enviarPassosOffline(itens) {
+  return api.post("/testes/sincronizacao/passos", { passos: itens });
+}
+
+export function tarefasOrdenadas(estado) {
+  return Object.values(estado?.execucoes || {}).sort(
+    (a, b) => new Date(b.updated_at || 0) - new Date(a.updated_at || 0) || b.id - a.id
+  );
+}